@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+
+# Segundos que una copia en memoria es válida antes de recargarla completa
+REF_CACHE_TTL = float(os.getenv("REF_CACHE_TTL", 300))
+# Cada cuántos segundos se consulta la versión en la base (invalidación entre workers)
+REF_CACHE_VERSION_CHECK = float(os.getenv("REF_CACHE_VERSION_CHECK", 2))
+
+class CacheReferencia:
+    """
+    Copia en memoria de una tabla de referencia pequeña (Sedes, Empresas), indexada por id
+    y por nombre. Se recarga completa al vencer el TTL o cuando cambia su versión en
+    VersionesCache, que los endpoints de administración incrementan al modificarla.
+    Entrega tuplas inmutables con los mismos nombres de columna del modelo.
+
+    Las consultas de recarga se hacen fuera del lock: con DB_ASYNC, run_sync devuelve el
+    control al event loop a mitad de la consulta y otra petición del mismo hilo no puede
+    quedar esperando el lock. El lock solo protege el cambio de estado y el reemplazo de
+    los índices, que no consultan la base.
+    """
+
+    def __init__(self, nombre: str, modelo, campo_id: str, campo_nombre: str):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.campo_id = campo_id
+        self.campo_nombre = campo_nombre
+        self.columnas = [c.name for c in modelo.__table__.columns]
+        self.tipo = namedtuple(f"{modelo.__name__}Ref", self.columnas)
+        self._lock = threading.Lock()
+        self._por_id = {}
+        self._por_nombre = {}
+        self._version = None
+        self._expira = 0.0
+        self._proxima_verificacion = 0.0
+        # Recarga en curso: mientras tanto las demás peticiones usan la copia anterior
+        self._recargando = False
+        # Aumenta en cada invalidación; una recarga que empezó antes no deja la copia vigente
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.recargas = 0
+
+    def _version_en_bd(self, db: Session):
+        return db.query(models.VersionCache.vc_version).filter(
+            models.VersionCache.vc_nombre == self.nombre
+        ).scalar() or 0
+
+    def _leer(self, db: Session):
+        filas = db.query(*[getattr(self.modelo, c) for c in self.columnas]).all()
+        return [self.tipo(*f) for f in filas]
+
+    def _indexar(self, registros):
+        self._por_id = {getattr(r, self.campo_id): r for r in registros}
+        self._por_nombre = {getattr(r, self.campo_nombre): r for r in registros}
+
+    def _vigente(self, db: Session):
+        ahora = time.monotonic()
+        with self._lock:
+            vencida = ahora >= self._expira
+            if not vencida and ahora < self._proxima_verificacion:
+                return True
+            if self._recargando and self._version is not None:
+                return True
+            self._recargando = True
+            if not vencida:
+                self._proxima_verificacion = ahora + REF_CACHE_VERSION_CHECK
+            generacion = self._generacion
+
+        registros = None
+        try:
+            version = self._version_en_bd(db)
+            if vencida or version != self._version:
+                registros = self._leer(db)
+        finally:
+            with self._lock:
+                self._recargando = False
+                if registros is not None and generacion == self._generacion:
+                    self._indexar(registros)
+                    self._version = version
+                    self._expira = ahora + REF_CACHE_TTL
+                    self._proxima_verificacion = ahora + REF_CACHE_VERSION_CHECK
+                    self.recargas += 1
+                elif registros is not None and not self._por_id:
+                    # Se invalidó durante la primera lectura: la copia sirve para esta
+                    # petición, pero queda vencida y la siguiente vuelve a recargar
+                    self._indexar(registros)
+        return registros is None
+
+    def _contar(self, vigente: bool):
+        if vigente:
+            self.aciertos += 1
+        else:
+            self.fallos += 1
+
+    def por_id(self, db: Session, valor):
+        self._contar(self._vigente(db))
+        return self._por_id.get(valor)
+
+    def por_nombre(self, db: Session, valor):
+        self._contar(self._vigente(db))
+        return self._por_nombre.get(valor)
+
+    def todos(self, db: Session):
+        self._contar(self._vigente(db))
+        return sorted(self._por_id.values(), key=lambda r: getattr(r, self.campo_id))
+
+    def _descartar(self, *_):
+        with self._lock:
+            self._generacion += 1
+            self._expira = 0.0
+            # Sin versión conocida nadie sirve la copia anterior mientras otra recarga termina
+            self._version = None
+
+    def invalidar(self, db: Session | None = None):
+        """
+        Descarta la copia local. Con `db`, incrementa la versión en la base dentro de la
+        transacción en curso para que los demás workers recarguen, y la copia local se
+        descarta al confirmarse la transacción: descartarla antes permitiría que una
+        recarga concurrente leyera las filas anteriores y las dejara vigentes.
+        """
+        if db is not None:
+            incremento = update(models.VersionCache).where(models.VersionCache.vc_nombre == self.nombre).values(
+                vc_version=models.VersionCache.vc_version + 1
+            )
+            opciones = {"synchronize_session": False}
+            if not db.execute(incremento, execution_options=opciones).rowcount:
+                try:
+                    with db.begin_nested():
+                        db.add(models.VersionCache(vc_nombre=self.nombre, vc_version=1))
+                except IntegrityError:
+                    # Otro worker creó la fila al mismo tiempo
+                    db.execute(incremento, execution_options=opciones)
+            event.listen(db, "after_commit", self._descartar, once=True)
+        else:
+            self._descartar()
+
+    def estadisticas(self):
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "recargas": self.recargas,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else None,
+            "registros": len(self._por_id),
+        }
+
+sedes = CacheReferencia("sedes", models.Sede, "sd_id", "sd_nombre")
+empresas = CacheReferencia("empresas", models.Empresa, "em_id", "em_nombre")
+
+class CacheExcepciones(CacheReferencia):
+    """
+    Excepciones de atención (festivos y aperturas especiales) indexadas por (sede, fecha),
+    con la clave (None, fecha) para las que aplican a todas las sedes. Misma recarga por
+    TTL y versión que las demás tablas de referencia.
+    """
+
+    def __init__(self):
+        super().__init__("excepciones", models.ExcepcionAtencion, "ex_id", "ex_id")
+        self._por_fecha = {}
+
+    def _indexar(self, registros):
+        super()._indexar(registros)
+        self._por_fecha = {(r.ex_sede_id, r.ex_fecha): r for r in registros}
+
+    def en_fecha(self, db: Session, sede_id: int, fecha):
+        """Excepción que rige la fecha para la sede (la propia de la sede antes que la general), o None."""
+        self._contar(self._vigente(db))
+        por_fecha = self._por_fecha
+        return por_fecha.get((sede_id, fecha)) or por_fecha.get((None, fecha))
+
+    def en_rango(self, db: Session, sede_id: int, desde, hasta):
+        """{fecha: excepción} de la sede entre `desde` y `hasta`, con el mismo orden de prioridad."""
+        self._contar(self._vigente(db))
+        resultado = {}
+        for (sede, fecha), registro in self._por_fecha.items():
+            if desde <= fecha <= hasta and (sede == sede_id or (sede is None and fecha not in resultado)):
+                resultado[fecha] = registro
+        return resultado
+
+excepciones = CacheExcepciones()
@@ -0,0 +1,38 @@
+import threading
+from types import MappingProxyType
+from sqlalchemy.orm import Session
+from . import models
+
+class Catalogo:
+    """
+    Mapa inmutable id <-> nombre de un catálogo fijo (Estados, Roles). Se carga al
+    iniciar la aplicación y se comparte entre todos los endpoints sin consultar la base;
+    `cargar` lo reemplaza completo cuando se pide una recarga.
+    """
+
+    def __init__(self, modelo, campo_id: str, campo_nombre: str):
+        self.modelo = modelo
+        self.campo_id = campo_id
+        self.campo_nombre = campo_nombre
+        self._lock = threading.Lock()
+        self.por_id = MappingProxyType({})
+        self.por_nombre = MappingProxyType({})
+
+    def cargar(self, db: Session):
+        filas = db.query(getattr(self.modelo, self.campo_id), getattr(self.modelo, self.campo_nombre)).all()
+        with self._lock:
+            self.por_id = MappingProxyType({i: n for i, n in filas})
+            self.por_nombre = MappingProxyType({n: i for i, n in filas})
+
+    def id(self, nombre: str):
+        return self.por_nombre.get(nombre)
+
+    def nombre(self, id_):
+        return self.por_id.get(id_)
+
+estados = Catalogo(models.Estado, "id", "name")
+roles = Catalogo(models.Rol, "r_id", "r_name")
+
+def cargar_catalogos(db: Session):
+    estados.cargar(db)
+    roles.cargar(db)
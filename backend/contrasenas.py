@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+# Algoritmo para los hashes nuevos: bcrypt o argon2 (requiere argon2-cffi)
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "bcrypt")
+# Costo de bcrypt (2^rounds iteraciones); subirlo re-hashea cada usuario en su próximo login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Costo de argon2: pasadas y memoria en KiB
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))
+# Hashes que se calculan a la vez como máximo; el resto espera sin ocupar el event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
+# passlib 1.7 busca bcrypt.__about__, que bcrypt 4.1+ ya no trae; es solo un aviso
+logging.getLogger("passlib.handlers.bcrypt").setLevel(logging.ERROR)
+
+# hex_sha256 es el formato anterior (sha256 sin sal). Todo esquema distinto al actual se
+# acepta para verificar y se reemplaza por el actual en cuanto el usuario inicia sesión.
+contexto = CryptContext(
+    schemes=[PASSWORD_SCHEME] + [s for s in ("bcrypt", "argon2") if s != PASSWORD_SCHEME] + ["hex_sha256"],
+    default=PASSWORD_SCHEME,
+    deprecated=["auto"],
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+)
+
+_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="hash")
+
+def hashear(password: str) -> str:
+    return contexto.hash(password)
+
+def verificar(password: str, hash_guardado: str | None):
+    """
+    Verifica la contraseña contra el hash guardado. Retorna (valida, nuevo_hash): nuevo_hash
+    viene cuando el hash guardado usa un esquema o costo anterior y debe reemplazarse.
+    Sin hash (usuario inexistente) gasta el mismo tiempo para no delatar qué usuarios existen.
+    """
+    if not hash_guardado:
+        contexto.dummy_verify()
+        return False, None
+    try:
+        return contexto.verify_and_update(password, hash_guardado)
+    except ValueError:
+        # Hash guardado con un formato desconocido
+        return False, None
+
+async def _en_pool(funcion, *args):
+    return await asyncio.get_running_loop().run_in_executor(_pool, funcion, *args)
+
+async def hashear_async(password: str) -> str:
+    return await _en_pool(hashear, password)
+
+async def verificar_async(password: str, hash_guardado: str | None):
+    return await _en_pool(verificar, password, hash_guardado)
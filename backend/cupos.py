@@ -0,0 +1,176 @@
+import datetime
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+
+def _clave(sede_id: int | None = None, empresa_id: int | None = None):
+    return sede_id or 0, empresa_id or 0
+
+def _condiciones(fecha: datetime.date, sede_id: int | None = None, empresa_id: int | None = None):
+    cd_sede_id, cd_empresa_id = _clave(sede_id, empresa_id)
+    return (
+        models.CupoDiario.cd_sede_id == cd_sede_id,
+        models.CupoDiario.cd_empresa_id == cd_empresa_id,
+        models.CupoDiario.cd_fecha == fecha,
+    )
+
+def ocupados(db: Session, fecha: datetime.date, sede_id: int | None = None, empresa_id: int | None = None) -> int:
+    """Turnos ocupados de una sede o una empresa en la fecha, leídos del contador."""
+    valor = db.query(models.CupoDiario.cd_ocupados).filter(*_condiciones(fecha, sede_id, empresa_id)).scalar()
+    return valor or 0
+
+def _asegurar_fila(db: Session, fecha: datetime.date, sede_id: int | None = None, empresa_id: int | None = None):
+    """Crea la fila del contador en 0 si aún no existe (otro worker puede crearla a la vez)."""
+    if db.query(models.CupoDiario.cd_id).filter(*_condiciones(fecha, sede_id, empresa_id)).first():
+        return
+    cd_sede_id, cd_empresa_id = _clave(sede_id, empresa_id)
+    try:
+        with db.begin_nested():
+            db.add(models.CupoDiario(cd_sede_id=cd_sede_id, cd_empresa_id=cd_empresa_id, cd_fecha=fecha, cd_ocupados=0))
+    except IntegrityError:
+        pass
+
+def reservar(db: Session, fecha: datetime.date, limite: int | None, sede_id: int | None = None, empresa_id: int | None = None) -> bool:
+    """
+    Ocupa un turno con un único UPDATE condicional (ocupados < limite), de modo que
+    dos reservas concurrentes no puedan superar el cupo. Retorna False si no hay cupo.
+    Sin límite configurado solo incrementa el contador. No hace commit.
+    """
+    _asegurar_fila(db, fecha, sede_id, empresa_id)
+    sentencia = update(models.CupoDiario).where(*_condiciones(fecha, sede_id, empresa_id))
+    if limite:
+        sentencia = sentencia.where(models.CupoDiario.cd_ocupados < limite)
+    sentencia = sentencia.values(cd_ocupados=models.CupoDiario.cd_ocupados + 1)
+    resultado = db.execute(sentencia, execution_options={"synchronize_session": False})
+    return resultado.rowcount == 1
+
+def bloquear(db: Session, claves) -> dict:
+    """
+    Ocupados actuales de varios contadores (claves (cd_sede_id, cd_empresa_id, fecha)),
+    creando en 0 los que falten y bloqueándolos con SELECT ... FOR UPDATE hasta el commit:
+    mientras tanto ninguna reserva concurrente puede cambiarlos, así quien los lee puede
+    contar cupos en memoria y luego ajustar. En SQLite la transacción de escritura
+    (BEGIN IMMEDIATE) ya excluye a los demás escritores y FOR UPDATE no se emite.
+    """
+    claves = set(claves)
+
+    def leer():
+        encontrados = {}
+        fechas = sorted({fecha for _, _, fecha in claves})
+        for i in range(0, len(fechas), 500):
+            filas = db.query(models.CupoDiario).filter(
+                models.CupoDiario.cd_fecha.in_(fechas[i:i + 500])
+            ).with_for_update().all()
+            for fila in filas:
+                clave = (fila.cd_sede_id, fila.cd_empresa_id, fila.cd_fecha)
+                if clave in claves:
+                    encontrados[clave] = fila.cd_ocupados
+        return encontrados
+
+    ocupados_actuales = leer()
+    faltantes = claves - ocupados_actuales.keys()
+    if faltantes:
+        for cd_sede_id, cd_empresa_id, fecha in sorted(faltantes, key=str):
+            _asegurar_fila(db, fecha, cd_sede_id or None, cd_empresa_id or None)
+        ocupados_actuales = leer()
+    return ocupados_actuales
+
+def ajustar(db: Session, fecha: datetime.date, delta: int, sede_id: int | None = None, empresa_id: int | None = None):
+    """
+    Suma `delta` al contador de la sede o empresa en la fecha (sin bajar de 0).
+    No hace commit: el cambio se confirma junto con la cita que lo origina.
+    """
+    _asegurar_fila(db, fecha, sede_id, empresa_id)
+    nuevo = models.CupoDiario.cd_ocupados + delta
+    db.execute(
+        update(models.CupoDiario).where(*_condiciones(fecha, sede_id, empresa_id)).values(
+            cd_ocupados=case((nuevo < 0, 0), else_=nuevo)
+        ),
+        execution_options={"synchronize_session": False}
+    )
+
+def ajustar_cita(db: Session, sede_id: int | None, fecha: datetime.date, empresa_id: int | None, delta: int):
+    """Ajusta los contadores de sede y empresa afectados por una cita."""
+    if fecha is None:
+        return
+    if sede_id:
+        ajustar(db, fecha, delta, sede_id=sede_id)
+    if empresa_id:
+        ajustar(db, fecha, delta, empresa_id=empresa_id)
+
+def cambiar_empresa_paciente(db: Session, paciente: models.Paciente, empresa_id: int | None):
+    """
+    Los cupos de empresa se cuentan por la empresa actual del paciente; al cambiarla
+    se trasladan sus citas existentes al contador de la nueva empresa.
+    """
+    anterior = paciente.pt_empresa_id
+    if anterior == empresa_id:
+        return
+    por_fecha = db.query(models.Cita.c_fecha, func.count(models.Cita.c_id)).filter(
+        models.Cita.c_paciente_id == paciente.pt_id
+    ).group_by(models.Cita.c_fecha).all()
+    for fecha, cantidad in por_fecha:
+        if anterior:
+            ajustar(db, fecha, -cantidad, empresa_id=anterior)
+        if empresa_id:
+            ajustar(db, fecha, cantidad, empresa_id=empresa_id)
+    paciente.pt_empresa_id = empresa_id
+
+def _conteos_reales(db: Session):
+    por_sede = db.query(
+        models.Cita.c_sede_id, models.Cita.c_fecha, func.count(models.Cita.c_id)
+    ).filter(
+        models.Cita.c_sede_id.isnot(None), models.Cita.c_fecha.isnot(None)
+    ).group_by(models.Cita.c_sede_id, models.Cita.c_fecha).all()
+    por_empresa = db.query(
+        models.Paciente.pt_empresa_id, models.Cita.c_fecha, func.count(models.Cita.c_id)
+    ).join(models.Paciente).filter(
+        models.Paciente.pt_empresa_id.isnot(None), models.Cita.c_fecha.isnot(None)
+    ).group_by(models.Paciente.pt_empresa_id, models.Cita.c_fecha).all()
+
+    conteos = {}
+    for sede_id, fecha, cantidad in por_sede:
+        conteos[(*_clave(sede_id=sede_id), fecha)] = cantidad
+    for empresa_id, fecha, cantidad in por_empresa:
+        conteos[(*_clave(empresa_id=empresa_id), fecha)] = cantidad
+    return conteos
+
+def reconciliar(db: Session):
+    """
+    Reconstruye CuposDiarios a partir de Citas con dos GROUP BY y lo reemplaza en bloque.
+    Retorna la lista de diferencias (clave, almacenado, real) encontradas antes de corregir.
+    """
+    reales = _conteos_reales(db)
+    almacenados = {
+        (c.cd_sede_id, c.cd_empresa_id, c.cd_fecha): c.cd_ocupados
+        for c in db.query(models.CupoDiario).all()
+    }
+
+    diferencias = [
+        (clave, almacenados.get(clave, 0), reales.get(clave, 0))
+        for clave in sorted(set(reales) | set(almacenados), key=str)
+        if almacenados.get(clave, 0) != reales.get(clave, 0)
+    ]
+
+    db.query(models.CupoDiario).delete(synchronize_session=False)
+    if reales:
+        db.execute(models.CupoDiario.__table__.insert(), [
+            {"cd_sede_id": sede_id, "cd_empresa_id": empresa_id, "cd_fecha": fecha, "cd_ocupados": cantidad}
+            for (sede_id, empresa_id, fecha), cantidad in reales.items()
+        ])
+    db.commit()
+    return diferencias
+
+if __name__ == "__main__":
+    from .database import SessionLocal, engine
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        diferencias = reconciliar(db)
+        for (sede_id, empresa_id, fecha), almacenado, real in diferencias:
+            destino = f"sede {sede_id}" if sede_id else f"empresa {empresa_id}"
+            print(f"Diferencia {destino} {fecha}: almacenado={almacenado} real={real}")
+        print(f"Reconciliación completada. Diferencias corregidas: {len(diferencias)}")
+    finally:
+        db.close()
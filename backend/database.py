@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -10,12 +10,109 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./clinizad.db")
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Argumentos adicionales para SQLite
-connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+ES_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+def _env_int(nombre, defecto):
+    return int(os.getenv(nombre, defecto))
+
+def _env_bool(nombre, defecto):
+    return os.getenv(nombre, str(defecto)).strip().lower() in ("1", "true", "yes", "si", "sí")
+
+# Pool de conexiones (PostgreSQL u otros motores cliente/servidor)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)  # segundos
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# PRAGMAs aplicados a cada conexión SQLite
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_CACHE_SIZE_KB = _env_int("SQLITE_CACHE_SIZE_KB", 20000)
+SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)  # bytes, 0 lo desactiva
+
+if ES_SQLITE:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    )
+else:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+
+def _configurar_sqlite(motor):
+    """
+    PRAGMAs por conexión y control del BEGIN: SQLAlchemy lo emite (en vez del driver)
+    para poder pedir BEGIN IMMEDIATE en las transacciones de escritura y soportar SAVEPOINT.
+    """
+    @event.listens_for(motor, "connect")
+    def _sqlite_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        # Valor negativo: tamaño en KB en lugar de páginas
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+    @event.listens_for(motor, "begin")
+    def _sqlite_begin(conn):
+        if conn.get_execution_options().get("sqlite_begin_immediate"):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql("BEGIN")
+
+if ES_SQLITE:
+    _configurar_sqlite(engine)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
-)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+# Stack async opcional (DB_ASYNC=true): aiosqlite para SQLite, asyncpg para PostgreSQL.
+# Los endpoints más usados se registran como async sobre AsyncSessionLocal.
+DB_ASYNC = _env_bool("DB_ASYNC", False)
+async_engine = None
+AsyncSessionLocal = None
+
+def _url_async(url):
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    if ES_SQLITE:
+        async_engine = create_async_engine(
+            _url_async(SQLALCHEMY_DATABASE_URL),
+            connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        )
+        _configurar_sqlite(async_engine.sync_engine)
+    else:
+        async_engine = create_async_engine(
+            _url_async(SQLALCHEMY_DATABASE_URL),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING
+        )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autocommit=False, autoflush=False)
+
+def usar_escritura(db):
+    """
+    Hace que las transacciones de la sesión tomen el bloqueo de escritura desde el
+    inicio, para que leer y luego escribir no choque con otro worker ("database is locked").
+    Aplica desde la próxima transacción que abra la sesión. En otros motores
+    la opción se ignora.
+    """
+    db.bind = db.get_bind().execution_options(sqlite_begin_immediate=True)
@@ -0,0 +1,173 @@
+import datetime
+import unicodedata
+from sqlalchemy import and_, case, func, or_, select, union_all
+from sqlalchemy.orm import Session
+from . import models, cache
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+# Rango máximo (en días) que se puede consultar en una sola llamada
+MAX_DIAS_RANGO = 366
+
+def _sin_tildes(nombre: str) -> str:
+    return unicodedata.normalize("NFKD", nombre.strip()).encode("ascii", "ignore").decode().lower()
+
+# Bit de sd_dias_atencion por nombre de día (sin tildes ni mayúsculas): lunes = 1, martes = 2, ...
+_BIT_POR_DIA = {_sin_tildes(nombre): 1 << i for i, nombre in enumerate(DIAS_SEMANA)}
+
+def mascara_dias(nombres) -> int:
+    """
+    Máscara de sd_dias_atencion para una lista de nombres de día o un texto "Lunes, Martes".
+    Lanza ValueError con el nombre que no corresponde a ningún día.
+    """
+    if isinstance(nombres, str):
+        nombres = nombres.split(",")
+    mascara = 0
+    for nombre in nombres:
+        if not nombre.strip():
+            continue
+        bit = _BIT_POR_DIA.get(_sin_tildes(nombre))
+        if bit is None:
+            raise ValueError(nombre.strip())
+        mascara |= bit
+    return mascara
+
+def nombres_dias(mascara: int | None):
+    """Nombres de los días de la máscara, de lunes a domingo; None si la sede no tiene días configurados."""
+    if mascara is None:
+        return None
+    return [nombre for i, nombre in enumerate(DIAS_SEMANA) if mascara >> i & 1]
+
+def atiende(mascara: int | None, fecha: datetime.date, excepcion=None) -> bool:
+    """
+    Si la sede atiende en la fecha: manda la excepción de esa fecha si la hay; si no, el bit
+    del día de la semana. Sin días configurados (None) se atiende todos los días.
+    """
+    if excepcion is not None:
+        return excepcion.ex_atiende
+    return mascara is None or bool(mascara >> fecha.weekday() & 1)
+
+def _cupo(totales, ocupados):
+    if not totales:
+        return {"totales": None, "ocupados": ocupados, "disponibles": None}
+    return {"totales": totales, "ocupados": ocupados, "disponibles": max(0, totales - ocupados)}
+
+def ocupados_por_dia(db: Session, desde: datetime.date, hasta: datetime.date, sede_id: int | None = None,
+                     empresa_id: int | None = None, fechas: list[datetime.date] | None = None):
+    """
+    Turnos ocupados por fecha de la sede y de la empresa en el rango (opcionalmente solo en
+    `fechas`), con un solo GROUP BY sobre CuposDiarios. Retorna {fecha: (ocupados_sede, ocupados_empresa)}.
+    """
+    claves = []
+    if sede_id:
+        claves.append(and_(models.CupoDiario.cd_sede_id == sede_id, models.CupoDiario.cd_empresa_id == 0))
+    if empresa_id:
+        claves.append(and_(models.CupoDiario.cd_sede_id == 0, models.CupoDiario.cd_empresa_id == empresa_id))
+    if not claves:
+        return {}
+
+    es_sede = models.CupoDiario.cd_empresa_id == 0
+    query = db.query(
+        models.CupoDiario.cd_fecha,
+        func.sum(case((es_sede, models.CupoDiario.cd_ocupados), else_=0)),
+        func.sum(case((es_sede, 0), else_=models.CupoDiario.cd_ocupados)),
+    ).filter(
+        or_(*claves),
+        models.CupoDiario.cd_fecha >= desde,
+        models.CupoDiario.cd_fecha <= hasta
+    )
+    if fechas is not None:
+        query = query.filter(models.CupoDiario.cd_fecha.in_(fechas))
+    filas = query.group_by(models.CupoDiario.cd_fecha).all()
+    return {fecha: (ocupados_sede, ocupados_empresa) for fecha, ocupados_sede, ocupados_empresa in filas}
+
+def disponibilidad_rango(db: Session, desde: datetime.date, hasta: datetime.date, sede=None, empresa=None):
+    """
+    Disponibilidad día a día entre `desde` y `hasta` (incluidos) para una sede y/o empresa
+    (registros de la caché de referencia). Los días en que la sede no atiende se marcan
+    con atiende=False y sin disponibilidad.
+    """
+    mascara = sede.sd_dias_atencion if sede else None
+    excepciones = cache.excepciones.en_rango(db, sede.sd_id, desde, hasta) if sede else {}
+    ocupados = ocupados_por_dia(
+        db, desde, hasta,
+        sede_id=sede.sd_id if sede else None,
+        empresa_id=empresa.em_id if empresa else None
+    )
+
+    resultado = []
+    fecha = desde
+    while fecha <= hasta:
+        ocupados_sede, ocupados_empresa = ocupados.get(fecha, (0, 0))
+        atiende_dia = atiende(mascara, fecha, excepciones.get(fecha))
+        cupo_sede = _cupo(sede.sd_cant_turnos, ocupados_sede) if sede else None
+        cupo_empresa = _cupo(empresa.em_cant_max, ocupados_empresa) if empresa else None
+        con_cupo = all(c["disponibles"] is None or c["disponibles"] > 0 for c in (cupo_sede, cupo_empresa) if c)
+        resultado.append({
+            "fecha": fecha.isoformat(),
+            "atiende": atiende_dia,
+            "sede": cupo_sede,
+            "empresa": cupo_empresa,
+            "tiene_disponibilidad": atiende_dia and con_cupo,
+        })
+        fecha += datetime.timedelta(days=1)
+    return resultado
+
+def fechas_llenas(db: Session, desde: datetime.date, hasta: datetime.date, sede=None, empresa=None):
+    """
+    Fechas del rango en que la sede o la empresa ya alcanzaron su cupo. Cada clave se lee
+    con un rango sobre el índice único de CuposDiarios filtrando solo los días saturados.
+    """
+    consultas = []
+    if sede and sede.sd_cant_turnos:
+        consultas.append(select(models.CupoDiario.cd_fecha).where(
+            models.CupoDiario.cd_sede_id == sede.sd_id,
+            models.CupoDiario.cd_empresa_id == 0,
+            models.CupoDiario.cd_fecha >= desde,
+            models.CupoDiario.cd_fecha <= hasta,
+            models.CupoDiario.cd_ocupados >= sede.sd_cant_turnos
+        ))
+    if empresa and empresa.em_cant_max:
+        consultas.append(select(models.CupoDiario.cd_fecha).where(
+            models.CupoDiario.cd_sede_id == 0,
+            models.CupoDiario.cd_empresa_id == empresa.em_id,
+            models.CupoDiario.cd_fecha >= desde,
+            models.CupoDiario.cd_fecha <= hasta,
+            models.CupoDiario.cd_ocupados >= empresa.em_cant_max
+        ))
+    if not consultas:
+        return set()
+    return set(db.execute(union_all(*consultas)).scalars())
+
+def proximos_cupos(db: Session, sede, desde: datetime.date, cantidad: int, empresa=None, horizonte: int = MAX_DIAS_RANGO):
+    """
+    Primeras `cantidad` fechas desde `desde` (dentro de `horizonte` días) en que la sede
+    atiende y quedan cupos tanto en la sede como en la empresa. En vez de consultar fecha
+    por fecha se leen de una vez los días saturados del horizonte y se saltan en memoria.
+    """
+    hasta = desde + datetime.timedelta(days=horizonte - 1)
+    excepciones = cache.excepciones.en_rango(db, sede.sd_id, desde, hasta)
+    llenas = fechas_llenas(db, desde, hasta, sede=sede, empresa=empresa)
+
+    candidatas = []
+    fecha = desde
+    while fecha <= hasta and len(candidatas) < cantidad:
+        if atiende(sede.sd_dias_atencion, fecha, excepciones.get(fecha)) and fecha not in llenas:
+            candidatas.append(fecha)
+        fecha += datetime.timedelta(days=1)
+    if not candidatas:
+        return []
+
+    ocupados = ocupados_por_dia(
+        db, candidatas[0], candidatas[-1], sede_id=sede.sd_id,
+        empresa_id=empresa.em_id if empresa else None, fechas=candidatas
+    )
+    resultado = []
+    for fecha in candidatas:
+        ocupados_sede, ocupados_empresa = ocupados.get(fecha, (0, 0))
+        resultado.append({
+            "fecha": fecha.isoformat(),
+            "sede": _cupo(sede.sd_cant_turnos, ocupados_sede),
+            "empresa": _cupo(empresa.em_cant_max, ocupados_empresa) if empresa else None,
+        })
+    return resultado
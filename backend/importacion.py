@@ -0,0 +1,167 @@
+import time
+from collections import Counter
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models, cupos, database, cache, catalogos, disponibilidad
+
+# Tamaño de lote para consultas IN (...) y para los INSERT con executemany
+TAMANO_LOTE = 500
+
+def _lotes(valores, tamano=TAMANO_LOTE):
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+def _buscar_en_lotes(db: Session, columna, valores):
+    resultado = []
+    for lote in _lotes(valores):
+        resultado.extend(db.query(columna.class_).filter(columna.in_(lote)).all())
+    return resultado
+
+def _rechazo(fila, detalle):
+    return {"fila": fila, "estado": "rechazada", "detalle": detalle}
+
+def importar_citas(db: Session, citas):
+    """
+    Agenda en bloque una lista de (número de fila, CitaCreate).
+
+    Resuelve sedes, empresas y pacientes con consultas por conjuntos y valida las filas en
+    orden con los cupos de sede y empresa por fecha en memoria (partiendo de CuposDiarios,
+    con sus filas bloqueadas hasta el commit). Como en POST /citas, solo las filas aceptadas
+    crean su empresa y su paciente o cambian la empresa del paciente, y cada cita cuenta
+    para la empresa con la que el paciente queda. Pacientes, citas y contadores se escriben
+    en lotes, todo en una sola transacción de escritura.
+    Retorna el resultado por fila (aceptada / rechazada con el motivo).
+    """
+    database.usar_escritura(db)
+    resultados = {}
+
+    sedes = {s.sd_nombre: s for s in _buscar_en_lotes(db, models.Sede.sd_nombre, {c.sede for _, c in citas})}
+    nombres_empresa = {c.empresa_paciente for _, c in citas if c.empresa_paciente}
+    empresas = {e.em_nombre: e for e in _buscar_en_lotes(db, models.Empresa.em_nombre, nombres_empresa)}
+    pacientes = {p.pt_cedula: p for p in _buscar_en_lotes(db, models.Paciente.pt_cedula, {c.cedula_paciente for _, c in citas})}
+
+    # Cupos que se revisan (sede y empresa registrada de cada fila); las filas quedan
+    # bloqueadas hasta el commit para que una reserva concurrente (POST /citas) no las
+    # cambie mientras se cuentan en memoria
+    claves = set()
+    for _, c in citas:
+        sede = sedes.get(c.sede)
+        if sede is not None:
+            claves.add((sede.sd_id, 0, c.fecha))
+            if c.empresa_paciente in empresas:
+                claves.add((0, empresas[c.empresa_paciente].em_id, c.fecha))
+    ocupados = Counter(cupos.bloquear(db, claves))
+    deltas = Counter()
+
+    def ajustar(clave, delta):
+        ocupados[clave] += delta
+        deltas[clave] += delta
+
+    # Empresa actual de cada paciente y sus citas por fecha: las de la base se leen solo
+    # si cambia de empresa, las aceptadas del archivo se van sumando
+    empresa_paciente = {cedula: p.pt_empresa_id for cedula, p in pacientes.items()}
+    citas_en_base = {}
+    citas_en_archivo = {}
+
+    def citas_paciente(cedula):
+        paciente = pacientes.get(cedula)
+        if paciente is not None and cedula not in citas_en_base:
+            citas_en_base[cedula] = Counter(dict(db.query(models.Cita.c_fecha, func.count(models.Cita.c_id)).filter(
+                models.Cita.c_paciente_id == paciente.pt_id, models.Cita.c_fecha.isnot(None)
+            ).group_by(models.Cita.c_fecha).all()))
+        return citas_en_base.get(cedula, Counter()) + citas_en_archivo.get(cedula, Counter())
+
+    estado_pendiente_id = catalogos.estados.id("Pendiente")
+
+    nuevos_pacientes = {}
+    nuevas_empresas = False
+    aceptadas = []
+    for numero, c in citas:
+        sede = sedes.get(c.sede)
+        if sede is None:
+            resultados[numero] = _rechazo(numero, f"Sede no encontrada: {c.sede}")
+            continue
+        if not disponibilidad.atiende(sede.sd_dias_atencion, c.fecha, cache.excepciones.en_fecha(db, sede.sd_id, c.fecha)):
+            resultados[numero] = _rechazo(numero, f"La sede {c.sede} no atiende el {c.fecha.isoformat()}")
+            continue
+
+        clave_sede = (sede.sd_id, 0, c.fecha)
+        if sede.sd_cant_turnos and ocupados[clave_sede] >= sede.sd_cant_turnos:
+            resultados[numero] = _rechazo(numero, f"No hay turnos disponibles para la sede {c.sede} en la fecha {c.fecha}.")
+            continue
+
+        empresa = empresas.get(c.empresa_paciente) if c.empresa_paciente else None
+        if empresa and empresa.em_cant_max and ocupados[(0, empresa.em_id, c.fecha)] >= empresa.em_cant_max:
+            resultados[numero] = _rechazo(numero, f"La empresa {c.empresa_paciente} no tiene cupos disponibles para la fecha {c.fecha}.")
+            continue
+
+        # Fila aceptada: crear la empresa y el paciente si faltan
+        if c.empresa_paciente and empresa is None:
+            empresa = models.Empresa(em_nombre=c.empresa_paciente)
+            db.add(empresa)
+            db.flush()
+            empresas[c.empresa_paciente] = empresa
+            nuevas_empresas = True
+        if c.cedula_paciente not in empresa_paciente:
+            nuevos_pacientes[c.cedula_paciente] = {"pt_nombre": c.nombre_paciente, "pt_cedula": c.cedula_paciente}
+            empresa_paciente[c.cedula_paciente] = None
+
+        # Nueva empresa del paciente: sus citas pasan al contador de esa empresa
+        anterior = empresa_paciente[c.cedula_paciente]
+        if empresa and empresa.em_id != anterior:
+            for fecha, cantidad in citas_paciente(c.cedula_paciente).items():
+                if anterior:
+                    ajustar((0, anterior, fecha), -cantidad)
+                ajustar((0, empresa.em_id, fecha), cantidad)
+            empresa_paciente[c.cedula_paciente] = empresa.em_id
+
+        ajustar(clave_sede, 1)
+        if empresa_paciente[c.cedula_paciente]:
+            ajustar((0, empresa_paciente[c.cedula_paciente], c.fecha), 1)
+        citas_en_archivo.setdefault(c.cedula_paciente, Counter())[c.fecha] += 1
+        aceptadas.append((c, sede))
+        resultados[numero] = {"fila": numero, "estado": "aceptada"}
+
+    # Pacientes nuevos con su empresa final y cambios de empresa de los existentes
+    for cedula, paciente in pacientes.items():
+        if paciente.pt_empresa_id != empresa_paciente[cedula]:
+            paciente.pt_empresa_id = empresa_paciente[cedula]
+    for lote in _lotes(nuevos_pacientes.values()):
+        db.execute(models.Paciente.__table__.insert(), [{**p, "pt_empresa_id": empresa_paciente[p["pt_cedula"]]} for p in lote])
+    db.flush()
+    if nuevos_pacientes:
+        pacientes.update({
+            p.pt_cedula: p for p in _buscar_en_lotes(db, models.Paciente.pt_cedula, nuevos_pacientes)
+        })
+    if nuevas_empresas:
+        cache.empresas.invalidar(db)
+
+    nuevas_citas = [{
+        "c_paciente_id": pacientes[c.cedula_paciente].pt_id,
+        "c_sede_id": sede.sd_id,
+        "c_laboratorio": c.laboratorio,
+        "c_fecha": c.fecha,
+        "c_estado_id": estado_pendiente_id,
+    } for c, sede in aceptadas]
+    for lote in _lotes(nuevas_citas):
+        db.execute(models.Cita.__table__.insert(), lote)
+    for (cd_sede_id, cd_empresa_id, fecha), delta in deltas.items():
+        if delta:
+            cupos.ajustar(db, fecha, delta, sede_id=cd_sede_id or None, empresa_id=cd_empresa_id or None)
+
+    db.commit()
+    return [resultados[numero] for numero, _ in citas]
+
+def resumen(resultados, inicio: float):
+    """Totales del import y su rendimiento en filas por segundo."""
+    segundos = time.perf_counter() - inicio
+    aceptadas = sum(1 for r in resultados if r["estado"] == "aceptada")
+    return {
+        "total": len(resultados),
+        "aceptadas": aceptadas,
+        "rechazadas": len(resultados) - aceptadas,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": round(len(resultados) / segundos, 1) if segundos > 0 else None,
+        "filas": resultados,
+    }
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Intentos de login permitidos por usuario y por IP dentro de la ventana deslizante
+LOGIN_MAX_INTENTOS_USUARIO = int(os.getenv("LOGIN_MAX_INTENTOS_USUARIO", 5))
+LOGIN_MAX_INTENTOS_IP = int(os.getenv("LOGIN_MAX_INTENTOS_IP", 20))
+LOGIN_VENTANA_S = float(os.getenv("LOGIN_VENTANA_S", 300))
+# "memoria" (por proceso) o "sqlite" (archivo compartido entre los workers de gunicorn)
+LOGIN_LIMITE_STORE = os.getenv("LOGIN_LIMITE_STORE", "memoria")
+LOGIN_LIMITE_SQLITE_PATH = os.getenv("LOGIN_LIMITE_SQLITE_PATH", "./limite_login.db")
+
+class VentanaMemoria:
+    """
+    Ventana deslizante en memoria: por clave, los instantes de los intentos dentro de la
+    ventana. Las claves sin intentos recientes se purgan cada cierto número de llamadas.
+    """
+
+    PURGA_CADA = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._intentos = {}
+        self._llamadas = 0
+
+    def consumir(self, clave: str, limite: int, ventana: float, ahora: float) -> float:
+        """Registra un intento y retorna 0, o los segundos de espera si la clave ya está al límite."""
+        with self._lock:
+            self._llamadas += 1
+            if self._llamadas % self.PURGA_CADA == 0:
+                self._purgar(ahora - ventana)
+
+            intentos = self._intentos.setdefault(clave, deque())
+            while intentos and intentos[0] <= ahora - ventana:
+                intentos.popleft()
+            if len(intentos) >= limite:
+                return intentos[0] + ventana - ahora
+            intentos.append(ahora)
+            return 0.0
+
+    def devolver(self, clave: str, instante: float):
+        with self._lock:
+            try:
+                self._intentos.get(clave, deque()).remove(instante)
+            except ValueError:
+                pass
+
+    def limpiar(self, clave: str):
+        with self._lock:
+            self._intentos.pop(clave, None)
+
+    def _purgar(self, limite_antiguo: float):
+        self._intentos = {c: i for c, i in self._intentos.items() if i and i[-1] > limite_antiguo}
+
+class VentanaSQLite:
+    """
+    La misma ventana guardada en un archivo SQLite local, para que todos los workers de
+    gunicorn de una máquina compartan los contadores. Cada consumo es una transacción
+    BEGIN IMMEDIATE: los workers se serializan sobre la misma clave.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        conn = self._conexion()
+        conn.execute("CREATE TABLE IF NOT EXISTS IntentosLogin (il_clave TEXT NOT NULL, il_instante REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_IntentosLogin_clave ON IntentosLogin (il_clave, il_instante)")
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def consumir(self, clave: str, limite: int, ventana: float, ahora: float) -> float:
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM IntentosLogin WHERE il_clave = ? AND il_instante <= ?", (clave, ahora - ventana))
+            cantidad, primero = conn.execute(
+                "SELECT COUNT(*), MIN(il_instante) FROM IntentosLogin WHERE il_clave = ?", (clave,)
+            ).fetchone()
+            if cantidad >= limite:
+                espera = primero + ventana - ahora
+            else:
+                conn.execute("INSERT INTO IntentosLogin (il_clave, il_instante) VALUES (?, ?)", (clave, ahora))
+                espera = 0.0
+            conn.execute("COMMIT")
+            return espera
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def devolver(self, clave: str, instante: float):
+        self._conexion().execute(
+            "DELETE FROM IntentosLogin WHERE rowid = "
+            "(SELECT rowid FROM IntentosLogin WHERE il_clave = ? AND il_instante = ? LIMIT 1)",
+            (clave, instante)
+        )
+
+    def limpiar(self, clave: str):
+        self._conexion().execute("DELETE FROM IntentosLogin WHERE il_clave = ?", (clave,))
+
+almacen = VentanaSQLite(LOGIN_LIMITE_SQLITE_PATH) if LOGIN_LIMITE_STORE == "sqlite" else VentanaMemoria()
+
+def _clave_usuario(usuario: str) -> str:
+    return f"usuario:{usuario.strip().lower()}"
+
+def consumir(ip: str | None, usuario: str):
+    """
+    Cuenta un intento de login para la IP y para el usuario antes de verificarlo, así una
+    ráfaga concurrente tampoco pasa del límite. Retorna (espera, instante): espera es 0 si
+    puede seguir, o los segundos hasta que se libere un intento; instante identifica el
+    intento para login_exitoso.
+    """
+    ahora = time.time()
+    espera = almacen.consumir(f"ip:{ip}", LOGIN_MAX_INTENTOS_IP, LOGIN_VENTANA_S, ahora)
+    if espera:
+        return espera, ahora
+    espera = almacen.consumir(_clave_usuario(usuario), LOGIN_MAX_INTENTOS_USUARIO, LOGIN_VENTANA_S, ahora)
+    if espera:
+        almacen.devolver(f"ip:{ip}", ahora)
+    return espera, ahora
+
+def login_exitoso(ip: str | None, usuario: str, instante: float):
+    """
+    Un login correcto no cuenta contra la IP (varios usuarios detrás de la misma red)
+    y libera los intentos fallidos acumulados del usuario.
+    """
+    almacen.devolver(f"ip:{ip}", instante)
+    almacen.limpiar(_clave_usuario(usuario))
+
+async def _sin_bloquear(funcion, *args):
+    # El almacén SQLite puede esperar el lock del archivo: se usa fuera del event loop
+    if isinstance(almacen, VentanaSQLite):
+        return await asyncio.to_thread(funcion, *args)
+    return funcion(*args)
+
+async def consumir_async(ip: str | None, usuario: str):
+    return await _sin_bloquear(consumir, ip, usuario)
+
+async def login_exitoso_async(ip: str | None, usuario: str, instante: float):
+    await _sin_bloquear(login_exitoso, ip, usuario, instante)
@@ -1,11 +1,23 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
+import base64
+import csv
+import datetime
+import inspect
+import io
+import json
+import time
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, UploadFile, File
+from pydantic import BaseModel, Field, ValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, false, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from . import models, database
+from . import models, database, migrations, cupos, importacion, cache, catalogos, disponibilidad, contrasenas, tokens, limite_login
 
-# Crear las tablas en la base de datos
+# Crear las tablas en la base de datos y actualizar las existentes
 models.Base.metadata.create_all(bind=database.engine)
+migrations.aplicar_migraciones(database.engine)
 
 app = FastAPI()
 
@@ -17,6 +29,84 @@ def get_db():
     finally:
         db.close()
 
+# Dependencia de sesión async (solo con DB_ASYNC activo)
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+def endpoint_bd(metodo: str, ruta: str, dependencies=None):
+    """
+    Registra un endpoint de alto tráfico. Con DB_ASYNC activo se registra como `async def`
+    sobre una AsyncSession, ejecutando la misma lógica con run_sync (sin ocupar el
+    threadpool); si no, se registra la función sync tal cual. `dependencies` se pasa
+    a la ruta en ambos casos (p. ej. requiere_rol).
+    """
+    def decorador(funcion):
+        if not database.DB_ASYNC:
+            return getattr(app, metodo)(ruta, dependencies=dependencies)(funcion)
+
+        firma = inspect.signature(funcion)
+        parametros = [
+            p.replace(kind=inspect.Parameter.KEYWORD_ONLY)
+            for p in firma.parameters.values() if p.name != "db"
+        ]
+        parametros.append(inspect.Parameter(
+            "db", inspect.Parameter.KEYWORD_ONLY, default=Depends(get_async_db), annotation=AsyncSession
+        ))
+
+        async def endpoint(db: AsyncSession, **kwargs):
+            return await db.run_sync(lambda sesion: funcion(db=sesion, **kwargs))
+
+        endpoint.__signature__ = firma.replace(parameters=parametros)
+        endpoint.__name__ = funcion.__name__
+        endpoint.__doc__ = funcion.__doc__
+        getattr(app, metodo)(ruta, dependencies=dependencies)(endpoint)
+        return funcion
+    return decorador
+
+async def ejecutar_bd(funcion, *args):
+    """
+    Ejecuta `funcion(db, *args)` desde un endpoint async sin bloquear el event loop: con
+    DB_ASYNC sobre una AsyncSession (run_sync), si no en el threadpool con una sesión propia.
+    """
+    if database.DB_ASYNC:
+        async with database.AsyncSessionLocal() as db:
+            return await db.run_sync(lambda sesion: funcion(sesion, *args))
+
+    def ejecutar():
+        db = database.SessionLocal()
+        try:
+            return funcion(db, *args)
+        finally:
+            db.close()
+    return await run_in_threadpool(ejecutar)
+
+async def sesion_actual(authorization: str | None = Header(None)):
+    """
+    Identidad y rol del token `Authorization: Bearer ...`. Solo verifica la firma en
+    memoria: no consulta la base en cada petición.
+    """
+    esquema, _, token = (authorization or "").partition(" ")
+    sesion = tokens.verificar(token) if esquema.lower() == "bearer" else None
+    if not sesion:
+        raise HTTPException(
+            status_code=401, detail="Sesión inválida o expirada", headers={"WWW-Authenticate": "Bearer"}
+        )
+    return sesion
+
+def requiere_rol(*roles: str):
+    """Dependencia que exige una sesión con alguno de los roles indicados."""
+    async def dependencia(sesion: tokens.Sesion = Depends(sesion_actual)):
+        if sesion.rol not in roles:
+            raise HTTPException(status_code=403, detail="No tiene permisos para esta operación")
+        return sesion
+    return dependencia
+
+def verificar_mismo_usuario(sesion: tokens.Sesion, usr_id: int):
+    """Un usuario solo puede modificar su propia cuenta, salvo el administrador."""
+    if sesion.usr_id != usr_id and sesion.rol != "Admin":
+        raise HTTPException(status_code=403, detail="No tiene permisos para esta operación")
+
 # Configurar CORS para permitir peticiones desde el frontend (Flet en modo web)
 app.add_middleware(
     CORSMiddleware,
@@ -39,13 +129,12 @@ class CitaCreate(BaseModel):
     cedula_paciente: str
     sede: str
     laboratorio: str
-    fecha: str
+    fecha: datetime.date
     empresa_paciente: str | None = None
 
-import hashlib
-
-def hash_password(password: str):
-    return hashlib.sha256(password.encode()).hexdigest()
+class CitaUpdate(BaseModel):
+    fecha: datetime.date
+    estado: str
 
 @app.on_event("startup")
 def startup_event():
@@ -67,36 +156,48 @@ def startup_event():
                 db.add(models.Estado(name=e_name))
         db.commit()
 
+        # Catálogos de estados y roles en memoria para todos los endpoints
+        catalogos.cargar_catalogos(db)
+
         # Seed Users
         # Admin
         admin_user = db.query(models.Usuario).filter(models.Usuario.usr_name == "admin").first()
         if not admin_user:
-            # Buscar ID del rol Admin
-            rol_admin = db.query(models.Rol).filter(models.Rol.r_name == "Admin").first()
-            db.add(models.Usuario(usr_name="admin", usr_password=hash_password("admin123"), rol_id=rol_admin.r_id))
+            db.add(models.Usuario(usr_name="admin", usr_password=contrasenas.hashear("admin123"), rol_id=catalogos.roles.id("Admin")))
         
         # Agente
         agente_user = db.query(models.Usuario).filter(models.Usuario.usr_name == "agente").first()
         if not agente_user:
-             # Buscar ID del rol Agente
-            rol_agente = db.query(models.Rol).filter(models.Rol.r_name == "Agente").first()
-            db.add(models.Usuario(usr_name="agente", usr_password=hash_password("agente123"), rol_id=rol_agente.r_id))
+            db.add(models.Usuario(usr_name="agente", usr_password=contrasenas.hashear("agente123"), rol_id=catalogos.roles.id("Agente")))
 
         db.commit()
         print("Datos de inicio (Roles, Estados, Usuarios) verificados/creados.")
     finally:
         db.close()
 
-@app.post("/citas")
+def verificar_dia_atencion(db: Session, sede, fecha: datetime.date):
+    """Rechaza la fecha si la sede no atiende ese día (máscara de días y excepciones en caché)."""
+    if not disponibilidad.atiende(sede.sd_dias_atencion, fecha, cache.excepciones.en_fecha(db, sede.sd_id, fecha)):
+        raise HTTPException(status_code=400, detail=f"La sede {sede.sd_nombre} no atiende el {fecha.isoformat()}")
+
+@endpoint_bd("post", "/citas")
 def crear_cita(cita: CitaCreate, db: Session = Depends(get_db)):
-    # Validar turnos disponibles antes de crear la cita
-    sede = db.query(models.Sede).filter(models.Sede.sd_nombre == cita.sede).first()
-    if sede and sede.sd_cant_turnos:
-        # Contar citas existentes para esta sede y fecha
-        turnos_ocupados = db.query(models.Cita).filter(
-            models.Cita.c_sede == cita.sede,
-            models.Cita.c_fecha == cita.fecha
-        ).count()
+    # Toda la reserva (empresa, paciente, cupos y cita) es una sola transacción:
+    # se usa flush para obtener ids y un único commit al final.
+    database.usar_escritura(db)
+
+    # La sede se guarda por id (la caché puede no tener aún una sede recién agregada)
+    sede = cache.sedes.por_nombre(db, cita.sede)
+    if not sede:
+        sede = db.query(models.Sede).filter(models.Sede.sd_nombre == cita.sede).first()
+    if not sede:
+        raise HTTPException(status_code=404, detail="Sede no encontrada")
+    verificar_dia_atencion(db, sede, cita.fecha)
+
+    # Validación previa de turnos (rechazo rápido); la reserva definitiva se hace al insertar
+    if sede.sd_cant_turnos:
+        # Turnos ocupados para esta sede y fecha (contador diario)
+        turnos_ocupados = cupos.ocupados(db, cita.fecha, sede_id=sede.sd_id)
         
         # Verificar si hay turnos disponibles
         if turnos_ocupados >= sede.sd_cant_turnos:
@@ -107,23 +208,23 @@ def crear_cita(cita: CitaCreate, db: Session = Depends(get_db)):
     
     empresa_id = None
     if cita.empresa_paciente:
-        # Buscar o crear empresa
-        empresa = db.query(models.Empresa).filter(models.Empresa.em_nombre == cita.empresa_paciente).first()
+        # Buscar o crear empresa (la caché puede no tener aún una empresa creada por otro worker)
+        empresa = cache.empresas.por_nombre(db, cita.empresa_paciente)
+        if not empresa:
+            empresa = db.query(models.Empresa).filter(models.Empresa.em_nombre == cita.empresa_paciente).first()
         if not empresa:
             empresa = models.Empresa(em_nombre=cita.empresa_paciente)
             db.add(empresa)
-            db.commit()
-            db.refresh(empresa)
+            db.flush()
+            cache.empresas.invalidar(db)
         empresa_id = empresa.em_id
         
         # Validar turnos por empresa
         if empresa.em_cant_max:
-            turnos_ocupados_empresa = db.query(models.Cita).join(models.Paciente).filter(
-                models.Paciente.pt_empresa_id == empresa_id,
-                models.Cita.c_fecha == cita.fecha
-            ).count()
+            turnos_ocupados_empresa = cupos.ocupados(db, cita.fecha, empresa_id=empresa_id)
             
             if turnos_ocupados_empresa >= empresa.em_cant_max:
+                db.rollback()
                 raise HTTPException(
                     status_code=400,
                     detail=f"La empresa {cita.empresa_paciente} no tiene cupos disponibles para la fecha {cita.fecha}."
@@ -140,113 +241,228 @@ def crear_cita(cita: CitaCreate, db: Session = Depends(get_db)):
             pt_empresa_id=empresa_id
         )
         db.add(paciente)
-        db.commit()
-        db.refresh(paciente)
+        db.flush()
     else:
-        # Si existe y se proporcionó nueva empresa, actualizar
+        # Si existe y se proporcionó nueva empresa, actualizar (y trasladar sus cupos)
         if empresa_id:
-            paciente.pt_empresa_id = empresa_id
-            db.commit()
+            cupos.cambiar_empresa_paciente(db, paciente, empresa_id)
     
-    # Buscar estado inicial "Pendiente"
-    estado_pendiente = db.query(models.Estado).filter(models.Estado.name == "Pendiente").first()
+    # Reservar el turno: el UPDATE condicional sobre CuposDiarios y la cita se confirman juntos
+    if not cupos.reservar(db, cita.fecha, sede.sd_cant_turnos, sede_id=sede.sd_id):
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"No hay turnos disponibles para la sede {cita.sede} en la fecha {cita.fecha}. Turnos ocupados: {sede.sd_cant_turnos}/{sede.sd_cant_turnos}"
+        )
+
+    if empresa_id:
+        if not cupos.reservar(db, cita.fecha, empresa.em_cant_max, empresa_id=empresa_id):
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"La empresa {cita.empresa_paciente} no tiene cupos disponibles para la fecha {cita.fecha}."
+            )
+    elif paciente.pt_empresa_id:
+        cupos.ajustar(db, cita.fecha, 1, empresa_id=paciente.pt_empresa_id)
 
     # 3. Crear la Cita vinculada al paciente
     nueva_cita = models.Cita(
         c_paciente_id=paciente.pt_id,
-        c_sede=cita.sede,
+        c_sede_id=sede.sd_id,
         c_laboratorio=cita.laboratorio,
         c_fecha=cita.fecha,
-        c_estado="Pendiente", # Mantener compatibilidad string
-        c_estado_id=estado_pendiente.id if estado_pendiente else None
+        c_estado_id=catalogos.estados.id("Pendiente")
     )
     db.add(nueva_cita)
+    db.flush()
+    # El id se lee antes del commit: leerlo después recarga la fila en una nueva
+    # transacción de escritura (BEGIN IMMEDIATE) que puede agotar la espera del bloqueo
+    cita_id = nueva_cita.c_id
     db.commit()
     
-    return {"message": "Cita creada con éxito", "cita_id": nueva_cita.c_id}
+    return {"message": "Cita creada con éxito", "cita_id": cita_id}
+
+def validar_filas_citas(filas: list[dict]):
+    """
+    Valida cada fila como CitaCreate. Retorna las válidas como (número de fila, cita)
+    y los rechazos de las que no cumplen el formato.
+    """
+    validas, rechazos = [], []
+    for numero, fila in enumerate(filas, start=1):
+        datos = {k: (v.strip() if isinstance(v, str) else v) for k, v in fila.items() if k}
+        if not datos.get("empresa_paciente"):
+            datos["empresa_paciente"] = None
+        try:
+            validas.append((numero, CitaCreate(**datos)))
+        except ValidationError as ex:
+            campos = ", ".join(str(e["loc"][-1]) for e in ex.errors())
+            rechazos.append({"fila": numero, "estado": "rechazada", "detalle": f"Campos inválidos: {campos}"})
+    return validas, rechazos
+
+def importar_filas_citas(filas: list[dict], db: Session):
+    inicio = time.perf_counter()
+    validas, rechazos = validar_filas_citas(filas)
+    resultados = importacion.importar_citas(db, validas) if validas else []
+    resultados = sorted(resultados + rechazos, key=lambda r: r["fila"])
+    return importacion.resumen(resultados, inicio)
+
+@app.post("/citas/bulk", dependencies=[Depends(requiere_rol("Admin", "Agente"))])
+def crear_citas_bulk(filas: list[dict], db: Session = Depends(get_db)):
+    """
+    Agenda en bloque una lista JSON de citas con los campos de POST /citas.
+    Responde el resultado por fila y el rendimiento en filas por segundo.
+    """
+    return importar_filas_citas(filas, db)
+
+@app.post("/citas/bulk/csv", dependencies=[Depends(requiere_rol("Admin", "Agente"))])
+def crear_citas_bulk_csv(archivo: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Igual que /citas/bulk, a partir de un CSV con encabezados nombre_paciente, cedula_paciente, sede, laboratorio, fecha, empresa_paciente."""
+    contenido = archivo.file.read().decode("utf-8-sig")
+    return importar_filas_citas(list(csv.DictReader(io.StringIO(contenido))), db)
+
+def crear_usuario(db: Session, usuario: str, password_hash: str):
+    if db.query(models.Usuario).filter(models.Usuario.usr_name == usuario).first():
+        raise HTTPException(status_code=400, detail="El nombre de usuario ya existe")
+
+    db.add(models.Usuario(
+        usr_name=usuario,
+        usr_password=password_hash,
+        rol_id=catalogos.roles.id("Paciente")
+    ))
+    db.commit()
 
 @app.post("/register")
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest):
     usuario_limpio = request.usuario.strip()
 
     if not usuario_limpio:
         raise HTTPException(status_code=400, detail="El usuario no puede estar vacío")
 
-    existing_user = db.query(models.Usuario).filter(
-        models.Usuario.usr_name == usuario_limpio
-    ).first()
+    # El hash se calcula en el pool de contraseñas, fuera del event loop y del threadpool
+    password_hash = await contrasenas.hashear_async(request.password)
+    await ejecutar_bd(crear_usuario, usuario_limpio, password_hash)
 
-    if existing_user:
-        raise HTTPException(status_code=400, detail="El nombre de usuario ya existe")
+    return {"message": "Registro exitoso"}
 
-    rol_paciente = db.query(models.Rol).filter(
-        models.Rol.r_name == "Paciente"
-    ).first()
+def buscar_usuario(db: Session, usuario: str):
+    return db.query(
+        models.Usuario.usr_id, models.Usuario.usr_name, models.Usuario.usr_password, models.Usuario.rol_id
+    ).filter(models.Usuario.usr_name == usuario).first()
 
-    new_user = models.Usuario(
-        usr_name=usuario_limpio,
-        usr_password=hash_password(request.password),
-        rol_id=rol_paciente.r_id if rol_paciente else None
+def guardar_password(db: Session, usr_id: int, password_hash: str):
+    db.query(models.Usuario).filter(models.Usuario.usr_id == usr_id).update(
+        {"usr_password": password_hash}, synchronize_session=False
     )
-
-    db.add(new_user)
     db.commit()
 
-    return {"message": "Registro exitoso"}
-
 @app.post("/login")
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(
-        models.Usuario.usr_name == request.usuario
-    ).first()
+async def login(request: LoginRequest, peticion: Request):
+    # Límite de intentos por IP y por usuario antes de tocar la base o calcular hashes
+    ip = peticion.client.host if peticion.client else None
+    espera, intento = await limite_login.consumir_async(ip, request.usuario)
+    if espera:
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiados intentos de inicio de sesión. Intente más tarde.",
+            headers={"Retry-After": str(int(espera) + 1)}
+        )
 
-    if not usuario:
-        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    usuario = await ejecutar_bd(buscar_usuario, request.usuario)
 
-    if usuario.usr_password != hash_password(request.password):
+    # Se verifica también cuando el usuario no existe, para que ambos casos tarden lo mismo
+    valida, nuevo_hash = await contrasenas.verificar_async(
+        request.password, usuario.usr_password if usuario else None
+    )
+    if not usuario or not valida:
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
 
+    # Hash con sha256 antiguo o con un costo menor al configurado: reemplazarlo
+    if nuevo_hash:
+        await ejecutar_bd(guardar_password, usuario.usr_id, nuevo_hash)
+    await limite_login.login_exitoso_async(ip, request.usuario, intento)
+
+    rol = catalogos.roles.nombre(usuario.rol_id)
     return {
         "usr_id": usuario.usr_id,
         "usr_name": usuario.usr_name,
-        "r_name": usuario.rol.r_name
+        "r_name": rol,
+        "access_token": tokens.emitir(usuario.usr_id, usuario.usr_name, rol),
+        "token_type": "bearer",
+        "expires_in": tokens.TOKEN_TTL
     }
 
+@app.post("/logout")
+async def logout(sesion: tokens.Sesion = Depends(sesion_actual)):
+    """Revoca el token actual hasta su vencimiento."""
+    tokens.revocar(sesion)
+    return {"message": "Sesión cerrada"}
+
 @app.get("/sedes")
 def get_sedes(db: Session = Depends(get_db)):
-    sedes = db.query(models.Sede).all()
+    sedes = cache.sedes.todos(db)
     return [{
         "id": s.sd_id, 
         "nombre": s.sd_nombre, 
-        "dias_atencion": s.sd_dias_atencion,
+        "dias_atencion": disponibilidad.nombres_dias(s.sd_dias_atencion),
+        "dias_atencion_mask": s.sd_dias_atencion,
         "sd_cant_turnos": s.sd_cant_turnos
     } for s in sedes]
 
 @app.get("/sedes/{sede_id}/dias-disponibles")
 def get_dias_disponibles(sede_id: int, db: Session = Depends(get_db)):
-    sede = db.query(models.Sede).filter(models.Sede.sd_id == sede_id).first()
+    sede = cache.sedes.por_id(db, sede_id)
     if not sede:
         raise HTTPException(status_code=404, detail="Sede no encontrada")
-    return {"dias_atencion": sede.sd_dias_atencion}
+    return {
+        "dias_atencion": disponibilidad.nombres_dias(sede.sd_dias_atencion),
+        "dias_atencion_mask": sede.sd_dias_atencion
+    }
+
+@endpoint_bd("get", "/sedes/{sede_id}/proximo-cupo")
+def get_proximo_cupo(
+    sede_id: int,
+    empresa: str | None = None,
+    desde: datetime.date | None = None,
+    cantidad: int = Query(5, ge=1, le=31),
+    db: Session = Depends(get_db)
+):
+    """
+    Próximas fechas (hasta un año desde `desde`, por defecto hoy) con cupo en la sede y,
+    si se indica, en la empresa, en días de atención de la sede.
+    """
+    sede = cache.sedes.por_id(db, sede_id)
+    if not sede:
+        raise HTTPException(status_code=404, detail="Sede no encontrada")
+    empresa_ref = None
+    if empresa:
+        empresa_ref = cache.empresas.por_nombre(db, empresa)
+        if not empresa_ref:
+            raise HTTPException(status_code=404, detail="Empresa no encontrada")
+
+    desde = desde or datetime.date.today()
+    fechas = disponibilidad.proximos_cupos(db, sede, desde, cantidad, empresa=empresa_ref)
+    return {
+        "sede": sede.sd_nombre,
+        "empresa": empresa_ref.em_nombre if empresa_ref else None,
+        "desde": desde.isoformat(),
+        "fechas": fechas
+    }
 
-@app.get("/sedes/{sede_nombre}/turnos-disponibles")
-def get_turnos_disponibles(sede_nombre: str, fecha: str, db: Session = Depends(get_db)):
+@endpoint_bd("get", "/sedes/{sede_nombre}/turnos-disponibles")
+def get_turnos_disponibles(sede_nombre: str, fecha: datetime.date, db: Session = Depends(get_db)):
     """
     Verifica los turnos disponibles para una sede en una fecha específica.
     """
     # Buscar la sede por nombre
-    sede = db.query(models.Sede).filter(models.Sede.sd_nombre == sede_nombre).first()
+    sede = cache.sedes.por_nombre(db, sede_nombre)
     if not sede:
         raise HTTPException(status_code=404, detail="Sede no encontrada")
     
     # Si no hay turnos configurados, permitir ilimitados
     turnos_totales = sede.sd_cant_turnos if sede.sd_cant_turnos else 0
     
-    # Contar citas existentes para esta sede y fecha
-    turnos_ocupados = db.query(models.Cita).filter(
-        models.Cita.c_sede == sede_nombre,
-        models.Cita.c_fecha == fecha
-    ).count()
+    # Turnos ocupados para esta sede y fecha (contador diario)
+    turnos_ocupados = cupos.ocupados(db, fecha, sede_id=sede.sd_id)
     
     # Calcular disponibles
     if turnos_totales == 0:
@@ -266,24 +482,21 @@ def get_turnos_disponibles(sede_nombre: str, fecha: str, db: Session = Depends(g
             "tiene_disponibilidad": turnos_disponibles > 0
         }
 
-@app.get("/empresas/{empresa_nombre}/turnos-disponibles")
-def get_turnos_empresa_disponibles(empresa_nombre: str, fecha: str, db: Session = Depends(get_db)):
+@endpoint_bd("get", "/empresas/{empresa_nombre}/turnos-disponibles")
+def get_turnos_empresa_disponibles(empresa_nombre: str, fecha: datetime.date, db: Session = Depends(get_db)):
     """
     Verifica los turnos disponibles para una empresa en una fecha específica.
     """
     # Buscar la empresa por nombre
-    empresa = db.query(models.Empresa).filter(models.Empresa.em_nombre == empresa_nombre).first()
+    empresa = cache.empresas.por_nombre(db, empresa_nombre)
     if not empresa:
         raise HTTPException(status_code=404, detail="Empresa no encontrada")
     
     # Si no hay turnos configurados, permitir ilimitados
     turnos_totales = empresa.em_cant_max if empresa.em_cant_max else 0
     
-    # Contar citas existentes para esta empresa y fecha
-    turnos_ocupados = db.query(models.Cita).join(models.Paciente).filter(
-        models.Paciente.pt_empresa_id == empresa.em_id,
-        models.Cita.c_fecha == fecha
-    ).count()
+    # Turnos ocupados para esta empresa y fecha (contador diario)
+    turnos_ocupados = cupos.ocupados(db, fecha, empresa_id=empresa.em_id)
     
     # Calcular disponibles
     if turnos_totales == 0:
@@ -302,52 +515,262 @@ def get_turnos_empresa_disponibles(empresa_nombre: str, fecha: str, db: Session
             "tiene_disponibilidad": turnos_disponibles > 0
         }
 
-@app.get("/citas")
-def get_citas(db: Session = Depends(get_db)):
-    # Idealmente filtrar por rol, pero por simplicidad retornamos todo (para el agente)
-    citas = db.query(models.Cita).all()
-    # Construir respuesta con datos relacionados
-    resultado = []
-    for c in citas:
-        paciente = db.query(models.Paciente).filter(models.Paciente.pt_id == c.c_paciente_id).first()
-        estado = db.query(models.Estado).filter(models.Estado.id == c.c_estado_id).first()
-        
-        # Obtener nombre de la empresa si existe
-        empresa_nombre = "Particular"
-        if paciente and paciente.pt_empresa_id:
-            empresa = db.query(models.Empresa).filter(models.Empresa.em_id == paciente.pt_empresa_id).first()
-            if empresa:
-                empresa_nombre = empresa.em_nombre
-
-        resultado.append({
-            "id": c.c_id,
-            "paciente_nombre": paciente.pt_nombre if paciente else "Desconocido",
-            "paciente_cedula": paciente.pt_cedula if paciente else "Desconocido",
-            "empresa": empresa_nombre,
-            "sede": c.c_sede,
-            "laboratorio": c.c_laboratorio,
-            "fecha": c.c_fecha,
-            "estado": estado.name if estado else c.c_estado
-        })
-    return resultado
-
-@app.put("/citas/{cita_id}")
-def update_cita(cita_id: int, data: dict, db: Session = Depends(get_db)):
+@endpoint_bd("get", "/disponibilidad")
+def get_disponibilidad(
+    desde: datetime.date,
+    hasta: datetime.date,
+    sede: str | None = None,
+    empresa: str | None = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Disponibilidad por día de una sede y/o empresa entre `desde` y `hasta` (incluidos),
+    respetando los días de atención de la sede. Una sola consulta para todo el rango.
+    """
+    if not sede and not empresa:
+        raise HTTPException(status_code=400, detail="Debe indicar una sede o una empresa")
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="La fecha final debe ser posterior a la inicial")
+    if (hasta - desde).days >= disponibilidad.MAX_DIAS_RANGO:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {disponibilidad.MAX_DIAS_RANGO} días")
+
+    sede_ref = None
+    if sede:
+        sede_ref = cache.sedes.por_nombre(db, sede)
+        if not sede_ref:
+            raise HTTPException(status_code=404, detail="Sede no encontrada")
+    empresa_ref = None
+    if empresa:
+        empresa_ref = cache.empresas.por_nombre(db, empresa)
+        if not empresa_ref:
+            raise HTTPException(status_code=404, detail="Empresa no encontrada")
+
+    return disponibilidad.disponibilidad_rango(db, desde, hasta, sede=sede_ref, empresa=empresa_ref)
+
+def consultar_citas(db: Session):
+    """
+    Consulta de lectura para el listado de citas: trae cada cita con su paciente, empresa
+    y sede en una sola sentencia (LEFT JOIN por id), sin consultas adicionales por fila.
+    El nombre del estado sale del catálogo en memoria.
+    """
+    return db.query(
+        models.Cita.c_id,
+        models.Cita.c_laboratorio,
+        models.Cita.c_fecha,
+        models.Cita.c_estado_id,
+        models.Sede.sd_nombre,
+        models.Paciente.pt_id,
+        models.Paciente.pt_nombre,
+        models.Paciente.pt_cedula,
+        models.Empresa.em_nombre,
+    ).outerjoin(
+        models.Paciente, models.Paciente.pt_id == models.Cita.c_paciente_id
+    ).outerjoin(
+        models.Empresa, models.Empresa.em_id == models.Paciente.pt_empresa_id
+    ).outerjoin(
+        models.Sede, models.Sede.sd_id == models.Cita.c_sede_id
+    )
+
+# Orden del listado y la exportación: fecha (las citas sin fecha primero en todos los motores) e id
+ORDEN_CITAS = (models.Cita.c_fecha.asc().nulls_first(), models.Cita.c_id)
+
+def serializar_cita(fila):
+    tiene_paciente = fila.pt_id is not None
+    return {
+        "id": fila.c_id,
+        "paciente_nombre": fila.pt_nombre if tiene_paciente else "Desconocido",
+        "paciente_cedula": fila.pt_cedula if tiene_paciente else "Desconocido",
+        "empresa": fila.em_nombre if fila.em_nombre is not None else "Particular",
+        "sede": fila.sd_nombre,
+        "laboratorio": fila.c_laboratorio,
+        "fecha": fila.c_fecha.isoformat() if fila.c_fecha else None,
+        "estado": catalogos.estados.nombre(fila.c_estado_id)
+    }
+
+def filtrar_citas(query, sede=None, fecha_desde=None, fecha_hasta=None, estado=None, empresa=None, cedula=None):
+    """Aplica los filtros opcionales del listado y la exportación sobre consultar_citas."""
+    if sede:
+        query = query.filter(models.Sede.sd_nombre == sede)
+    if fecha_desde:
+        query = query.filter(models.Cita.c_fecha >= fecha_desde)
+    if fecha_hasta:
+        query = query.filter(models.Cita.c_fecha <= fecha_hasta)
+    if estado:
+        estado_id = catalogos.estados.id(estado)
+        query = query.filter(models.Cita.c_estado_id == estado_id if estado_id is not None else false())
+    if empresa:
+        query = query.filter(models.Empresa.em_nombre == empresa)
+    if cedula:
+        query = query.filter(models.Paciente.pt_cedula == cedula)
+    return query
+
+CITAS_LIMITE_DEFECTO = 50
+CITAS_LIMITE_MAXIMO = 500
+
+def codificar_cursor(fecha, cita_id):
+    valor = f"{fecha or ''}|{cita_id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+def decodificar_cursor(cursor: str):
+    try:
+        fecha, cita_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return (datetime.date.fromisoformat(fecha) if fecha else None), int(cita_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def validar_rango_fechas(fecha_desde, fecha_hasta):
+    if fecha_desde and fecha_hasta and fecha_hasta < fecha_desde:
+        raise HTTPException(status_code=400, detail="La fecha final debe ser posterior a la inicial")
+
+@endpoint_bd("get", "/citas", dependencies=[Depends(requiere_rol("Admin", "Agente"))])
+def get_citas(
+    sede: str | None = None,
+    fecha_desde: datetime.date | None = None,
+    fecha_hasta: datetime.date | None = None,
+    estado: str | None = None,
+    empresa: str | None = None,
+    cedula: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(CITAS_LIMITE_DEFECTO, ge=1, le=CITAS_LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    """
+    Lista las citas paginadas por cursor (orden por fecha e id).
+    Retorna `items` y `next_cursor`, que se envía como `cursor` para pedir la siguiente página.
+    """
+    validar_rango_fechas(fecha_desde, fecha_hasta)
+    query = filtrar_citas(consultar_citas(db), sede, fecha_desde, fecha_hasta, estado, empresa, cedula)
+
+    # Keyset: continuar después de la última (fecha, id) entregada
+    if cursor:
+        fecha_cursor, id_cursor = decodificar_cursor(cursor)
+        if fecha_cursor is None:
+            # Las citas sin fecha van primero (NULLS FIRST explícito: PostgreSQL las pone al final)
+            query = query.filter(or_(
+                models.Cita.c_fecha.isnot(None),
+                and_(models.Cita.c_fecha.is_(None), models.Cita.c_id > id_cursor)
+            ))
+        else:
+            query = query.filter(or_(
+                models.Cita.c_fecha > fecha_cursor,
+                and_(models.Cita.c_fecha == fecha_cursor, models.Cita.c_id > id_cursor)
+            ))
+
+    filas = query.order_by(*ORDEN_CITAS).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        next_cursor = codificar_cursor(filas[-1].c_fecha, filas[-1].c_id)
+
+    return {"items": [serializar_cita(f) for f in filas], "next_cursor": next_cursor}
+
+EXPORTAR_FILAS_POR_LOTE = 1000
+COLUMNAS_EXPORTACION = ["id", "paciente_nombre", "paciente_cedula", "empresa", "sede", "laboratorio", "fecha", "estado"]
+
+def exportar_filas(formato, filtros):
+    """
+    Genera la exportación por lotes de EXPORTAR_FILAS_POR_LOTE filas leídas con yield_per
+    (cursor del lado del servidor en PostgreSQL), sin materializar toda la tabla.
+    Usa su propia sesión porque se consume después de que termina el endpoint.
+    """
+    db = database.SessionLocal()
+    try:
+        query = filtrar_citas(consultar_citas(db), **filtros).order_by(*ORDEN_CITAS)
+        filas = query.yield_per(EXPORTAR_FILAS_POR_LOTE)
+
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=COLUMNAS_EXPORTACION)
+        if formato == "csv":
+            escritor.writeheader()
+
+        for numero, fila in enumerate(filas, start=1):
+            cita = serializar_cita(fila)
+            if formato == "csv":
+                escritor.writerow(cita)
+            else:
+                buffer.write(json.dumps(cita, ensure_ascii=False) + "\n")
+
+            if numero % EXPORTAR_FILAS_POR_LOTE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+@app.get("/citas/export", dependencies=[Depends(requiere_rol("Admin", "Agente"))])
+def exportar_citas(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    sede: str | None = None,
+    fecha_desde: datetime.date | None = None,
+    fecha_hasta: datetime.date | None = None,
+    empresa: str | None = None
+):
+    """
+    Exporta las citas en CSV o NDJSON como respuesta en streaming; la memoria usada
+    no depende del tamaño de la tabla.
+    """
+    validar_rango_fechas(fecha_desde, fecha_hasta)
+    filtros = {"sede": sede, "fecha_desde": fecha_desde, "fecha_hasta": fecha_hasta, "empresa": empresa}
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        exportar_filas(formato, filtros),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="citas.{formato}"'}
+    )
+
+@app.put("/citas/{cita_id}", dependencies=[Depends(requiere_rol("Admin", "Agente"))])
+def update_cita(cita_id: int, data: CitaUpdate, db: Session = Depends(get_db)):
+    estado_id = catalogos.estados.id(data.estado)
+    if estado_id is None:
+        raise HTTPException(status_code=400, detail="Estado no válido")
+
+    database.usar_escritura(db)
     cita = db.query(models.Cita).filter(models.Cita.c_id == cita_id).first()
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
 
-    cita.c_fecha = data["fecha"]
-    cita.c_estado = data["estado"]
+    if data.fecha != cita.c_fecha:
+        sede = cache.sedes.por_id(db, cita.c_sede_id)
+        if sede:
+            verificar_dia_atencion(db, sede, data.fecha)
+        empresa_id = cita.paciente.pt_empresa_id if cita.paciente else None
+
+        # El turno de la nueva fecha se reserva con los mismos límites que POST /citas
+        if cita.c_sede_id and not cupos.reservar(db, data.fecha, sede.sd_cant_turnos if sede else None, sede_id=cita.c_sede_id):
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"No hay turnos disponibles para la sede {sede.sd_nombre} en la fecha {data.fecha}. Turnos ocupados: {sede.sd_cant_turnos}/{sede.sd_cant_turnos}"
+            )
+        if empresa_id:
+            empresa = cache.empresas.por_id(db, empresa_id)
+            if not cupos.reservar(db, data.fecha, empresa.em_cant_max if empresa else None, empresa_id=empresa_id):
+                db.rollback()
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"La empresa {empresa.em_nombre} no tiene cupos disponibles para la fecha {data.fecha}."
+                )
+        cupos.ajustar_cita(db, cita.c_sede_id, cita.c_fecha, empresa_id, -1)
+
+    cita.c_fecha = data.fecha
+    cita.c_estado_id = estado_id
     db.commit()
 
-    return {"message": "Cita actualizada"}
+    # La cita como la lista GET /citas, para que el cliente actualice solo esa fila
+    fila = consultar_citas(db).filter(models.Cita.c_id == cita_id).one()
+    return {"message": "Cita actualizada", "cita": serializar_cita(fila)}
 
-@app.delete("/citas/{cita_id}")
+@app.delete("/citas/{cita_id}", dependencies=[Depends(requiere_rol("Admin", "Agente"))])
 def delete_cita(cita_id: int, db: Session = Depends(get_db)):
+    database.usar_escritura(db)
     cita = db.query(models.Cita).filter(models.Cita.c_id == cita_id).first()
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
+    empresa_id = cita.paciente.pt_empresa_id if cita.paciente else None
+    cupos.ajustar_cita(db, cita.c_sede_id, cita.c_fecha, empresa_id, -1)
     db.delete(cita)
     db.commit()
     return {"message": "Cita eliminada"}
@@ -355,12 +778,14 @@ def delete_cita(cita_id: int, db: Session = Depends(get_db)):
 # Endpoints Admin
 class SedeUpdate(BaseModel):
     cant_turnos: int | None = None
-    dias_atencion: str | None = None
+    # Nombres de los días (lista o "Lunes, Martes"; vacío = todos los días) o la máscara (bit 0 = lunes)
+    dias_atencion: list[str] | str | None = None
+    dias_atencion_mask: int | None = Field(None, ge=1, le=0b1111111)
 
 class EmpresaUpdate(BaseModel):
     cant_turnos: int | None = None
 
-@app.put("/sedes/{sede_id}")
+@app.put("/sedes/{sede_id}", dependencies=[Depends(requiere_rol("Admin"))])
 def update_sede(sede_id: int, sede_update: SedeUpdate, db: Session = Depends(get_db)):
     sede = db.query(models.Sede).filter(models.Sede.sd_id == sede_id).first()
     if not sede:
@@ -368,18 +793,92 @@ def update_sede(sede_id: int, sede_update: SedeUpdate, db: Session = Depends(get
     
     if sede_update.cant_turnos is not None:
         sede.sd_cant_turnos = sede_update.cant_turnos
-    if sede_update.dias_atencion is not None:
-        sede.sd_dias_atencion = sede_update.dias_atencion
-        
+    if sede_update.dias_atencion_mask is not None:
+        sede.sd_dias_atencion = sede_update.dias_atencion_mask
+    elif sede_update.dias_atencion is not None:
+        try:
+            sede.sd_dias_atencion = disponibilidad.mascara_dias(sede_update.dias_atencion) or None
+        except ValueError as ex:
+            raise HTTPException(status_code=400, detail=f"Día no válido: {ex}")
+
+    cache.sedes.invalidar(db)
     db.commit()
     return {"message": "Sede actualizada"}
 
+class ExcepcionCreate(BaseModel):
+    fecha: datetime.date
+    # Sin sede, la excepción aplica a todas (festivo)
+    sede_id: int | None = None
+    atiende: bool = False
+    descripcion: str | None = None
+
+def serializar_excepcion(excepcion):
+    return {
+        "id": excepcion.ex_id,
+        "sede_id": excepcion.ex_sede_id,
+        "fecha": excepcion.ex_fecha.isoformat(),
+        "atiende": excepcion.ex_atiende,
+        "descripcion": excepcion.ex_descripcion
+    }
+
+@app.get("/excepciones")
+def get_excepciones(
+    sede_id: int | None = None,
+    desde: datetime.date | None = None,
+    hasta: datetime.date | None = None,
+    db: Session = Depends(get_db)
+):
+    """Festivos y excepciones de atención; con `sede_id`, las de la sede más las generales."""
+    query = db.query(models.ExcepcionAtencion)
+    if sede_id is not None:
+        query = query.filter(or_(
+            models.ExcepcionAtencion.ex_sede_id == sede_id, models.ExcepcionAtencion.ex_sede_id.is_(None)
+        ))
+    if desde:
+        query = query.filter(models.ExcepcionAtencion.ex_fecha >= desde)
+    if hasta:
+        query = query.filter(models.ExcepcionAtencion.ex_fecha <= hasta)
+    excepciones = query.order_by(models.ExcepcionAtencion.ex_fecha, models.ExcepcionAtencion.ex_id).all()
+    return [serializar_excepcion(e) for e in excepciones]
+
+@app.post("/excepciones", dependencies=[Depends(requiere_rol("Admin"))])
+def crear_excepcion(excepcion: ExcepcionCreate, db: Session = Depends(get_db)):
+    if excepcion.sede_id is not None and not db.query(models.Sede.sd_id).filter(models.Sede.sd_id == excepcion.sede_id).first():
+        raise HTTPException(status_code=404, detail="Sede no encontrada")
+    sede_filtro = (
+        models.ExcepcionAtencion.ex_sede_id.is_(None) if excepcion.sede_id is None
+        else models.ExcepcionAtencion.ex_sede_id == excepcion.sede_id
+    )
+    if db.query(models.ExcepcionAtencion.ex_id).filter(sede_filtro, models.ExcepcionAtencion.ex_fecha == excepcion.fecha).first():
+        raise HTTPException(status_code=400, detail="Ya existe una excepción para esa sede y fecha")
+
+    nueva = models.ExcepcionAtencion(
+        ex_sede_id=excepcion.sede_id,
+        ex_fecha=excepcion.fecha,
+        ex_atiende=excepcion.atiende,
+        ex_descripcion=excepcion.descripcion
+    )
+    db.add(nueva)
+    cache.excepciones.invalidar(db)
+    db.commit()
+    return serializar_excepcion(nueva)
+
+@app.delete("/excepciones/{excepcion_id}", dependencies=[Depends(requiere_rol("Admin"))])
+def delete_excepcion(excepcion_id: int, db: Session = Depends(get_db)):
+    excepcion = db.query(models.ExcepcionAtencion).filter(models.ExcepcionAtencion.ex_id == excepcion_id).first()
+    if not excepcion:
+        raise HTTPException(status_code=404, detail="Excepción no encontrada")
+    db.delete(excepcion)
+    cache.excepciones.invalidar(db)
+    db.commit()
+    return {"message": "Excepción eliminada"}
+
 @app.get("/empresas")
 def get_empresas(db: Session = Depends(get_db)):
-    empresas = db.query(models.Empresa).all()
+    empresas = cache.empresas.todos(db)
     return [{"id": e.em_id, "nombre": e.em_nombre, "cant_turnos": e.em_cant_max} for e in empresas]
 
-@app.put("/empresas/{empresa_id}")
+@app.put("/empresas/{empresa_id}", dependencies=[Depends(requiere_rol("Admin"))])
 def update_empresa(empresa_id: int, empresa_update: EmpresaUpdate, db: Session = Depends(get_db)):
     empresa = db.query(models.Empresa).filter(models.Empresa.em_id == empresa_id).first()
     if not empresa:
@@ -387,7 +886,8 @@ def update_empresa(empresa_id: int, empresa_update: EmpresaUpdate, db: Session =
     
     if empresa_update.cant_turnos is not None:
         empresa.em_cant_max = empresa_update.cant_turnos
-        
+
+    cache.empresas.invalidar(db)
     db.commit()
     return {"message": "Empresa actualizada"}
 
@@ -395,8 +895,10 @@ def update_empresa(empresa_id: int, empresa_update: EmpresaUpdate, db: Session =
 def update_username(
     usr_id: int,
     data: dict,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    sesion: tokens.Sesion = Depends(sesion_actual)
 ):
+    verificar_mismo_usuario(sesion, usr_id)
     usuario = db.query(models.Usuario).filter(models.Usuario.usr_id == usr_id).first()
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -406,8 +908,7 @@ def update_username(
 
     return {"message": "Nombre de usuario actualizado"}
 
-@app.put("/usuarios/{usr_id}/password")
-def update_password(usr_id: int, data: dict, db: Session = Depends(get_db)):
+def cambiar_password(db: Session, usr_id: int, password_hash: str):
     usuario = db.query(models.Usuario).filter(
         models.Usuario.usr_id == usr_id
     ).first()
@@ -415,11 +916,32 @@ def update_password(usr_id: int, data: dict, db: Session = Depends(get_db)):
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    usuario.usr_password = hash_password(data["password"])
+    usuario.usr_password = password_hash
     db.commit()
 
+@app.put("/usuarios/{usr_id}/password")
+async def update_password(usr_id: int, data: dict, sesion: tokens.Sesion = Depends(sesion_actual)):
+    verificar_mismo_usuario(sesion, usr_id)
+    password_hash = await contrasenas.hashear_async(data["password"])
+    await ejecutar_bd(cambiar_password, usr_id, password_hash)
+
     return {"message": "Contraseña actualizada"}
 
+@app.get("/cache/estadisticas")
+def get_estadisticas_cache():
+    """Aciertos, fallos y recargas de la caché de datos de referencia de este worker."""
+    return {
+        "sedes": cache.sedes.estadisticas(),
+        "empresas": cache.empresas.estadisticas(),
+        "excepciones": cache.excepciones.estadisticas()
+    }
+
+@app.post("/catalogos/recargar", dependencies=[Depends(requiere_rol("Admin"))])
+def recargar_catalogos(db: Session = Depends(get_db)):
+    """Vuelve a cargar en memoria los catálogos de estados y roles."""
+    catalogos.cargar_catalogos(db)
+    return {"estados": dict(catalogos.estados.por_id), "roles": dict(catalogos.roles.por_id)}
+
 @app.get("/")
 def read_root():
     return {"message": "API de Citas activa"}
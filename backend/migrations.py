@@ -0,0 +1,208 @@
+import datetime
+from sqlalchemy import Date, DateTime, Integer, bindparam, inspect, text
+from . import models, cupos, disponibilidad
+from .database import SessionLocal
+
+# Filas actualizadas por transacción al normalizar o convertir columnas de una base existente
+LOTE_MIGRACION = 5000
+
+# Formatos de fecha aceptados al convertir texto de bases anteriores (el día va antes que el mes)
+FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y")
+FORMATOS_FECHA_HORA = ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M")
+
+def crear_indices_faltantes(engine):
+    """
+    create_all no agrega índices a tablas que ya existen; los crea aquí
+    para bases de datos anteriores (por ejemplo un clinizad.db existente).
+    """
+    inspector = inspect(engine)
+    for tabla in (models.Paciente.__table__, models.Cita.__table__):
+        existentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                indice.create(bind=engine)
+                print(f"Índice creado: {indice.name}")
+
+def normalizar_citas(engine):
+    """
+    Bases anteriores guardaban en Citas el nombre de la sede (c_sede) y el estado como
+    texto (c_estado) además de c_estado_id. Agrega c_sede_id, completa los ids por lotes
+    de LOTE_MIGRACION filas (cada lote en su propia transacción, sin bloquear la tabla
+    entera) y elimina las columnas de texto. El texto de c_estado prevalece sobre
+    c_estado_id porque era lo único que actualizaba PUT /citas.
+    Las sedes y estados que solo aparecían como texto se agregan a sus tablas.
+    """
+    columnas = {c["name"] for c in inspect(engine).get_columns("Citas")}
+    if "c_sede" not in columnas and "c_estado" not in columnas:
+        return
+
+    with engine.begin() as conn:
+        if "c_sede_id" not in columnas:
+            conn.execute(text('ALTER TABLE "Citas" ADD COLUMN c_sede_id INTEGER REFERENCES "Sedes"(sd_id)'))
+        if "c_estado_id" not in columnas:
+            conn.execute(text('ALTER TABLE "Citas" ADD COLUMN c_estado_id INTEGER REFERENCES "Estados"(id)'))
+        if "c_sede" in columnas:
+            conn.execute(text(
+                'INSERT INTO "Sedes" (sd_nombre) SELECT DISTINCT c_sede FROM "Citas" '
+                'WHERE c_sede IS NOT NULL AND c_sede NOT IN (SELECT sd_nombre FROM "Sedes" WHERE sd_nombre IS NOT NULL)'
+            ))
+        if "c_estado" in columnas:
+            conn.execute(text(
+                'INSERT INTO "Estados" (name) SELECT DISTINCT c_estado FROM "Citas" '
+                'WHERE c_estado IS NOT NULL AND c_estado NOT IN (SELECT name FROM "Estados" WHERE name IS NOT NULL)'
+            ))
+        maximo = conn.execute(text('SELECT MAX(c_id) FROM "Citas"')).scalar() or 0
+
+    asignaciones = []
+    if "c_sede" in columnas:
+        asignaciones.append('c_sede_id = (SELECT sd_id FROM "Sedes" WHERE sd_nombre = "Citas".c_sede)')
+    if "c_estado" in columnas:
+        asignaciones.append(
+            'c_estado_id = COALESCE((SELECT MIN(id) FROM "Estados" WHERE name = "Citas".c_estado), c_estado_id)'
+        )
+    actualizar = text(f'UPDATE "Citas" SET {", ".join(asignaciones)} WHERE c_id > :desde AND c_id <= :hasta')
+    for desde in range(0, maximo, LOTE_MIGRACION):
+        with engine.begin() as conn:
+            conn.execute(actualizar, {"desde": desde, "hasta": desde + LOTE_MIGRACION})
+
+    with engine.begin() as conn:
+        conn.execute(text('DROP INDEX IF EXISTS "ix_Citas_c_sede_c_fecha"'))
+        for columna in ("c_sede", "c_estado"):
+            if columna in columnas:
+                conn.execute(text(f'ALTER TABLE "Citas" DROP COLUMN {columna}'))
+    print(f"Citas normalizadas: {maximo} filas con c_sede_id y c_estado_id.")
+
+def interpretar_fecha(valor, tipo):
+    """Fecha (tipo Date) o fecha y hora (DateTime) del texto guardado; None si no se reconoce."""
+    if valor is None or isinstance(valor, datetime.date):
+        return valor
+    texto = str(valor).strip()
+    formatos = FORMATOS_FECHA if tipo is Date else FORMATOS_FECHA_HORA + FORMATOS_FECHA
+    for formato in formatos:
+        try:
+            resultado = datetime.datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+        return resultado.date() if tipo is Date else resultado
+    # Texto con hora en una columna de fecha: se conserva el día
+    if tipo is Date and len(texto) > 10:
+        return interpretar_fecha(texto[:10], Date)
+    return None
+
+def _convertir_columna(engine, tabla, columna, tipo, clave, convertir):
+    """
+    Cambia el tipo de una columna de texto: agrega una columna nueva de `tipo`, la llena
+    por lotes de LOTE_MIGRACION filas con `convertir(texto)` (None si no se reconoce) y
+    reemplaza a la anterior. Los índices que la incluían se vuelven a crear con
+    crear_indices_faltantes.
+    """
+    nueva = f"{columna}_tmp"
+    ddl = tipo().compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        if nueva not in {c["name"] for c in inspect(conn).get_columns(tabla)}:
+            conn.execute(text(f'ALTER TABLE "{tabla}" ADD COLUMN {nueva} {ddl}'))
+        maximo = conn.execute(text(f'SELECT MAX({clave}) FROM "{tabla}"')).scalar() or 0
+
+    leer = text(
+        f'SELECT {clave}, {columna} FROM "{tabla}" '
+        f"WHERE {clave} > :desde AND {clave} <= :hasta AND {columna} IS NOT NULL AND {columna} <> ''"
+    )
+    escribir = text(f'UPDATE "{tabla}" SET {nueva} = :valor WHERE {clave} = :clave').bindparams(
+        bindparam("valor", type_=tipo())
+    )
+    invalidas = []
+    for desde in range(0, maximo, LOTE_MIGRACION):
+        with engine.begin() as conn:
+            valores = []
+            for fila_id, valor in conn.execute(leer, {"desde": desde, "hasta": desde + LOTE_MIGRACION}):
+                convertido = convertir(valor)
+                if convertido is None:
+                    invalidas.append((fila_id, valor))
+                else:
+                    valores.append({"clave": fila_id, "valor": convertido})
+            if valores:
+                conn.execute(escribir, valores)
+
+    with engine.begin() as conn:
+        for indice in inspect(conn).get_indexes(tabla):
+            if columna in indice["column_names"]:
+                conn.execute(text(f'DROP INDEX IF EXISTS "{indice["name"]}"'))
+        conn.execute(text(f'ALTER TABLE "{tabla}" DROP COLUMN {columna}'))
+        conn.execute(text(f'ALTER TABLE "{tabla}" RENAME COLUMN {nueva} TO {columna}'))
+
+    print(f"{tabla}.{columna} convertida a {ddl}.")
+    if invalidas:
+        ejemplos = ", ".join(f"{fila_id}={valor!r}" for fila_id, valor in invalidas[:10])
+        print(f"  {len(invalidas)} valores no reconocidos quedaron vacíos: {ejemplos}")
+
+def convertir_fechas(engine):
+    """
+    Bases anteriores guardaban c_fecha y los *_created_at/*_updated_at como texto en el
+    formato que enviara el cliente. Convierte cada columna que siga siendo de texto a
+    DATE/DATETIME para que los filtros por rango comparen fechas y usen los índices.
+    """
+    inspector = inspect(engine)
+    for modelo in (models.Cita, models.Empresa, models.Usuario, models.Sede, models.Rol):
+        tabla = modelo.__table__
+        existentes = {c["name"]: c["type"] for c in inspector.get_columns(tabla.name)}
+        clave = tabla.primary_key.columns.values()[0].name
+        for columna in tabla.columns:
+            tipo = type(columna.type)
+            if tipo not in (Date, DateTime) or columna.name not in existentes:
+                continue
+            if not isinstance(existentes[columna.name], (Date, DateTime)):
+                _convertir_columna(
+                    engine, tabla.name, columna.name, tipo, clave, lambda valor, tipo=tipo: interpretar_fecha(valor, tipo)
+                )
+
+def mascara_desde_texto(valor):
+    """Máscara de días para el texto "Lunes, Martes" de bases anteriores; se ignoran los nombres desconocidos."""
+    mascara = 0
+    for nombre in str(valor).split(","):
+        try:
+            mascara |= disponibilidad.mascara_dias([nombre])
+        except ValueError:
+            pass
+    return mascara or None
+
+def convertir_dias_atencion(engine):
+    """
+    Sedes.sd_dias_atencion era el texto "Lunes, Martes, ..."; pasa a la máscara de 7 bits
+    (bit 0 = lunes). El texto vacío queda sin configurar (se atiende todos los días).
+    """
+    columnas = {c["name"]: c["type"] for c in inspect(engine).get_columns("Sedes")}
+    if "sd_dias_atencion" in columnas and not isinstance(columnas["sd_dias_atencion"], Integer):
+        _convertir_columna(engine, "Sedes", "sd_dias_atencion", Integer, "sd_id", mascara_desde_texto)
+
+def migrar_cupos_diarios(engine):
+    """
+    CuposDiarios identificaba la sede por nombre (cd_sede) y guardaba la fecha como texto.
+    Como solo contiene contadores derivados de Citas, se recrea con cd_sede_id y
+    cd_fecha DATE, y poblar_cupos_diarios la vuelve a llenar.
+    """
+    columnas = {c["name"]: c["type"] for c in inspect(engine).get_columns("CuposDiarios")}
+    if "cd_sede" in columnas or not isinstance(columnas["cd_fecha"], Date):
+        models.CupoDiario.__table__.drop(bind=engine)
+        models.CupoDiario.__table__.create(bind=engine)
+
+def poblar_cupos_diarios():
+    """Llena CuposDiarios desde Citas la primera vez que la tabla aparece en una base con datos."""
+    db = SessionLocal()
+    try:
+        if db.query(models.CupoDiario.cd_id).first() is None and db.query(models.Cita.c_id).first() is not None:
+            cupos.reconciliar(db)
+            print("Contadores de cupos diarios generados desde Citas.")
+    finally:
+        db.close()
+
+def aplicar_migraciones(engine):
+    normalizar_citas(engine)
+    convertir_fechas(engine)
+    convertir_dias_atencion(engine)
+    migrar_cupos_diarios(engine)
+    crear_indices_faltantes(engine)
+    poblar_cupos_diarios()
+
+if __name__ == "__main__":
+    from .database import engine
+    aplicar_migraciones(engine)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+import datetime
+from sqlalchemy import Boolean, Column, Date, DateTime, Integer, String, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -8,7 +9,7 @@ class Paciente(Base):
     pt_id = Column(Integer, primary_key=True, index=True)
     pt_nombre = Column(String)
     pt_cedula = Column(String, unique=True, index=True)
-    pt_empresa_id = Column(Integer, ForeignKey("Empresas.em_id"), nullable=True)
+    pt_empresa_id = Column(Integer, ForeignKey("Empresas.em_id"), nullable=True, index=True)
 
     citas = relationship("Cita", back_populates="paciente")
     empresa = relationship("Empresa", back_populates="pacientes")
@@ -18,8 +19,8 @@ class Empresa(Base):
 
     em_id = Column(Integer, primary_key=True, index=True)
     em_nombre = Column(String(100))
-    em_created_at = Column(String, nullable=True)
-    em_updated_at = Column(String, nullable=True)
+    em_created_at = Column(DateTime, nullable=True, default=datetime.datetime.now)
+    em_updated_at = Column(DateTime, nullable=True, default=datetime.datetime.now, onupdate=datetime.datetime.now)
     em_cant_max = Column(Integer, nullable=True) # Cantidad de turnos
     em_cant_pri = Column(Integer, nullable=True) # Cantidad prioridad (opcional)
 
@@ -30,17 +31,26 @@ class Cita(Base):
 
     c_id = Column(Integer, primary_key=True, index=True)
     c_paciente_id = Column(Integer, ForeignKey("Paciente.pt_id"))
-    c_sede = Column(String)
+    c_sede_id = Column(Integer, ForeignKey("Sedes.sd_id"), nullable=True)
     c_laboratorio = Column(String)
-    c_fecha = Column(String)
-    c_estado = Column(String, default="Pendiente")
+    c_fecha = Column(Date)
     c_estado_id = Column(Integer, ForeignKey("Estados.id"), nullable=True)
-    c_created_at = Column(String, nullable=True)
-    c_updated_at = Column(String, nullable=True)
+    c_created_at = Column(DateTime, nullable=True, default=datetime.datetime.now)
+    c_updated_at = Column(DateTime, nullable=True, default=datetime.datetime.now, onupdate=datetime.datetime.now)
 
     paciente = relationship("Paciente", back_populates="citas")
+    sede = relationship("Sede", back_populates="citas")
     estado = relationship("Estado", back_populates="citas")
 
+    __table_args__ = (
+        # Listado y exportación por rango de fechas, ordenados por fecha
+        Index("ix_Citas_c_fecha", "c_fecha"),
+        # Conteo y listado de citas por sede y fecha
+        Index("ix_Citas_c_sede_id_c_fecha", "c_sede_id", "c_fecha"),
+        # Conteo de turnos por empresa (join por paciente) y fecha
+        Index("ix_Citas_c_paciente_id_c_fecha", "c_paciente_id", "c_fecha"),
+    )
+
 class Usuario(Base):
     __tablename__ = "Usuarios"
 
@@ -48,8 +58,8 @@ class Usuario(Base):
     usr_name = Column(String, unique=True, index=True)
     usr_password = Column(String)
     rol_id = Column(Integer, ForeignKey("Roles.r_id"), nullable=True)
-    usr_created_at = Column(String, nullable=True)
-    usr_updated_at = Column(String, nullable=True)
+    usr_created_at = Column(DateTime, nullable=True, default=datetime.datetime.now)
+    usr_updated_at = Column(DateTime, nullable=True, default=datetime.datetime.now, onupdate=datetime.datetime.now)
 
     rol = relationship("Rol", back_populates="usuarios")
 
@@ -61,17 +71,34 @@ class Sede(Base):
     sd_direccion = Column(String, nullable=True)
     sd_map_coord = Column(String, nullable=True)
     sd_cant_turnos = Column(Integer, nullable=True)
-    sd_dias_atencion = Column(String, nullable=True) # Días disponibles
-    sd_created_at = Column(String, nullable=True)
-    sd_updated_at = Column(String, nullable=True)
+    sd_dias_atencion = Column(Integer, nullable=True) # Días de atención: bit 0 = lunes ... bit 6 = domingo
+    sd_created_at = Column(DateTime, nullable=True, default=datetime.datetime.now)
+    sd_updated_at = Column(DateTime, nullable=True, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+    citas = relationship("Cita", back_populates="sede")
+
+class ExcepcionAtencion(Base):
+    __tablename__ = "ExcepcionesAtencion"
+
+    # Fechas en que una sede (o todas, con ex_sede_id nulo: festivos) no atiende aunque
+    # el día de la semana esté en sd_dias_atencion, o atiende aunque no lo esté.
+    ex_id = Column(Integer, primary_key=True, index=True)
+    ex_sede_id = Column(Integer, ForeignKey("Sedes.sd_id"), nullable=True)
+    ex_fecha = Column(Date, nullable=False)
+    ex_atiende = Column(Boolean, nullable=False, default=False)
+    ex_descripcion = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("ex_sede_id", "ex_fecha", name="uq_ExcepcionesAtencion_sede_fecha"),
+    )
 
 class Rol(Base):
     __tablename__ = "Roles"
 
     r_id = Column(Integer, primary_key=True, index=True)
     r_name = Column(String(255))
-    r_created_at = Column(String, nullable=True)
-    r_updated_at = Column(String, nullable=True)
+    r_created_at = Column(DateTime, nullable=True, default=datetime.datetime.now)
+    r_updated_at = Column(DateTime, nullable=True, default=datetime.datetime.now, onupdate=datetime.datetime.now)
 
     usuarios = relationship("Usuario", back_populates="rol")
 
@@ -82,3 +109,26 @@ class Estado(Base):
     name = Column(String(255))
 
     citas = relationship("Cita", back_populates="estado")
+
+class CupoDiario(Base):
+    __tablename__ = "CuposDiarios"
+
+    # Contador de turnos ocupados por día. Una fila por sede (cd_empresa_id = 0)
+    # o por empresa (cd_sede_id = 0), mantenida junto con cada cambio en Citas.
+    cd_id = Column(Integer, primary_key=True, index=True)
+    cd_sede_id = Column(Integer, nullable=False, default=0)
+    cd_empresa_id = Column(Integer, nullable=False, default=0)
+    cd_fecha = Column(Date, nullable=False)
+    cd_ocupados = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("cd_sede_id", "cd_empresa_id", "cd_fecha", name="uq_CuposDiarios_clave"),
+    )
+
+class VersionCache(Base):
+    __tablename__ = "VersionesCache"
+
+    # Versión de cada tabla de referencia en caché; se incrementa al modificarla
+    # para que los demás workers descarten su copia en memoria.
+    vc_nombre = Column(String(50), primary_key=True)
+    vc_version = Column(Integer, nullable=False, default=0)
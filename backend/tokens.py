@@ -0,0 +1,79 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import namedtuple
+
+# Clave para firmar los tokens. Si no se define, se genera una por proceso: los tokens
+# dejan de valer al reiniciar y no sirven entre workers, así que en producción debe fijarse.
+TOKEN_SECRET = (os.getenv("TOKEN_SECRET") or secrets.token_urlsafe(32)).encode()
+# Segundos de validez de un token
+TOKEN_TTL = int(os.getenv("TOKEN_TTL", 3600))
+
+Sesion = namedtuple("Sesion", ["usr_id", "usr_name", "rol", "jti", "exp"])
+
+def _b64(datos: bytes) -> str:
+    return base64.urlsafe_b64encode(datos).rstrip(b"=").decode()
+
+def _desde_b64(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+def _firma(carga: str) -> str:
+    return _b64(hmac.new(TOKEN_SECRET, carga.encode(), hashlib.sha256).digest())
+
+class ListaRevocados:
+    """
+    Identificadores (jti) de tokens revocados antes de vencer, en memoria. Cada entrada
+    se descarta cuando el token habría expirado de todas formas, así la lista solo
+    crece con los cierres de sesión de la última TOKEN_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revocados = {}
+
+    def agregar(self, jti: str, exp: int):
+        ahora = time.time()
+        with self._lock:
+            self._revocados = {j: e for j, e in self._revocados.items() if e > ahora}
+            self._revocados[jti] = exp
+
+    def contiene(self, jti: str) -> bool:
+        return jti in self._revocados
+
+    def __len__(self):
+        return len(self._revocados)
+
+revocados = ListaRevocados()
+
+def emitir(usr_id: int, usr_name: str, rol: str | None) -> str:
+    """Token firmado `carga.firma` con la identidad y el rol del usuario."""
+    carga = _b64(json.dumps({
+        "sub": usr_id,
+        "name": usr_name,
+        "rol": rol,
+        "jti": secrets.token_urlsafe(12),
+        "exp": int(time.time()) + TOKEN_TTL,
+    }, separators=(",", ":")).encode())
+    return f"{carga}.{_firma(carga)}"
+
+def verificar(token: str):
+    """Sesión del token si la firma es válida, no venció y no fue revocado; si no, None."""
+    carga, _, firma = token.partition(".")
+    # Se comparan bytes: compare_digest no acepta str con caracteres fuera de ASCII
+    if not firma or not hmac.compare_digest(firma.encode(), _firma(carga).encode()):
+        return None
+    try:
+        datos = json.loads(_desde_b64(carga))
+    except ValueError:
+        return None
+    if datos["exp"] <= time.time() or revocados.contiene(datos["jti"]):
+        return None
+    return Sesion(datos["sub"], datos["name"], datos["rol"], datos["jti"], datos["exp"])
+
+def revocar(sesion: Sesion):
+    revocados.agregar(sesion.jti, sesion.exp)
@@ -0,0 +1,102 @@
+"""
+Prueba de carga de los endpoints de alto tráfico (POST /citas, GET /citas,
+turnos-disponibles y POST /login) con un cliente ASGI local, en modo sync
+(threadpool) y con DB_ASYNC=true, a 50 y 500 clientes concurrentes.
+
+Uso:
+    python -m benchmarks.bench_async [peticiones]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CONCURRENCIAS = [50, 500]
+
+async def cargar(app, peticiones, concurrencia, desplazamiento):
+    import httpx
+
+    transporte = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        # GET /citas exige sesión de Admin o Agente
+        login = await cliente.post("/login", json={"usuario": "agente", "password": "agente123"})
+        sesion = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    semaforo = asyncio.Semaphore(concurrencia)
+    errores = 0
+
+    async def peticion(cliente, indice):
+        nonlocal errores
+        async with semaforo:
+            tipo = indice % 4
+            if tipo == 0:
+                r = await cliente.post("/citas", json={
+                    "nombre_paciente": f"Paciente {indice}",
+                    "cedula_paciente": str(desplazamiento + indice),
+                    "sede": "SEDE RECUERDO",
+                    "laboratorio": "Laboratorio",
+                    "fecha": f"2025-07-{(indice % 28) + 1:02d}",
+                    "empresa_paciente": "EMSSANAR",
+                })
+            elif tipo == 1:
+                r = await cliente.get("/citas", params={"limit": 20}, headers=sesion)
+            elif tipo == 2:
+                r = await cliente.get("/sedes/SEDE RECUERDO/turnos-disponibles", params={"fecha": "2025-07-01"})
+            else:
+                r = await cliente.post("/login", json={"usuario": "agente", "password": "agente123"})
+            if r.status_code >= 500:
+                errores += 1
+
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=120) as cliente:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(peticion(cliente, i) for i in range(peticiones)))
+        duracion = time.perf_counter() - inicio
+    return peticiones / duracion, errores
+
+def trabajador(peticiones):
+    from backend import database, models
+    from backend.main import app, startup_event
+
+    startup_event()
+    db = database.SessionLocal()
+    db.add(models.Sede(sd_nombre="SEDE RECUERDO", sd_cant_turnos=1000))
+    db.add(models.Empresa(em_nombre="EMSSANAR", em_cant_max=1000))
+    db.commit()
+    db.close()
+
+    # Un solo event loop: el pool del motor async queda ligado al loop que lo usa
+    async def niveles():
+        for n, concurrencia in enumerate(CONCURRENCIAS):
+            rps, errores = await cargar(app, peticiones, concurrencia, 40000000 + n * peticiones)
+            print(f"{concurrencia} {rps:.1f} {errores}")
+
+    asyncio.run(niveles())
+
+def main():
+    peticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{peticiones} peticiones por nivel de concurrencia")
+    for modo in ("sync", "async"):
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_async.db')}",
+            DB_ASYNC="true" if modo == "async" else "false",
+            LOGIN_MAX_INTENTOS_IP="1000000",
+            LOGIN_MAX_INTENTOS_USUARIO="1000000",
+            # Hash barato: el benchmark compara sync y async, no el costo de bcrypt
+            BCRYPT_ROUNDS="4",
+        )
+        salida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_async", "--trabajador", str(peticiones)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()
+        for linea in salida[-len(CONCURRENCIAS):]:
+            concurrencia, rps, errores = linea.split()
+            print(f"  {modo:<5} clientes={concurrencia:>3}  {float(rps):8.1f} req/s  errores={errores}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--trabajador":
+        trabajador(int(sys.argv[2]))
+    else:
+        main()
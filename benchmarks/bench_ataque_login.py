@@ -0,0 +1,107 @@
+"""
+Escenario de ataque a POST /login: ráfagas de contraseñas incorrectas desde una IP
+contra muchos usuarios, y desde muchas IPs contra un mismo usuario. Cuenta las
+consultas a la base y los hashes verificados, sin límite y con el límite en memoria
+y en SQLite, para comprobar que se mantienen planos aunque crezcan los intentos.
+
+Uso:
+    python -m benchmarks.bench_ataque_login [intentos]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+MODOS = [
+    ("sin límite", {"LOGIN_MAX_INTENTOS_IP": "1000000000", "LOGIN_MAX_INTENTOS_USUARIO": "1000000000"}),
+    ("memoria", {"LOGIN_LIMITE_STORE": "memoria"}),
+    ("sqlite", {"LOGIN_LIMITE_STORE": "sqlite"}),
+]
+
+async def ataque(app, intentos, ips, usuarios):
+    """`intentos` logins fallidos repartidos entre `ips` IPs y `usuarios` usuarios; retorna los 429."""
+    import httpx
+
+    clientes = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, client=(f"10.0.{i // 250}.{i % 250 + 1}", 40000)),
+            base_url="http://bench"
+        )
+        for i in range(ips)
+    ]
+    semaforo = asyncio.Semaphore(50)
+    rechazados = 0
+
+    async def intento(i):
+        nonlocal rechazados
+        async with semaforo:
+            r = await clientes[i % ips].post(
+                "/login", json={"usuario": f"usuario{i % usuarios}" if usuarios > 1 else "agente", "password": "incorrecta"}
+            )
+            if r.status_code == 429:
+                rechazados += 1
+
+    try:
+        await asyncio.gather(*(intento(i) for i in range(intentos)))
+    finally:
+        for cliente in clientes:
+            await cliente.aclose()
+    return rechazados
+
+def trabajador(intentos):
+    from sqlalchemy import event
+
+    from backend import contrasenas, database
+    from backend.main import app, startup_event
+
+    startup_event()
+    contadores = {"consultas": 0, "hashes": 0}
+
+    @event.listens_for(database.engine, "before_cursor_execute")
+    def contar_consulta(conn, cursor, statement, parameters, context, executemany):
+        contadores["consultas"] += 1
+
+    verificar = contrasenas.verificar
+
+    def verificar_contando(*args):
+        contadores["hashes"] += 1
+        return verificar(*args)
+
+    contrasenas.verificar = verificar_contando
+
+    escenarios = [
+        ("1 IP, muchos usuarios", 1, intentos),
+        ("muchas IPs, 1 usuario", intentos // 5, 1),
+    ]
+    for nombre, ips, usuarios in escenarios:
+        contadores["consultas"] = contadores["hashes"] = 0
+        rechazados = asyncio.run(ataque(app, intentos, ips, usuarios))
+        print(f"{nombre}|{rechazados}|{contadores['consultas']}|{contadores['hashes']}")
+
+def main():
+    intentos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"{intentos} intentos fallidos por escenario")
+    for modo, variables in MODOS:
+        directorio = tempfile.mkdtemp()
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(directorio, 'bench_ataque.db')}",
+            LOGIN_LIMITE_SQLITE_PATH=os.path.join(directorio, "limite_login.db"),
+            # Costo mínimo: interesa cuántos hashes se calculan, no cuánto tarda cada uno
+            BCRYPT_ROUNDS="4",
+            **variables
+        )
+        salida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_ataque_login", "--trabajador", str(intentos)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()
+        for linea in salida[-2:]:
+            escenario, rechazados, consultas, hashes = linea.split("|")
+            print(f"  {modo:<10} {escenario:<22} rechazados={rechazados:>5}  consultas={consultas:>5}  hashes={hashes:>5}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--trabajador":
+        trabajador(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,121 @@
+"""
+Prueba de carga que maneja la API con el mismo ClienteAPI que usa el frontend: cada
+usuario virtual inicia sesión, carga sedes, empresas y disponibilidad como el formulario
+de agendar, crea una cita, la busca en el listado, la edita y la elimina. Al final
+informa la latencia por endpoint (histograma del cliente) y los GET compartidos.
+
+Sin --url corre el backend en proceso (ASGI) sobre una base SQLite temporal.
+
+Uso:
+    python -m benchmarks.bench_cliente_api [usuarios] [iteraciones] [--url http://host:puerto]
+"""
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_cliente_api.db')}")
+os.environ.setdefault("LOGIN_MAX_INTENTOS_IP", "1000000")
+os.environ.setdefault("LOGIN_MAX_INTENTOS_USUARIO", "1000000")
+
+import httpx
+
+from frontend.cliente_api import ClienteAPI, ErrorAPI, HistogramaLatencia
+
+SEDE = "SEDE RECUERDO"
+EMPRESA = "EMSSANAR"
+DESDE = datetime.date(2025, 7, 1)
+
+def preparar_backend():
+    from backend import database, models
+    from backend.main import app, startup_event
+
+    startup_event()
+    db = database.SessionLocal()
+    if not db.query(models.Sede).filter(models.Sede.sd_nombre == SEDE).first():
+        db.add(models.Sede(sd_nombre=SEDE, sd_cant_turnos=100000))
+        db.add(models.Empresa(em_nombre=EMPRESA, em_cant_max=100000))
+        db.commit()
+    db.close()
+    return app
+
+async def usuario_virtual(api, numero, iteraciones):
+    await api.login("agente", "agente123")
+    for i in range(iteraciones):
+        fecha = DESDE + datetime.timedelta(days=(numero + i) % 28)
+        cedula = f"9{numero:05d}{i:04d}"
+        # Lo que hace el formulario de agendar al abrirse
+        await asyncio.gather(api.sedes(), api.empresas())
+        await api.disponibilidad(DESDE, DESDE + datetime.timedelta(days=89), sede=SEDE, empresa=EMPRESA)
+        await api.turnos_sede(SEDE, fecha)
+
+        creada = await api.crear_cita(f"Paciente {cedula}", cedula, SEDE, "Laboratorio", fecha, EMPRESA)
+        await api.citas(limit=20)
+        await api.citas(cedula=cedula)
+        await api.actualizar_cita(creada.cita_id, fecha, "Confirmada")
+        await api.eliminar_cita(creada.cita_id)
+    await api.logout()
+
+def combinar(clientes):
+    """Suma los histogramas por endpoint de todos los usuarios virtuales."""
+    total = {}
+    for api in clientes:
+        for endpoint, histograma in api.latencias.items():
+            acumulado = total.setdefault(endpoint, HistogramaLatencia())
+            acumulado.conteos = [a + b for a, b in zip(acumulado.conteos, histograma.conteos)]
+            acumulado.total += histograma.total
+            acumulado.suma_ms += histograma.suma_ms
+            acumulado.maximo_ms = max(acumulado.maximo_ms, histograma.maximo_ms)
+    return total
+
+async def cargar(usuarios, iteraciones, url):
+    if url:
+        clientes = [ClienteAPI(url) for _ in range(usuarios)]
+    else:
+        app = preparar_backend()
+        clientes = [
+            ClienteAPI("http://bench", transporte=httpx.ASGITransport(app=app))
+            for _ in range(usuarios)
+        ]
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(
+        *(usuario_virtual(api, n, iteraciones) for n, api in enumerate(clientes)),
+        return_exceptions=True
+    )
+    duracion = time.perf_counter() - inicio
+    for api in clientes:
+        await api.cerrar()
+
+    fallidos = [r for r in resultados if isinstance(r, Exception)]
+    for error in fallidos[:5]:
+        print(f"  usuario con error: {error if isinstance(error, ErrorAPI) else repr(error)}")
+
+    latencias = combinar(clientes)
+    llamadas = sum(h.total for h in latencias.values())
+    print(f"  {llamadas} llamadas en {duracion:.2f} s ({llamadas / duracion:.1f} req/s), usuarios con error: {len(fallidos)}")
+    print(f"  {'endpoint':<46} {'llamadas':>8} {'media':>9} {'p50':>6} {'p95':>6} {'p99':>6} {'max':>9}")
+    for endpoint, histograma in sorted(latencias.items()):
+        r = histograma.resumen()
+        print(
+            f"  {endpoint:<46} {r['llamadas']:>8} {r['media_ms']:>9.3f} {r['p50_ms']:>6} "
+            f"{r['p95_ms']:>6} {r['p99_ms']:>6} {r['max_ms']:>9.3f}"
+        )
+    print(f"  GET compartidos con otro en curso: {sum(api.coalescidas for api in clientes)}")
+
+def main():
+    argumentos = sys.argv[1:]
+    url = None
+    if "--url" in argumentos:
+        posicion = argumentos.index("--url")
+        url = argumentos[posicion + 1]
+        del argumentos[posicion:posicion + 2]
+    usuarios = int(argumentos[0]) if len(argumentos) > 0 else 20
+    iteraciones = int(argumentos[1]) if len(argumentos) > 1 else 10
+    print(f"{usuarios} usuarios virtuales x {iteraciones} iteraciones contra {url or 'backend en proceso (ASGI)'}")
+    asyncio.run(cargar(usuarios, iteraciones, url))
+
+if __name__ == "__main__":
+    main()
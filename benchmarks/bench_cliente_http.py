@@ -0,0 +1,96 @@
+"""
+Benchmark del cliente HTTP del frontend contra un servidor local que imita al backend
+(HTTP/1.1 con keep-alive y una respuesta JSON del tamaño de /sedes). Compara la latencia
+por llamada de crear un cliente nuevo en cada petición, como hacían las vistas con
+httpx.get(...) y `async with httpx.AsyncClient()`, frente al ClienteAPI compartido de la
+sesión, que reutiliza las conexiones abiertas.
+
+Uso:
+    python -m benchmarks.bench_cliente_http [llamadas]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from frontend.cliente_api import ClienteAPI, http2_disponible
+
+CUERPO = json.dumps([
+    {"id": i, "nombre": f"SEDE {i}", "cant_turnos": 40, "dias_atencion": ["Lunes", "Martes"], "dias_atencion_mask": 3}
+    for i in range(20)
+]).encode()
+
+class ServidorSimulado(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo salen en escrituras separadas; sin TCP_NODELAY el ACK retrasado suma ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(CUERPO)))
+        self.end_headers()
+        self.wfile.write(CUERPO)
+
+    def log_message(self, *args):
+        pass
+
+def iniciar_servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), ServidorSimulado)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+def informar(nombre, tiempos):
+    tiempos = sorted(tiempos)
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+    print(f"  {nombre:<38} media {statistics.mean(tiempos) * 1000:6.3f} ms   p95 {p95 * 1000:6.3f} ms")
+
+def medir_sync(llamar, llamadas):
+    tiempos = []
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        respuesta = llamar()
+        respuesta.raise_for_status()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+async def medir_async(llamar, llamadas):
+    tiempos = []
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        respuesta = await llamar()
+        respuesta.raise_for_status()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+async def cliente_nuevo_async(url):
+    async with httpx.AsyncClient() as client:
+        return await client.get(f"{url}/sedes", timeout=5.0)
+
+async def main_async(url, llamadas):
+    informar("async: AsyncClient nuevo por llamada", await medir_async(lambda: cliente_nuevo_async(url), llamadas))
+    api = ClienteAPI(url)
+    try:
+        await api.request("GET", "/sedes")
+        informar("async: ClienteAPI compartido", await medir_async(lambda: api.request("GET", "/sedes"), llamadas))
+    finally:
+        await api.cerrar()
+
+def main():
+    llamadas = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    servidor, url = iniciar_servidor()
+    print(f"{llamadas} llamadas GET /sedes a {url} (HTTP/2 disponible: {http2_disponible()})")
+    try:
+        informar("sync: httpx.get por llamada", medir_sync(lambda: httpx.get(f"{url}/sedes", timeout=5.0), llamadas))
+        asyncio.run(main_async(url, llamadas))
+    finally:
+        servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Micro-benchmark de la verificación de días de atención por fecha: el texto
+"Lunes, Martes, ..." separado en cada consulta (como se hacía al elegir una fecha)
+frente a la máscara de 7 bits más la búsqueda de festivos en la caché de excepciones.
+
+Uso:
+    python -m benchmarks.bench_dias_atencion [iteraciones] [excepciones]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_dias_atencion.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from backend import cache, database, disponibilidad, models
+
+TEXTO = "Lunes, Martes, Miércoles, Jueves, Viernes"
+DESDE = datetime.date(2025, 1, 1)
+
+def atiende_texto(texto, fecha):
+    """Verificación anterior: separar el texto y buscar el nombre del día."""
+    if not texto:
+        return True
+    dias_config = [d.strip() for d in texto.split(",")]
+    return disponibilidad.DIAS_SEMANA[fecha.weekday()] in dias_config
+
+def medir(nombre, funcion, fechas):
+    inicio = time.perf_counter()
+    for fecha in fechas:
+        funcion(fecha)
+    por_llamada = (time.perf_counter() - inicio) / len(fechas) * 1e6
+    print(f"  {nombre:<44} {por_llamada:7.3f} µs/fecha")
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cantidad_excepciones = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(models.Sede.__table__.insert(), [
+            {"sd_id": 1, "sd_nombre": "SEDE RECUERDO", "sd_dias_atencion": disponibilidad.mascara_dias(TEXTO)}
+        ])
+        # Festivos generales y cierres propios de la sede repartidos en varios años
+        conn.execute(models.ExcepcionAtencion.__table__.insert(), [
+            {"ex_sede_id": None if i % 2 else 1, "ex_fecha": DESDE + datetime.timedelta(days=i * 3), "ex_atiende": False}
+            for i in range(cantidad_excepciones)
+        ])
+
+    db = database.SessionLocal()
+    try:
+        sede = cache.sedes.por_id(db, 1)
+        fechas = [DESDE + datetime.timedelta(days=i % 730) for i in range(iteraciones)]
+        print(f"{iteraciones} fechas, {cantidad_excepciones} excepciones")
+        medir("texto separado en cada consulta", lambda fecha: atiende_texto(TEXTO, fecha), fechas)
+        medir("máscara", lambda fecha: disponibilidad.atiende(sede.sd_dias_atencion, fecha), fechas)
+        medir("máscara + excepción en caché", lambda fecha: disponibilidad.atiende(
+            sede.sd_dias_atencion, fecha, cache.excepciones.en_fecha(db, sede.sd_id, fecha)
+        ), fechas)
+
+        inicio = time.perf_counter()
+        repeticiones = 200
+        for _ in range(repeticiones):
+            disponibilidad.disponibilidad_rango(db, DESDE, DESDE + datetime.timedelta(days=365), sede=sede)
+        print(f"  disponibilidad de un año con excepciones       {(time.perf_counter() - inicio) / repeticiones * 1000:7.3f} ms")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
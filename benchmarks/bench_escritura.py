@@ -0,0 +1,79 @@
+"""
+Compara el rendimiento de escritura (POST /citas vía crear_cita) de SQLite según la
+configuración de backend/database.py: journal DELETE/FULL (lo que había antes),
+WAL/FULL y WAL/NORMAL (valor por defecto). Cada modo corre en un proceso aparte
+con sus variables de entorno y una base nueva.
+
+Uso:
+    python -m benchmarks.bench_escritura [citas] [hilos]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MODOS = [
+    ("DELETE", "FULL"),
+    ("WAL", "FULL"),
+    ("WAL", "NORMAL"),
+]
+
+def trabajador(citas, hilos):
+    from fastapi import HTTPException
+    from backend import database, models
+    from backend.main import CitaCreate, crear_cita, startup_event
+
+    startup_event()
+    db = database.SessionLocal()
+    db.add(models.Sede(sd_nombre="SEDE RECUERDO"))
+    db.commit()
+    db.close()
+
+    def reservar(indice):
+        db = database.SessionLocal()
+        try:
+            crear_cita(CitaCreate(
+                nombre_paciente=f"Paciente {indice}",
+                cedula_paciente=str(30000000 + indice),
+                sede="SEDE RECUERDO",
+                laboratorio="Laboratorio",
+                fecha=f"2025-06-{(indice % 28) + 1:02d}",
+                empresa_paciente="EMSSANAR" if indice % 2 else None,
+            ), db)
+        except HTTPException:
+            pass
+        finally:
+            db.close()
+
+    # La primera reserva crea la empresa; no se cuenta en la medición
+    reservar(citas + 1)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(reservar, range(citas)))
+    duracion = time.perf_counter() - inicio
+    print(f"{citas / duracion:.1f}")
+
+def main():
+    citas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"{citas} citas con {hilos} hilos")
+    for journal, synchronous in MODOS:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_escritura.db')}",
+            SQLITE_JOURNAL_MODE=journal,
+            SQLITE_SYNCHRONOUS=synchronous,
+        )
+        salida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_escritura", "--trabajador", str(citas), str(hilos)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        print(f"  journal={journal:<6} synchronous={synchronous:<6} {salida:>9} citas/s")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--trabajador":
+        trabajador(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        main()
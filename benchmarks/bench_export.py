@@ -0,0 +1,96 @@
+"""
+Exporta 500k citas con la generación en streaming de GET /citas/export y mide el pico
+de memoria (RSS) frente a materializar el listado completo como lo hacía GET /citas.
+La siembra corre en otro proceso para no dejar memoria del proceso ya usada antes de medir.
+
+Uso:
+    python -m benchmarks.bench_export [citas]
+"""
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# El proceso de siembra recibe la misma base por el entorno
+DB_PATH = os.environ.get("BENCH_EXPORT_DB") or os.path.join(tempfile.mkdtemp(), "bench_export.db")
+os.environ["BENCH_EXPORT_DB"] = DB_PATH
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from backend import database, models
+from backend.main import consultar_citas, exportar_filas, serializar_cita
+
+LOTE_SIEMBRA = 50_000
+# Margen de memoria aceptado para la exportación, independiente del número de filas
+LIMITE_RSS_MB = 64
+
+def rss_mb():
+    """
+    RSS actual sin las páginas de archivos (/proc/self/statm: resident - shared). El mmap de
+    SQLite (SQLITE_MMAP_SIZE) mapea la base y esas páginas son caché del kernel, no memoria
+    retenida por la exportación.
+    """
+    with open("/proc/self/statm") as f:
+        _, residentes, compartidas = f.read().split()[:3]
+    return (int(residentes) - int(compartidas)) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def sembrar(cantidad):
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(models.Estado.__table__.insert(), [{"id": 1, "name": "Pendiente"}])
+        conn.execute(models.Empresa.__table__.insert(), [{"em_id": 1, "em_nombre": "EMSSANAR"}])
+        conn.execute(models.Sede.__table__.insert(), [{"sd_id": 1, "sd_nombre": "SEDE RECUERDO"}])
+        for inicio in range(0, cantidad, LOTE_SIEMBRA):
+            fin = min(inicio + LOTE_SIEMBRA, cantidad)
+            conn.execute(models.Paciente.__table__.insert(), [
+                {"pt_id": i + 1, "pt_nombre": f"Paciente {i + 1}", "pt_cedula": str(10000000 + i), "pt_empresa_id": 1 if i % 2 else None}
+                for i in range(inicio, fin)
+            ])
+            conn.execute(models.Cita.__table__.insert(), [
+                {
+                    "c_paciente_id": i + 1,
+                    "c_sede_id": 1,
+                    "c_laboratorio": "Laboratorio",
+                    "c_fecha": datetime.date(2025, (i % 12) + 1, (i % 28) + 1),
+                    "c_estado_id": 1,
+                }
+                for i in range(inicio, fin)
+            ])
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--sembrar", str(cantidad)], check=True)
+    base = rss_mb()
+    print(f"Citas sembradas: {cantidad}. RSS base: {base:.1f} MB")
+
+    pico = base
+    for formato in ("csv", "ndjson"):
+        inicio = time.perf_counter()
+        total_bytes = 0
+        pico_formato = rss_mb()
+        for parte in exportar_filas(formato, {}):
+            total_bytes += len(parte)
+            pico_formato = max(pico_formato, rss_mb())
+        duracion = time.perf_counter() - inicio
+        pico = max(pico, pico_formato)
+        print(f"  export {formato:<6} {total_bytes / 1e6:8.1f} MB en {duracion:6.2f}s  RSS pico: {pico_formato:.1f} MB")
+
+    crecimiento = pico - base
+    assert crecimiento < LIMITE_RSS_MB, f"La exportación creció {crecimiento:.1f} MB de RSS"
+
+    db = database.SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        listado = [serializar_cita(f) for f in consultar_citas(db).all()]
+        duracion = time.perf_counter() - inicio
+    finally:
+        db.close()
+    print(f"  listado completo ({len(listado)} filas) en {duracion:6.2f}s  RSS: {rss_mb():.1f} MB")
+    print(f"OK: la exportación se mantuvo dentro de {LIMITE_RSS_MB} MB sobre la base.")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--sembrar":
+        sembrar(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,117 @@
+"""
+Benchmark de las fechas tipadas: siembra una base con c_fecha como texto (con parte de
+las filas en otros formatos, como los enviaban algunos clientes), mide el listado de
+una semana y el conteo de un mes con filtros por rango, aplica la conversión por lotes
+a DATE y repite las mismas consultas. Informa también cuántas citas del mes quedaban
+fuera del rango al comparar texto y el plan de consulta de cada caso.
+
+Uso:
+    python -m benchmarks.bench_fechas [citas]
+"""
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_fechas.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import text
+
+from backend import database, migrations, models
+
+INICIO = datetime.date(2025, 1, 1)
+DIAS = 365
+CONSULTAS = 500
+MES = (datetime.date(2025, 6, 1), datetime.date(2025, 6, 30))
+
+LISTADO_SEMANA = text(
+    'SELECT c_id, c_fecha, c_sede_id FROM "Citas" WHERE c_fecha >= :desde AND c_fecha <= :hasta '
+    'ORDER BY c_fecha, c_id LIMIT 51'
+)
+CONTEO_RANGO = text('SELECT COUNT(*) FROM "Citas" WHERE c_fecha >= :desde AND c_fecha <= :hasta')
+
+def crear_base_antigua(cantidad):
+    """Esquema con c_fecha VARCHAR; retorna las fechas reales de las citas sembradas."""
+    azar = random.Random(7)
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript("""
+        CREATE TABLE "Paciente" (pt_id INTEGER PRIMARY KEY, pt_nombre VARCHAR, pt_cedula VARCHAR UNIQUE,
+            pt_empresa_id INTEGER);
+        CREATE TABLE "Citas" (c_id INTEGER PRIMARY KEY, c_paciente_id INTEGER REFERENCES "Paciente"(pt_id),
+            c_sede_id INTEGER, c_laboratorio VARCHAR, c_fecha VARCHAR, c_estado_id INTEGER,
+            c_created_at VARCHAR, c_updated_at VARCHAR);
+        CREATE INDEX "ix_Citas_c_sede_id_c_fecha" ON "Citas" (c_sede_id, c_fecha);
+        CREATE INDEX "ix_Citas_c_paciente_id_c_fecha" ON "Citas" (c_paciente_id, c_fecha);
+    """)
+    conn.executemany('INSERT INTO "Paciente" (pt_id, pt_nombre, pt_cedula) VALUES (?, ?, ?)', [
+        (i + 1, f"Paciente {i + 1}", str(10000000 + i)) for i in range(cantidad // 3)
+    ])
+    fechas, filas = [], []
+    for i in range(cantidad):
+        fecha = INICIO + datetime.timedelta(days=azar.randrange(DIAS))
+        fechas.append(fecha)
+        # Una de cada veinte citas llegó como dd/mm/aaaa y otra sin ceros a la izquierda
+        if i % 20 == 0:
+            texto = fecha.strftime("%d/%m/%Y")
+        elif i % 20 == 1:
+            texto = f"{fecha.year}-{fecha.month}-{fecha.day}"
+        else:
+            texto = fecha.isoformat()
+        filas.append((i % (cantidad // 3) + 1, azar.randrange(8) + 1, "Laboratorio", texto, 1))
+    conn.executemany(
+        'INSERT INTO "Citas" (c_paciente_id, c_sede_id, c_laboratorio, c_fecha, c_estado_id) VALUES (?, ?, ?, ?, ?)',
+        filas
+    )
+    conn.commit()
+    conn.close()
+    return fechas
+
+def medir(nombre, conn, sentencia, rangos, consultas=CONSULTAS):
+    inicio = time.perf_counter()
+    for desde, hasta in rangos[:consultas]:
+        conn.execute(sentencia, {"desde": desde, "hasta": hasta}).all()
+    por_consulta = (time.perf_counter() - inicio) / consultas * 1000
+    print(f"  {nombre:<34} {por_consulta:7.3f} ms/consulta")
+
+def plan(conn, sentencia):
+    filas = conn.execute(text(f"EXPLAIN QUERY PLAN {sentencia.text}"), {"desde": "", "hasta": ""}).all()
+    return " / ".join(fila[-1] for fila in filas)
+
+def ejecutar_consultas(conn, fechas):
+    azar = random.Random(11)
+    semanas = []
+    for _ in range(CONSULTAS):
+        desde = INICIO + datetime.timedelta(days=azar.randrange(DIAS - 7))
+        semanas.append((desde.isoformat(), (desde + datetime.timedelta(days=6)).isoformat()))
+    medir("listado de una semana (50 filas)", conn, LISTADO_SEMANA, semanas)
+    medir("conteo de un mes", conn, CONTEO_RANGO, [(MES[0].isoformat(), MES[1].isoformat())] * CONSULTAS)
+
+    esperadas = sum(1 for f in fechas if MES[0] <= f <= MES[1])
+    encontradas = conn.execute(CONTEO_RANGO, {"desde": MES[0].isoformat(), "hasta": MES[1].isoformat()}).scalar()
+    print(f"  citas de junio encontradas: {encontradas} de {esperadas}")
+    print(f"  plan del listado: {plan(conn, LISTADO_SEMANA)}")
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    fechas = crear_base_antigua(cantidad)
+    print(f"Citas sembradas con c_fecha como texto: {cantidad}")
+
+    print("Antes (texto):")
+    with database.engine.connect() as conn:
+        ejecutar_consultas(conn, fechas)
+
+    inicio = time.perf_counter()
+    models.Base.metadata.create_all(bind=database.engine)
+    migrations.aplicar_migraciones(database.engine)
+    print(f"Migración: {time.perf_counter() - inicio:.2f}s (lotes de {migrations.LOTE_MIGRACION} filas)")
+
+    print("Después (DATE):")
+    with database.engine.connect() as conn:
+        ejecutar_consultas(conn, fechas)
+
+if __name__ == "__main__":
+    main()
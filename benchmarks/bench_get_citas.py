@@ -0,0 +1,118 @@
+"""
+Benchmark de GET /citas: compara la lectura anterior (N+1 consultas por cita)
+con la lectura unificada de backend.main.consultar_citas.
+
+Uso:
+    python -m benchmarks.bench_get_citas            # 10k y 100k citas
+    python -m benchmarks.bench_get_citas 5000 20000
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_citas.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import event
+
+from backend import catalogos, database, models
+from backend.main import consultar_citas, serializar_cita
+
+# Contador de sentencias ejecutadas contra el motor
+consultas = {"total": 0}
+
+@event.listens_for(database.engine, "before_cursor_execute")
+def contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    consultas["total"] += 1
+
+def get_citas_anterior(db):
+    """Implementación original: una consulta por paciente, estado y empresa en cada fila."""
+    citas = db.query(models.Cita).all()
+    resultado = []
+    for c in citas:
+        paciente = db.query(models.Paciente).filter(models.Paciente.pt_id == c.c_paciente_id).first()
+        estado = db.query(models.Estado).filter(models.Estado.id == c.c_estado_id).first()
+        sede = db.query(models.Sede).filter(models.Sede.sd_id == c.c_sede_id).first()
+
+        empresa_nombre = "Particular"
+        if paciente and paciente.pt_empresa_id:
+            empresa = db.query(models.Empresa).filter(models.Empresa.em_id == paciente.pt_empresa_id).first()
+            if empresa:
+                empresa_nombre = empresa.em_nombre
+
+        resultado.append({
+            "id": c.c_id,
+            "paciente_nombre": paciente.pt_nombre if paciente else "Desconocido",
+            "paciente_cedula": paciente.pt_cedula if paciente else "Desconocido",
+            "empresa": empresa_nombre,
+            "sede": sede.sd_nombre if sede else None,
+            "laboratorio": c.c_laboratorio,
+            "fecha": c.c_fecha.isoformat(),
+            "estado": estado.name if estado else None
+        })
+    return resultado
+
+def get_citas_unificado(db):
+    return [serializar_cita(f) for f in consultar_citas(db).order_by(models.Cita.c_id).all()]
+
+def sembrar(cantidad):
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(models.Estado.__table__.insert(), [
+            {"id": i + 1, "name": n} for i, n in enumerate(["Pendiente", "Confirmada", "Cancelada", "No asistió"])
+        ])
+        conn.execute(models.Empresa.__table__.insert(), [
+            {"em_id": i + 1, "em_nombre": f"EMPRESA {i + 1}"} for i in range(20)
+        ])
+        conn.execute(models.Sede.__table__.insert(), [{"sd_id": 1, "sd_nombre": "SEDE RECUERDO"}])
+        pacientes = max(1, cantidad // 2)
+        conn.execute(models.Paciente.__table__.insert(), [
+            {
+                "pt_id": i + 1,
+                "pt_nombre": f"Paciente {i + 1}",
+                "pt_cedula": str(10000000 + i),
+                "pt_empresa_id": (i % 21) or None,
+            }
+            for i in range(pacientes)
+        ])
+        conn.execute(models.Cita.__table__.insert(), [
+            {
+                "c_paciente_id": (i % pacientes) + 1,
+                "c_sede_id": 1,
+                "c_laboratorio": "Laboratorio",
+                "c_fecha": datetime.date(2025, 1, (i % 28) + 1),
+                "c_estado_id": (i % 4) + 1,
+            }
+            for i in range(cantidad)
+        ])
+
+def medir(nombre, funcion):
+    db = database.SessionLocal()
+    try:
+        consultas["total"] = 0
+        inicio = time.perf_counter()
+        filas = funcion(db)
+        duracion = time.perf_counter() - inicio
+    finally:
+        db.close()
+    print(f"  {nombre:<10} filas={len(filas):>7}  consultas={consultas['total']:>7}  tiempo={duracion:8.3f}s")
+    return filas
+
+def main():
+    tamanos = [int(a) for a in sys.argv[1:]] or [10_000, 100_000]
+    for cantidad in tamanos:
+        print(f"Citas sembradas: {cantidad}")
+        sembrar(cantidad)
+        db = database.SessionLocal()
+        catalogos.cargar_catalogos(db)
+        db.close()
+        anterior = medir("anterior", get_citas_anterior)
+        unificado = medir("unificado", get_citas_unificado)
+        if anterior != unificado:
+            print("  ADVERTENCIA: las respuestas difieren")
+
+if __name__ == "__main__":
+    main()
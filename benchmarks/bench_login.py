@@ -0,0 +1,95 @@
+"""
+Benchmark de POST /login según el costo del hash: logins por segundo con 32 clientes
+concurrentes y, a la vez, la latencia de GET /sedes para comprobar que el hashing en
+el pool de contraseñas no deja sin atender a los demás endpoints.
+
+Uso:
+    python -m benchmarks.bench_login [logins]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CONFIGURACIONES = [
+    ("bcrypt", {"PASSWORD_SCHEME": "bcrypt", "BCRYPT_ROUNDS": "10"}),
+    ("bcrypt", {"PASSWORD_SCHEME": "bcrypt", "BCRYPT_ROUNDS": "11"}),
+    ("bcrypt", {"PASSWORD_SCHEME": "bcrypt", "BCRYPT_ROUNDS": "12"}),
+    ("bcrypt", {"PASSWORD_SCHEME": "bcrypt", "BCRYPT_ROUNDS": "13"}),
+    ("argon2", {"PASSWORD_SCHEME": "argon2", "ARGON2_TIME_COST": "2", "ARGON2_MEMORY_COST": "19456"}),
+    ("argon2", {"PASSWORD_SCHEME": "argon2", "ARGON2_TIME_COST": "3", "ARGON2_MEMORY_COST": "65536"}),
+]
+CONCURRENCIA = 32
+
+async def cargar(app, logins):
+    import httpx
+
+    semaforo = asyncio.Semaphore(CONCURRENCIA)
+    latencias_sedes = []
+    terminado = asyncio.Event()
+
+    async def login(cliente):
+        async with semaforo:
+            r = await cliente.post("/login", json={"usuario": "agente", "password": "agente123"})
+            assert r.status_code == 200, r.text
+
+    async def sondeo(cliente):
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            await cliente.get("/sedes")
+            latencias_sedes.append((time.perf_counter() - inicio) * 1000)
+            await asyncio.sleep(0.01)
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=300) as cliente:
+        tarea_sondeo = asyncio.create_task(sondeo(cliente))
+        inicio = time.perf_counter()
+        await asyncio.gather(*(login(cliente) for _ in range(logins)))
+        duracion = time.perf_counter() - inicio
+        terminado.set()
+        await tarea_sondeo
+    latencias_sedes.sort()
+    p95 = latencias_sedes[int(len(latencias_sedes) * 0.95) - 1] if latencias_sedes else 0.0
+    return logins / duracion, statistics.median(latencias_sedes) if latencias_sedes else 0.0, p95
+
+def trabajador(logins):
+    from backend import contrasenas
+    from backend.main import app, startup_event
+
+    startup_event()
+    inicio = time.perf_counter()
+    contrasenas.verificar("agente123", contrasenas.hashear("agente123"))
+    un_hash = (time.perf_counter() - inicio) * 1000 / 2
+    rps, mediana, p95 = asyncio.run(cargar(app, logins))
+    print(f"{un_hash:.1f} {rps:.1f} {mediana:.2f} {p95:.2f}")
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(f"{logins} logins por configuración, {CONCURRENCIA} clientes, "
+          f"PASSWORD_HASH_WORKERS={os.getenv('PASSWORD_HASH_WORKERS', 'por defecto')}")
+    for esquema, variables in CONFIGURACIONES:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_login.db')}",
+            # Se mide el costo del hash, no el límite de intentos
+            LOGIN_MAX_INTENTOS_IP="1000000",
+            LOGIN_MAX_INTENTOS_USUARIO="1000000",
+            **variables
+        )
+        salida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_login", "--trabajador", str(logins)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        un_hash, rps, mediana, p95 = (float(v) for v in salida.split())
+        costo = ", ".join(f"{k}={v}" for k, v in variables.items() if k != "PASSWORD_SCHEME")
+        print(f"  {esquema:<6} {costo:<42} hash={un_hash:7.1f} ms  {rps:7.1f} logins/s  "
+              f"GET /sedes mediana={mediana:6.2f} ms p95={p95:6.2f} ms")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--trabajador":
+        trabajador(int(sys.argv[2]))
+    else:
+        main()
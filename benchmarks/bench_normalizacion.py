@@ -0,0 +1,139 @@
+"""
+Benchmark de la normalización de Citas (c_sede y c_estado como texto -> c_sede_id y
+c_estado_id): siembra una base con el esquema anterior, mide conteos por sede y fecha
+y el listado filtrado por sede y estado, aplica la migración por lotes y repite las
+mismas consultas con las columnas enteras.
+
+Uso:
+    python -m benchmarks.bench_normalizacion [citas]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_normalizacion.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import text
+
+from backend import catalogos, database, migrations, models
+
+SEDES = [f"SEDE {n}" for n in ("RECUERDO", "CENTRO", "NORTE", "SUR", "ORIENTE", "OCCIDENTE", "PANAMERICANA", "TOROBAJO")]
+ESTADOS = ["Pendiente", "Confirmada", "Cancelada", "No asistió"]
+FECHAS = [f"2025-{m:02d}-{d:02d}" for m in range(1, 13) for d in range(1, 29)]
+CONSULTAS = 2000
+
+def crear_base_antigua(cantidad):
+    """Esquema y datos como los dejaba la versión anterior, incluida la deriva entre c_estado y c_estado_id."""
+    azar = random.Random(7)
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript("""
+        CREATE TABLE "Sedes" (sd_id INTEGER PRIMARY KEY, sd_nombre VARCHAR(255) UNIQUE, sd_direccion VARCHAR,
+            sd_map_coord VARCHAR, sd_cant_turnos INTEGER, sd_dias_atencion VARCHAR, sd_created_at VARCHAR,
+            sd_updated_at VARCHAR);
+        CREATE TABLE "Estados" (id INTEGER PRIMARY KEY, name VARCHAR(255));
+        CREATE TABLE "Paciente" (pt_id INTEGER PRIMARY KEY, pt_nombre VARCHAR, pt_cedula VARCHAR UNIQUE,
+            pt_empresa_id INTEGER);
+        CREATE TABLE "Citas" (c_id INTEGER PRIMARY KEY, c_paciente_id INTEGER REFERENCES "Paciente"(pt_id),
+            c_sede VARCHAR, c_laboratorio VARCHAR, c_fecha VARCHAR, c_estado VARCHAR,
+            c_estado_id INTEGER REFERENCES "Estados"(id), c_created_at VARCHAR, c_updated_at VARCHAR);
+        CREATE INDEX "ix_Citas_c_sede_c_fecha" ON "Citas" (c_sede, c_fecha);
+        CREATE TABLE "CuposDiarios" (cd_id INTEGER PRIMARY KEY, cd_sede VARCHAR NOT NULL, cd_empresa_id INTEGER NOT NULL,
+            cd_fecha VARCHAR NOT NULL, cd_ocupados INTEGER NOT NULL, UNIQUE (cd_sede, cd_empresa_id, cd_fecha));
+    """)
+    conn.executemany('INSERT INTO "Sedes" (sd_nombre) VALUES (?)', [(s,) for s in SEDES[:-1]])
+    conn.executemany('INSERT INTO "Estados" (id, name) VALUES (?, ?)', list(enumerate(ESTADOS, start=1)))
+    conn.executemany('INSERT INTO "Paciente" (pt_id, pt_nombre, pt_cedula) VALUES (?, ?, ?)', [
+        (i + 1, f"Paciente {i + 1}", str(10000000 + i)) for i in range(cantidad // 3)
+    ])
+    filas = []
+    for i in range(cantidad):
+        estado_id = azar.randrange(len(ESTADOS)) + 1
+        # PUT /citas solo actualizaba el texto: parte de las filas quedó con el id desfasado
+        estado = ESTADOS[azar.randrange(len(ESTADOS))] if i % 10 == 0 else ESTADOS[estado_id - 1]
+        # La última sede solo existe como texto en Citas
+        filas.append((i % (cantidad // 3) + 1, SEDES[i % len(SEDES)], "Laboratorio", azar.choice(FECHAS), estado, estado_id))
+    conn.executemany(
+        'INSERT INTO "Citas" (c_paciente_id, c_sede, c_laboratorio, c_fecha, c_estado, c_estado_id) VALUES (?, ?, ?, ?, ?, ?)',
+        filas
+    )
+    conn.commit()
+    conn.close()
+    return {(i + 1): (f[1], f[4]) for i, f in enumerate(filas)}
+
+def tamano_indice(conn, nombre):
+    """Bytes ocupados por un índice según la tabla virtual dbstat de SQLite."""
+    return conn.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = :nombre"), {"nombre": nombre}).scalar() or 0
+
+def medir(nombre, funcion, consultas=CONSULTAS):
+    azar = random.Random(11)
+    argumentos = [(azar.choice(SEDES), azar.choice(FECHAS), azar.choice(ESTADOS)) for _ in range(consultas)]
+    inicio = time.perf_counter()
+    for sede, fecha, estado in argumentos:
+        funcion(sede, fecha, estado)
+    por_consulta = (time.perf_counter() - inicio) / consultas * 1000
+    print(f"  {nombre:<44} {por_consulta:7.3f} ms/consulta")
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    originales = crear_base_antigua(cantidad)
+    print(f"Citas sembradas con el esquema anterior: {cantidad}")
+
+    print("Antes (texto):")
+    with database.engine.connect() as conn:
+        medir("conteo por sede y fecha", lambda sede, fecha, estado: conn.execute(text(
+            'SELECT COUNT(*) FROM "Citas" WHERE c_sede = :sede AND c_fecha = :fecha'
+        ), {"sede": sede, "fecha": fecha}).scalar())
+        medir("listado por sede y estado (50 filas)", lambda sede, fecha, estado: conn.execute(text(
+            'SELECT c."c_id", c."c_sede", c."c_fecha", c."c_estado", p."pt_nombre" FROM "Citas" c '
+            'LEFT JOIN "Paciente" p ON p."pt_id" = c."c_paciente_id" '
+            'WHERE c."c_sede" = :sede AND c."c_estado" = :estado AND c."c_fecha" >= :fecha '
+            'ORDER BY c."c_fecha", c."c_id" LIMIT 51'
+        ), {"sede": sede, "estado": estado, "fecha": fecha}).all())
+        medir("conteos de todas las sedes y días (GROUP BY)", lambda sede, fecha, estado: conn.execute(text(
+            'SELECT c_sede, c_fecha, COUNT(*) FROM "Citas" GROUP BY c_sede, c_fecha'
+        )).all(), consultas=20)
+        tamano_antes = tamano_indice(conn, "ix_Citas_c_sede_c_fecha")
+
+    inicio = time.perf_counter()
+    models.Base.metadata.create_all(bind=database.engine)
+    migrations.aplicar_migraciones(database.engine)
+    print(f"Migración: {time.perf_counter() - inicio:.2f}s (lotes de {migrations.LOTE_MIGRACION} filas)")
+
+    db = database.SessionLocal()
+    try:
+        catalogos.cargar_catalogos(db)
+        sedes = dict(db.query(models.Sede.sd_nombre, models.Sede.sd_id).all())
+        migradas = db.query(models.Cita.c_id, models.Sede.sd_nombre, models.Cita.c_estado_id).join(models.Sede).all()
+        assert len(migradas) == cantidad, "Quedaron citas sin sede"
+        assert all(
+            (sede, catalogos.estados.nombre(estado_id)) == originales[c_id] for c_id, sede, estado_id in migradas
+        ), "La sede o el estado no coinciden con el texto original"
+        print("OK: todas las citas conservan su sede y su último estado.")
+    finally:
+        db.close()
+
+    # Las mismas consultas, con la sede y el estado ya resueltos a id (caché y catálogo en memoria)
+    print("Después (enteros):")
+    with database.engine.connect() as conn:
+        medir("conteo por sede y fecha", lambda sede, fecha, estado: conn.execute(text(
+            'SELECT COUNT(*) FROM "Citas" WHERE c_sede_id = :sede_id AND c_fecha = :fecha'
+        ), {"sede_id": sedes[sede], "fecha": fecha}).scalar())
+        medir("listado por sede y estado (50 filas)", lambda sede, fecha, estado: conn.execute(text(
+            'SELECT c."c_id", s."sd_nombre", c."c_fecha", c."c_estado_id", p."pt_nombre" FROM "Citas" c '
+            'LEFT JOIN "Paciente" p ON p."pt_id" = c."c_paciente_id" '
+            'LEFT JOIN "Sedes" s ON s."sd_id" = c."c_sede_id" '
+            'WHERE c."c_sede_id" = :sede_id AND c."c_estado_id" = :estado_id AND c."c_fecha" >= :fecha '
+            'ORDER BY c."c_fecha", c."c_id" LIMIT 51'
+        ), {"sede_id": sedes[sede], "estado_id": catalogos.estados.id(estado), "fecha": fecha}).all())
+        medir("conteos de todas las sedes y días (GROUP BY)", lambda sede, fecha, estado: conn.execute(text(
+            'SELECT c_sede_id, c_fecha, COUNT(*) FROM "Citas" GROUP BY c_sede_id, c_fecha'
+        )).all(), consultas=20)
+        tamano_despues = tamano_indice(conn, "ix_Citas_c_sede_id_c_fecha")
+    print(f"Índice por sede y fecha: {tamano_antes / 1024:.0f} KB (texto) -> {tamano_despues / 1024:.0f} KB (entero)")
+
+if __name__ == "__main__":
+    main()
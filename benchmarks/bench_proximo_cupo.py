@@ -0,0 +1,99 @@
+"""
+Benchmark de GET /sedes/{id}/proximo-cupo: siembra un año de conteos diarios con la
+sede y la empresa casi siempre llenas y mide la latencia de buscar las próximas
+fechas con cupo en todo el horizonte. Muestra además el plan de la consulta.
+
+Uso:
+    python -m benchmarks.bench_proximo_cupo [repeticiones]
+"""
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_proximo_cupo.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from backend import cache, database, disponibilidad, models
+
+DESDE = datetime.date(2025, 1, 1)
+CUPO_SEDE = 40
+CUPO_EMPRESA = 10
+OTRAS_SEDES = 20
+OTRAS_EMPRESAS = 200
+
+def sembrar():
+    models.Base.metadata.create_all(bind=database.engine)
+    dias = [DESDE + datetime.timedelta(days=i) for i in range(disponibilidad.MAX_DIAS_RANGO)]
+    with database.engine.begin() as conn:
+        conn.execute(models.Sede.__table__.insert(), [
+            {"sd_id": 1, "sd_nombre": "SEDE RECUERDO", "sd_cant_turnos": CUPO_SEDE,
+             "sd_dias_atencion": disponibilidad.mascara_dias("Lunes, Martes, Miércoles, Jueves, Viernes")}
+        ])
+        conn.execute(models.Empresa.__table__.insert(), [
+            {"em_id": 1, "em_nombre": "EMSSANAR", "em_cant_max": CUPO_EMPRESA}
+        ])
+        # La sede queda llena todo el año salvo los últimos días; la empresa, en días alternos
+        filas = [
+            {"cd_sede_id": 1, "cd_empresa_id": 0, "cd_fecha": d,
+             "cd_ocupados": CUPO_SEDE if i < len(dias) - 10 else CUPO_SEDE - 1}
+            for i, d in enumerate(dias)
+        ]
+        filas += [
+            {"cd_sede_id": 0, "cd_empresa_id": 1, "cd_fecha": d, "cd_ocupados": CUPO_EMPRESA if i % 2 else 3}
+            for i, d in enumerate(dias)
+        ]
+        # Ruido: contadores de otras sedes y empresas en las mismas fechas
+        filas += [
+            {"cd_sede_id": s + 2, "cd_empresa_id": 0, "cd_fecha": d, "cd_ocupados": 5}
+            for s in range(OTRAS_SEDES) for d in dias
+        ]
+        filas += [
+            {"cd_sede_id": 0, "cd_empresa_id": e + 2, "cd_fecha": d, "cd_ocupados": 5}
+            for e in range(OTRAS_EMPRESAS) for d in dias
+        ]
+        conn.execute(models.CupoDiario.__table__.insert(), filas)
+    return len(filas)
+
+def plan(db, sede, empresa):
+    """Plan de la lectura de días saturados que usa proximos_cupos."""
+    sentencias = []
+    escuchar = lambda conn, cursor, statement, parameters, context, executemany: sentencias.append((statement, parameters))
+    event.listen(database.engine, "before_cursor_execute", escuchar)
+    try:
+        disponibilidad.fechas_llenas(db, DESDE, datetime.date(2025, 12, 31), sede=sede, empresa=empresa)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", escuchar)
+    statement, parameters = sentencias[-1]
+    filas = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return " | ".join(f[-1] for f in filas)
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"Filas en CuposDiarios: {sembrar()}")
+
+    db = database.SessionLocal()
+    try:
+        sede = cache.sedes.por_id(db, 1)
+        empresa = cache.empresas.por_nombre(db, "EMSSANAR")
+        print(f"Plan: {plan(db, sede, empresa)}")
+
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            fechas = disponibilidad.proximos_cupos(db, sede, DESDE, 5, empresa=empresa)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        db.close()
+
+    tiempos.sort()
+    print(f"Fechas encontradas: {[f['fecha'] for f in fechas]}")
+    print(f"  mediana={statistics.median(tiempos):.2f} ms  p95={tiempos[int(len(tiempos) * 0.95) - 1]:.2f} ms  "
+          f"máx={tiempos[-1]:.2f} ms  (objetivo < 10 ms)")
+
+if __name__ == "__main__":
+    main()
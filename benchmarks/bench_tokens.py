@@ -0,0 +1,57 @@
+"""
+Micro-benchmark de la verificación de tokens: costo por petición de tokens.verificar
+y de la dependencia sesion_actual, frente a la alternativa de buscar el usuario y su
+rol en la base en cada petición.
+
+Uso:
+    python -m benchmarks.bench_tokens [iteraciones]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_tokens.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from backend import database, models, tokens
+from backend.main import sesion_actual, startup_event
+
+def medir(nombre, funcion, iteraciones):
+    funcion()
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion()
+    por_llamada = (time.perf_counter() - inicio) / iteraciones * 1e6
+    print(f"  {nombre:<38} {por_llamada:8.2f} µs/petición")
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    startup_event()
+
+    token = tokens.emitir(2, "agente", "Agente")
+    encabezado = f"Bearer {token}"
+    # Lista de revocados con mil cierres de sesión vigentes
+    for i in range(1000):
+        tokens.revocar(tokens.verificar(tokens.emitir(i, f"usuario{i}", "Paciente")))
+
+    loop = asyncio.new_event_loop()
+    db = database.SessionLocal()
+
+    def consulta_bd():
+        db.query(models.Usuario.usr_id, models.Usuario.usr_name, models.Rol.r_name).join(
+            models.Rol, models.Rol.r_id == models.Usuario.rol_id
+        ).filter(models.Usuario.usr_id == 2).first()
+
+    print(f"{iteraciones} iteraciones, {len(tokens.revocados)} tokens revocados")
+    medir("tokens.emitir", lambda: tokens.emitir(2, "agente", "Agente"), iteraciones)
+    medir("tokens.verificar", lambda: tokens.verificar(token), iteraciones)
+    medir("dependencia sesion_actual", lambda: loop.run_until_complete(sesion_actual(encabezado)), iteraciones // 10)
+    medir("consulta de usuario y rol en la base", consulta_bd, iteraciones // 10)
+
+    db.close()
+    loop.close()
+
+if __name__ == "__main__":
+    main()
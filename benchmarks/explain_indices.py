@@ -0,0 +1,91 @@
+"""
+Verifica con EXPLAIN QUERY PLAN que los conteos de turnos por sede y por empresa
+usan los índices compuestos de Citas y que el listado por rango de fechas usa
+ix_Citas_c_fecha, también en una base creada antes de ellos (y antes de que Citas
+guardara la sede por id y la fecha como DATE).
+
+Uso:
+    python -m benchmarks.explain_indices
+"""
+import datetime
+import os
+import sqlite3
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "explain_indices.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from backend import database, migrations, models
+
+def crear_base_antigua():
+    """Esquema previo a los índices: solo las claves primarias."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript("""
+        CREATE TABLE "Empresas" (em_id INTEGER PRIMARY KEY, em_nombre VARCHAR(100), em_created_at VARCHAR,
+            em_updated_at VARCHAR, em_cant_max INTEGER, em_cant_pri INTEGER);
+        CREATE TABLE "Paciente" (pt_id INTEGER PRIMARY KEY, pt_nombre VARCHAR, pt_cedula VARCHAR UNIQUE,
+            pt_empresa_id INTEGER REFERENCES "Empresas"(em_id));
+        CREATE TABLE "Estados" (id INTEGER PRIMARY KEY, name VARCHAR(255));
+        CREATE TABLE "Citas" (c_id INTEGER PRIMARY KEY, c_paciente_id INTEGER REFERENCES "Paciente"(pt_id),
+            c_sede VARCHAR, c_laboratorio VARCHAR, c_fecha VARCHAR, c_estado VARCHAR,
+            c_estado_id INTEGER REFERENCES "Estados"(id), c_created_at VARCHAR, c_updated_at VARCHAR);
+    """)
+    conn.close()
+
+def plan(db, query, indexado_por=None):
+    """
+    Plan de la consulta. `indexado_por` ({tabla: índice}) obliga a SQLite a usar ese índice
+    (INDEXED BY), que falla con "no query solution" si el índice no sirve para la consulta.
+    """
+    sql = str(query.statement.compile(database.engine, compile_kwargs={"literal_binds": True}))
+    for tabla, indice in (indexado_por or {}).items():
+        sql = sql.replace(f'FROM "{tabla}"', f'FROM "{tabla}" INDEXED BY "{indice}"', 1)
+    filas = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return " | ".join(f[-1] for f in filas)
+
+def main():
+    crear_base_antigua()
+    models.Base.metadata.create_all(bind=database.engine)
+    migrations.aplicar_migraciones(database.engine)
+
+    db = database.SessionLocal()
+    try:
+        conteo_sede = db.query(models.Cita).filter(
+            models.Cita.c_sede_id == 1,
+            models.Cita.c_fecha == datetime.date(2025, 1, 6)
+        ).with_entities(models.Cita.c_id)
+        conteo_empresa = db.query(models.Cita).join(models.Paciente).filter(
+            models.Paciente.pt_empresa_id == 1,
+            models.Cita.c_fecha == datetime.date(2025, 1, 6)
+        ).with_entities(models.Cita.c_id)
+        listado_rango = db.query(models.Cita.c_id).filter(
+            models.Cita.c_fecha >= datetime.date(2025, 1, 6),
+            models.Cita.c_fecha <= datetime.date(2025, 1, 12)
+        ).order_by(models.Cita.c_fecha, models.Cita.c_id)
+
+        plan_sede = plan(db, conteo_sede)
+        plan_empresa = plan(db, conteo_empresa)
+        # Sin ix_Citas_c_fecha: el camino por los pacientes de la empresa
+        plan_empresa_paciente = plan(db, conteo_empresa, {"Citas": "ix_Citas_c_paciente_id_c_fecha"})
+        plan_rango = plan(db, listado_rango)
+    finally:
+        db.close()
+
+    print(f"Conteo por sede:    {plan_sede}")
+    print(f"Conteo por empresa: {plan_empresa}")
+    print(f"  sin índice fecha: {plan_empresa_paciente}")
+    print(f"Listado por rango:  {plan_rango}")
+
+    assert "ix_Citas_c_sede_id_c_fecha" in plan_sede, "El conteo por sede no usa ix_Citas_c_sede_id_c_fecha"
+    # Con ix_Citas_c_fecha SQLite puede partir de las citas del día (suelen ser menos que
+    # las de todos los pacientes de la empresa); basta con que no recorra la tabla
+    assert "SCAN Citas" not in plan_empresa, "El conteo por empresa recorre Citas"
+    assert (
+        "ix_Paciente_pt_empresa_id" in plan_empresa_paciente
+        and "ix_Citas_c_paciente_id_c_fecha (c_paciente_id=? AND c_fecha=?)" in plan_empresa_paciente
+    ), "El conteo por empresa no puede usar ix_Paciente_pt_empresa_id e ix_Citas_c_paciente_id_c_fecha"
+    assert "ix_Citas_c_fecha " in plan_rango, "El listado por rango no usa ix_Citas_c_fecha"
+    print("OK: los conteos y el listado por rango usan los índices.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Prueba de carga concurrente de crear_cita: varios procesos (como workers de gunicorn),
+cada uno con varios hilos, reservan a la vez en la misma sede y fecha.
+Verifica que nunca se supere el cupo de la sede ni el de la empresa.
+
+Uso:
+    python -m benchmarks.stress_reservas [reservas] [procesos] [hilos]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "stress_reservas.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from fastapi import HTTPException
+
+from backend import cupos, database, models
+from backend.main import CitaCreate, crear_cita, startup_event
+
+SEDE = "SEDE RECUERDO"
+EMPRESA = "EMSSANAR"
+FECHA = datetime.date(2025, 3, 3)
+CUPO_SEDE = 60
+CUPO_EMPRESA = 25
+
+def reservar(indice):
+    db = database.SessionLocal()
+    try:
+        crear_cita(CitaCreate(
+            nombre_paciente=f"Paciente {indice}",
+            cedula_paciente=str(20000000 + indice),
+            sede=SEDE,
+            laboratorio="Laboratorio",
+            fecha=FECHA,
+            # La mitad de las reservas compite además por el cupo de la empresa
+            empresa_paciente=EMPRESA if indice % 2 else None,
+        ), db)
+        return "aceptada"
+    except HTTPException:
+        return "rechazada"
+    except Exception as ex:
+        return f"error: {ex.__class__.__name__}: {str(ex)[:200]}"
+    finally:
+        db.close()
+
+def lote(indices, hilos):
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(reservar, indices))
+
+def main():
+    reservas = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    procesos = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    hilos = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    startup_event()
+    db = database.SessionLocal()
+    db.add(models.Sede(sd_nombre=SEDE, sd_cant_turnos=CUPO_SEDE))
+    db.add(models.Empresa(em_nombre=EMPRESA, em_cant_max=CUPO_EMPRESA))
+    db.commit()
+    db.close()
+    # Los procesos hijos abren sus propias conexiones
+    database.engine.dispose()
+
+    lotes = [list(range(p, reservas, procesos)) for p in range(procesos)]
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = [r for parcial in pool.map(lote, lotes, [hilos] * procesos) for r in parcial]
+    duracion = time.perf_counter() - inicio
+
+    db = database.SessionLocal()
+    try:
+        sede_id = db.query(models.Sede.sd_id).filter(models.Sede.sd_nombre == SEDE).scalar()
+        citas_sede = db.query(models.Cita).filter(models.Cita.c_sede_id == sede_id, models.Cita.c_fecha == FECHA).count()
+        citas_empresa = db.query(models.Cita).join(models.Paciente).join(models.Empresa).filter(
+            models.Empresa.em_nombre == EMPRESA, models.Cita.c_fecha == FECHA
+        ).count()
+        contador_sede = cupos.ocupados(db, FECHA, sede_id=sede_id)
+    finally:
+        db.close()
+
+    errores = [r for r in resultados if r.startswith("error")]
+    print(f"Reservas: {reservas} en {procesos} procesos x {hilos} hilos, {duracion:.2f}s")
+    print(f"  aceptadas={resultados.count('aceptada')} rechazadas={resultados.count('rechazada')} errores={len(errores)}")
+    print(f"  citas sede={citas_sede}/{CUPO_SEDE} (contador {contador_sede}), citas empresa={citas_empresa}/{CUPO_EMPRESA}")
+    if errores:
+        print(f"  primer error: {errores[0]}")
+
+    assert citas_sede <= CUPO_SEDE, "Se superó el cupo de la sede"
+    assert citas_empresa <= CUPO_EMPRESA, "Se superó el cupo de la empresa"
+    assert citas_sede == contador_sede, "El contador no coincide con las citas"
+    print("OK: no se superaron los cupos.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+import asyncio
+import bisect
+import datetime
+import os
+import time
+from urllib.parse import quote
+
+import httpx
+from pydantic import BaseModel
+
+API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+
+# Tiempos de espera (segundos) comunes a todas las llamadas al backend
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", 10))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 5))
+# Reintentos ante fallas de red: al conectar para cualquier método, y de la petición completa solo en GET
+API_REINTENTOS = int(os.getenv("API_REINTENTOS", 2))
+# Conexiones abiertas hacia el backend y segundos que una conexión ociosa se mantiene viva
+API_MAX_CONEXIONES = int(os.getenv("API_MAX_CONEXIONES", 10))
+API_KEEPALIVE_S = float(os.getenv("API_KEEPALIVE_S", 30))
+
+METODOS_REINTENTABLES = {"GET", "HEAD", "OPTIONS"}
+
+def http2_disponible() -> bool:
+    """HTTP/2 requiere el paquete h2 (httpx[http2]); sin él se usa HTTP/1.1 con keep-alive."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# --- Modelos de respuesta ---
+
+class Mensaje(BaseModel):
+    message: str
+
+class Sesion(BaseModel):
+    usr_id: int
+    usr_name: str
+    r_name: str | None = None
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int | None = None
+
+class Sede(BaseModel):
+    id: int
+    nombre: str
+    dias_atencion: list[str] | None = None
+    dias_atencion_mask: int | None = None
+    sd_cant_turnos: int | None = None
+
+class Empresa(BaseModel):
+    id: int
+    nombre: str
+    cant_turnos: int | None = None
+
+class DiasAtencion(BaseModel):
+    dias_atencion: list[str] | None = None
+    dias_atencion_mask: int | None = None
+
+class Turnos(BaseModel):
+    turnos_totales: int | None = None
+    turnos_ocupados: int
+    turnos_disponibles: int | None = None
+    tiene_disponibilidad: bool
+
+class Cupo(BaseModel):
+    totales: int | None = None
+    ocupados: int
+    disponibles: int | None = None
+
+class DiaDisponible(BaseModel):
+    fecha: datetime.date
+    atiende: bool
+    sede: Cupo | None = None
+    empresa: Cupo | None = None
+    tiene_disponibilidad: bool
+
+class FechaConCupo(BaseModel):
+    fecha: datetime.date
+    sede: Cupo
+    empresa: Cupo | None = None
+
+class ProximoCupo(BaseModel):
+    sede: str
+    empresa: str | None = None
+    desde: datetime.date
+    fechas: list[FechaConCupo]
+
+class Cita(BaseModel):
+    id: int
+    paciente_nombre: str
+    paciente_cedula: str
+    empresa: str
+    sede: str | None = None
+    laboratorio: str | None = None
+    fecha: datetime.date | None = None
+    estado: str | None = None
+
+class PaginaCitas(BaseModel):
+    items: list[Cita]
+    next_cursor: str | None = None
+
+class CitaActualizada(BaseModel):
+    message: str
+    cita: Cita
+
+class CitaCreada(BaseModel):
+    message: str
+    cita_id: int
+
+class ResultadoImportacion(BaseModel):
+    total: int
+    aceptadas: int
+    rechazadas: int
+    segundos: float
+    filas_por_segundo: float | None = None
+    filas: list[dict]
+
+class Excepcion(BaseModel):
+    id: int
+    sede_id: int | None = None
+    fecha: datetime.date
+    atiende: bool
+    descripcion: str | None = None
+
+class ErrorAPI(Exception):
+    """Respuesta de error del backend (4xx/5xx) con su `detail`."""
+
+    def __init__(self, status: int, detalle: str):
+        super().__init__(f"{status}: {detalle}")
+        self.status = status
+        self.detalle = detalle
+
+# --- Latencias ---
+
+class HistogramaLatencia:
+    """Conteo de latencias en cubetas fijas (ms); los percentiles se aproximan al límite de la cubeta."""
+
+    LIMITES_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.conteos = [0] * (len(self.LIMITES_MS) + 1)
+        self.total = 0
+        self.suma_ms = 0.0
+        self.maximo_ms = 0.0
+
+    def registrar(self, segundos: float):
+        ms = segundos * 1000
+        self.conteos[bisect.bisect_left(self.LIMITES_MS, ms)] += 1
+        self.total += 1
+        self.suma_ms += ms
+        self.maximo_ms = max(self.maximo_ms, ms)
+
+    def percentil(self, p: float):
+        if not self.total:
+            return None
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for indice, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                # La última cubeta no tiene límite superior: se informa el máximo observado
+                return self.LIMITES_MS[indice] if indice < len(self.LIMITES_MS) else round(self.maximo_ms, 3)
+        return round(self.maximo_ms, 3)
+
+    def resumen(self):
+        return {
+            "llamadas": self.total,
+            "media_ms": round(self.suma_ms / self.total, 3) if self.total else None,
+            "p50_ms": self.percentil(50),
+            "p95_ms": self.percentil(95),
+            "p99_ms": self.percentil(99),
+            "max_ms": round(self.maximo_ms, 3),
+        }
+
+# --- Cliente ---
+
+def _configuracion():
+    limites = httpx.Limits(
+        max_connections=API_MAX_CONEXIONES,
+        max_keepalive_connections=API_MAX_CONEXIONES,
+        keepalive_expiry=API_KEEPALIVE_S
+    )
+    return {
+        "limits": limites,
+        "timeout": httpx.Timeout(API_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+        "http2": http2_disponible(),
+    }
+
+def _reintentable(metodo: str, error: httpx.TransportError) -> bool:
+    """Si no se pudo conectar la petición no salió y se repite en cualquier método; si no, solo en GET."""
+    return metodo in METODOS_REINTENTABLES or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+def _valor(valor):
+    return valor.isoformat() if isinstance(valor, datetime.date) else valor
+
+def _limpiar(valores: dict):
+    """Parámetros o cuerpo sin los valores None y con las fechas en ISO."""
+    return {clave: _valor(valor) for clave, valor in valores.items() if valor is not None}
+
+def _detalle(response: httpx.Response) -> str:
+    try:
+        detalle = response.json().get("detail")
+    except (ValueError, AttributeError):
+        detalle = None
+    return detalle if isinstance(detalle, str) else (response.text or response.reason_phrase)
+
+class ClienteAPI:
+    """
+    Cliente del backend para una sesión de Flet o un usuario virtual de una prueba de carga.
+    Mantiene un pool de conexiones keep-alive (HTTP/2 si está instalado h2) con los mismos
+    tiempos de espera y reintentos para cada llamada, guarda el token de la sesión y
+    expone un método tipado por endpoint. Los GET idénticos en curso se comparten y la
+    latencia de cada endpoint se acumula en `latencias`.
+    """
+
+    def __init__(self, base_url: str = API_URL, transporte=None):
+        configuracion = _configuracion()
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            # Sin retries en el transporte: los reintentos se hacen solo en _enviar
+            transport=transporte or httpx.AsyncHTTPTransport(
+                limits=configuracion["limits"], http2=configuracion["http2"]
+            ),
+            **configuracion
+        )
+        self.token = None
+        self.latencias = {}
+        self.coalescidas = 0
+        self._en_curso = {}
+
+    # --- Transporte ---
+
+    def _cabeceras(self):
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    async def _enviar(self, metodo: str, endpoint: str, ruta: str, **kwargs) -> httpx.Response:
+        inicio = time.perf_counter()
+        for intento in range(1 + API_REINTENTOS):
+            try:
+                response = await self._http.request(metodo, ruta, headers=self._cabeceras(), **kwargs)
+                break
+            except httpx.TransportError as error:
+                if intento == API_REINTENTOS or not _reintentable(metodo, error):
+                    raise
+        self.latencias.setdefault(endpoint, HistogramaLatencia()).registrar(time.perf_counter() - inicio)
+        return response
+
+    async def request(self, metodo: str, plantilla: str, ruta_params: dict | None = None, **kwargs) -> httpx.Response:
+        """
+        Envía la petición a `plantilla` ("/citas/{cita_id}") con `ruta_params` y lanza
+        ErrorAPI si el backend responde con error. La latencia se registra por plantilla.
+        """
+        metodo = metodo.upper()
+        endpoint = f"{metodo} {plantilla}"
+        ruta = plantilla.format(**{k: quote(str(v), safe="") for k, v in (ruta_params or {}).items()})
+
+        if metodo == "GET":
+            # Un GET igual a otro en curso (misma ruta, parámetros y token) espera esa respuesta
+            clave = (ruta, str(httpx.QueryParams(kwargs.get("params") or {})), self.token)
+            tarea = self._en_curso.get(clave)
+            if tarea is None:
+                tarea = asyncio.ensure_future(self._enviar(metodo, endpoint, ruta, **kwargs))
+                self._en_curso[clave] = tarea
+                tarea.add_done_callback(lambda _: self._en_curso.pop(clave, None))
+            else:
+                self.coalescidas += 1
+            # shield: si quien espera se cancela (cambio de vista) la petición sigue para los demás
+            response = await asyncio.shield(tarea)
+        else:
+            response = await self._enviar(metodo, endpoint, ruta, **kwargs)
+
+        if response.status_code >= 400:
+            raise ErrorAPI(response.status_code, _detalle(response))
+        return response
+
+    async def _json(self, metodo: str, plantilla: str, ruta_params: dict | None = None, **kwargs):
+        return (await self.request(metodo, plantilla, ruta_params, **kwargs)).json()
+
+    def estadisticas(self):
+        """Resumen de latencia por endpoint y cantidad de GET que se unieron a otro en curso."""
+        return {
+            "endpoints": {endpoint: h.resumen() for endpoint, h in sorted(self.latencias.items())},
+            "coalescidas": self.coalescidas,
+        }
+
+    async def cerrar(self):
+        await self._http.aclose()
+
+    # --- Sesión y usuarios ---
+
+    async def login(self, usuario: str, password: str) -> Sesion:
+        sesion = Sesion(**await self._json("POST", "/login", json={"usuario": usuario, "password": password}))
+        self.token = sesion.access_token
+        return sesion
+
+    async def logout(self):
+        """Revoca el token de la sesión; se olvida aunque el backend no responda."""
+        if not self.token:
+            return
+        try:
+            await self.request("POST", "/logout")
+        finally:
+            self.token = None
+
+    async def registrar(self, usuario: str, password: str) -> Mensaje:
+        return Mensaje(**await self._json("POST", "/register", json={"usuario": usuario, "password": password}))
+
+    async def cambiar_username(self, usr_id: int, username: str) -> Mensaje:
+        return Mensaje(**await self._json(
+            "PUT", "/usuarios/{usr_id}/username", {"usr_id": usr_id}, json={"username": username}
+        ))
+
+    async def cambiar_password(self, usr_id: int, password: str) -> Mensaje:
+        return Mensaje(**await self._json(
+            "PUT", "/usuarios/{usr_id}/password", {"usr_id": usr_id}, json={"password": password}
+        ))
+
+    # --- Sedes, empresas y disponibilidad ---
+
+    async def sedes(self) -> list[Sede]:
+        return [Sede(**s) for s in await self._json("GET", "/sedes")]
+
+    async def actualizar_sede(self, sede_id: int, cant_turnos: int | None = None,
+                              dias_atencion: list[str] | None = None, dias_atencion_mask: int | None = None) -> Mensaje:
+        cuerpo = {"cant_turnos": cant_turnos, "dias_atencion": dias_atencion, "dias_atencion_mask": dias_atencion_mask}
+        return Mensaje(**await self._json("PUT", "/sedes/{sede_id}", {"sede_id": sede_id}, json=_limpiar(cuerpo)))
+
+    async def dias_disponibles(self, sede_id: int) -> DiasAtencion:
+        return DiasAtencion(**await self._json("GET", "/sedes/{sede_id}/dias-disponibles", {"sede_id": sede_id}))
+
+    async def proximo_cupo(self, sede_id: int, desde: datetime.date | None = None, cantidad: int = 5,
+                           empresa: str | None = None) -> ProximoCupo:
+        params = _limpiar({"desde": desde, "cantidad": cantidad, "empresa": empresa})
+        return ProximoCupo(**await self._json("GET", "/sedes/{sede_id}/proximo-cupo", {"sede_id": sede_id}, params=params))
+
+    async def turnos_sede(self, sede: str, fecha: datetime.date) -> Turnos:
+        return Turnos(**await self._json(
+            "GET", "/sedes/{sede_nombre}/turnos-disponibles", {"sede_nombre": sede}, params={"fecha": _valor(fecha)}
+        ))
+
+    async def empresas(self) -> list[Empresa]:
+        return [Empresa(**e) for e in await self._json("GET", "/empresas")]
+
+    async def actualizar_empresa(self, empresa_id: int, cant_turnos: int | None) -> Mensaje:
+        return Mensaje(**await self._json(
+            "PUT", "/empresas/{empresa_id}", {"empresa_id": empresa_id}, json={"cant_turnos": cant_turnos}
+        ))
+
+    async def turnos_empresa(self, empresa: str, fecha: datetime.date) -> Turnos:
+        return Turnos(**await self._json(
+            "GET", "/empresas/{empresa_nombre}/turnos-disponibles", {"empresa_nombre": empresa}, params={"fecha": _valor(fecha)}
+        ))
+
+    async def disponibilidad(self, desde: datetime.date, hasta: datetime.date, sede: str | None = None,
+                             empresa: str | None = None) -> list[DiaDisponible]:
+        params = _limpiar({"desde": desde, "hasta": hasta, "sede": sede, "empresa": empresa})
+        return [DiaDisponible(**d) for d in await self._json("GET", "/disponibilidad", params=params)]
+
+    async def excepciones(self, sede_id: int | None = None, desde: datetime.date | None = None,
+                          hasta: datetime.date | None = None) -> list[Excepcion]:
+        params = _limpiar({"sede_id": sede_id, "desde": desde, "hasta": hasta})
+        return [Excepcion(**e) for e in await self._json("GET", "/excepciones", params=params)]
+
+    async def crear_excepcion(self, fecha: datetime.date, sede_id: int | None = None, atiende: bool = False,
+                              descripcion: str | None = None) -> Excepcion:
+        cuerpo = _limpiar({"fecha": fecha, "sede_id": sede_id, "atiende": atiende, "descripcion": descripcion})
+        return Excepcion(**await self._json("POST", "/excepciones", json=cuerpo))
+
+    async def eliminar_excepcion(self, excepcion_id: int) -> Mensaje:
+        return Mensaje(**await self._json("DELETE", "/excepciones/{excepcion_id}", {"excepcion_id": excepcion_id}))
+
+    # --- Citas ---
+
+    async def citas(self, cursor: str | None = None, limit: int | None = None, sede: str | None = None,
+                    fecha_desde: datetime.date | None = None, fecha_hasta: datetime.date | None = None,
+                    estado: str | None = None, empresa: str | None = None, cedula: str | None = None) -> PaginaCitas:
+        params = _limpiar({
+            "cursor": cursor, "limit": limit, "sede": sede, "fecha_desde": fecha_desde,
+            "fecha_hasta": fecha_hasta, "estado": estado, "empresa": empresa, "cedula": cedula
+        })
+        return PaginaCitas(**await self._json("GET", "/citas", params=params))
+
+    async def crear_cita(self, nombre_paciente: str, cedula_paciente: str, sede: str, laboratorio: str,
+                         fecha: datetime.date, empresa_paciente: str | None = None) -> CitaCreada:
+        cuerpo = {
+            "nombre_paciente": nombre_paciente, "cedula_paciente": cedula_paciente, "sede": sede,
+            "laboratorio": laboratorio, "fecha": _valor(fecha), "empresa_paciente": empresa_paciente
+        }
+        return CitaCreada(**await self._json("POST", "/citas", json=cuerpo))
+
+    async def actualizar_cita(self, cita_id: int, fecha: datetime.date, estado: str) -> CitaActualizada:
+        return CitaActualizada(**await self._json(
+            "PUT", "/citas/{cita_id}", {"cita_id": cita_id}, json={"fecha": _valor(fecha), "estado": estado}
+        ))
+
+    async def eliminar_cita(self, cita_id: int) -> Mensaje:
+        return Mensaje(**await self._json("DELETE", "/citas/{cita_id}", {"cita_id": cita_id}))
+
+    async def importar_citas(self, filas: list[dict]) -> ResultadoImportacion:
+        return ResultadoImportacion(**await self._json("POST", "/citas/bulk", json=[_limpiar(f) for f in filas]))
+
+    async def importar_citas_csv(self, contenido: bytes, nombre: str = "citas.csv") -> ResultadoImportacion:
+        archivo = {"archivo": (nombre, contenido, "text/csv")}
+        return ResultadoImportacion(**await self._json("POST", "/citas/bulk/csv", files=archivo))
+
+    async def exportar_citas(self, formato: str = "csv", sede: str | None = None, fecha_desde: datetime.date | None = None,
+                             fecha_hasta: datetime.date | None = None, empresa: str | None = None) -> str:
+        params = _limpiar({
+            "formato": formato, "sede": sede, "fecha_desde": fecha_desde, "fecha_hasta": fecha_hasta, "empresa": empresa
+        })
+        return (await self.request("GET", "/citas/export", params=params)).text
+
+    # --- Administración ---
+
+    async def estadisticas_cache(self) -> dict:
+        return await self._json("GET", "/cache/estadisticas")
+
+    async def recargar_catalogos(self) -> dict:
+        return await self._json("POST", "/catalogos/recargar")
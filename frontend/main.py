@@ -1,11 +1,53 @@
 import flet as ft
-import httpx
+import asyncio
+import bisect
 import random
 import datetime
 import time
 
-import os
-API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+from cliente_api import ClienteAPI, ErrorAPI
+
+# Tamaño de página al listar citas en la vista del agente
+CITAS_POR_PAGINA = 50
+
+# Lista virtualizada de citas: alto fijo de cada fila (tarjeta + margen) y filas que se
+# construyen por encima y por debajo de las visibles
+ALTO_FILA_CITA = 240
+FILAS_EXTRA_CITAS = 4
+
+# Días hacia adelante cuya disponibilidad se trae de una vez al agendar
+DIAS_DISPONIBILIDAD = 90
+
+def clave_orden_cita(cita):
+    """Orden de GET /citas (ORDEN_CITAS en el backend): primero las citas sin fecha, luego por fecha e id"""
+    return (cita.fecha is not None, cita.fecha or datetime.date.min, cita.id)
+
+def aplicar_cambios_citas(citas, cambiadas=(), eliminadas=(), completa=True):
+    """
+    Actualiza por id la lista de citas cargada con el resultado de una modificación, sin
+    volver a pedir el listado: quita las eliminadas y ubica cada cita cambiada donde le
+    toca según clave_orden_cita. Si faltan páginas (completa=False) y la cita cambiada
+    queda después de la última cargada, se quita: llegará con su página. Las citas sin
+    cambios conservan el mismo objeto, así sus tarjetas no se rellenan.
+    Devuelve True si la lista cambió.
+    """
+    quitar = set(eliminadas)
+    cargadas = {c.id: c for c in citas}
+    reubicar = []
+    for cita in cambiadas:
+        anterior = cargadas.get(cita.id)
+        if anterior is not None and anterior != cita:
+            quitar.add(cita.id)
+            reubicar.append(cita)
+    if not quitar & cargadas.keys():
+        return False
+
+    citas[:] = [c for c in citas if c.id not in quitar]
+    for cita in reubicar:
+        if not completa and citas and clave_orden_cita(cita) > clave_orden_cita(citas[-1]):
+            continue
+        bisect.insort(citas, cita, key=clave_orden_cita)
+    return True
 
 class ModernTextField(ft.Container):
     def __init__(self, label, hint, icon, keyboard_type=ft.KeyboardType.TEXT, password=False):
@@ -66,6 +108,95 @@ def main(page: ft.Page):
     # Variable global para almacenar el usr_id
     usr_id = None
     usr_name = None
+    # Un cliente de la API por sesión: todas las vistas reutilizan sus conexiones al backend.
+    # Guarda el token emitido por /login y lo envía en los endpoints protegidos
+    api = ClienteAPI()
+
+    async def cerrar_cliente(e):
+        await api.cerrar()
+
+    page.on_close = cerrar_cliente
+
+    # Peticiones en curso de la vista en pantalla; se cancelan al navegar a otra vista
+    tareas_vista = set()
+
+    def lanzar_tarea(funcion, *args):
+        """Ejecuta la corrutina en el loop de Flet, sin bloquear la interfaz, ligada a la vista actual"""
+        async def ejecutar():
+            tarea = asyncio.current_task()
+            tareas_vista.add(tarea)
+            try:
+                await funcion(*args)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                tareas_vista.discard(tarea)
+        page.run_task(ejecutar)
+
+    def limpiar_vista():
+        """Cancela las peticiones pendientes de la vista anterior y limpia la página"""
+        try:
+            actual = asyncio.current_task()
+        except RuntimeError:
+            actual = None
+        for tarea in list(tareas_vista):
+            # La tarea que navega (p. ej. tras guardar) termina por su cuenta
+            if tarea is not actual:
+                page.loop.call_soon_threadsafe(tarea.cancel)
+        page.controls.clear()
+
+    def marcar_ocupado(boton, ocupado):
+        """Deshabilita el botón y muestra un indicador mientras su petición está en curso"""
+        boton.disabled = ocupado
+        boton.content = ft.ProgressRing(width=18, height=18, stroke_width=2, color=ft.Colors.WHITE) if ocupado else None
+
+    def mostrar_mensaje(texto, color):
+        sn = ft.SnackBar(ft.Text(texto), bgcolor=color)
+        page.overlay.append(sn)
+        sn.open = True
+
+    def texto_error(ex, prefijo="Error de conexión"):
+        """Mensaje para el usuario: el detalle que envía el backend o el error de red"""
+        return ex.detalle if isinstance(ex, ErrorAPI) else f"{prefijo}: {ex}"
+
+    async def revocar_token():
+        try:
+            await api.logout()
+        except Exception as ex:
+            print(f"Error cerrando sesión: {ex}")
+
+    def cerrar_sesion(e):
+        nonlocal usr_id, usr_name
+        # Fuera de las tareas de la vista: el cierre de sesión no se cancela al navegar
+        page.run_task(revocar_token)
+        usr_id = None
+        usr_name = None
+        show_login()
+
+    async def cargar_desplegables(empresa_dropdown=None, sede_dropdown=None, hint_empresa="Escoja una empresa", hint_sede="Escoja una sede"):
+        """
+        Llena en paralelo los desplegables de empresas y sedes indicados y los pinta con una
+        sola actualización. Retorna ({nombre: Empresa}, {nombre: Sede}).
+        """
+        async def llenar(dropdown, consulta, hint, nombre_lista):
+            if dropdown is None:
+                return {}
+            try:
+                registros = {r.nombre: r for r in await consulta()}
+                dropdown.options = [ft.dropdown.Option(nombre) for nombre in registros]
+                dropdown.hint_text = hint
+                return registros
+            except Exception as ex:
+                print(f"Error cargando {nombre_lista}: {ex}")
+                dropdown.hint_text = f"Error al cargar {nombre_lista}"
+                return {}
+
+        empresas, sedes = await asyncio.gather(
+            llenar(empresa_dropdown, api.empresas, hint_empresa, "empresas"),
+            llenar(sede_dropdown, api.sedes, hint_sede, "sedes"),
+        )
+        page.update()
+        return empresas, sedes
     
     # Variable para la respuesta del CAPTCHA
     captcha_answer = 0
@@ -145,58 +276,13 @@ def main(page: ft.Page):
         page.update()
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{API_URL}/login", 
-                    json={
-                        "usuario": txt_usuario.value,
-                        "password": txt_password.value
-                    },
-                    timeout=10.0
-                )
-            
-            loading.visible = False
-            btn_login.disabled = False
-            
-            if response.status_code == 200:
-                data = response.json()
-
-                usr_id = data["usr_id"]
-                usr_name = data["usr_name"]
-                user_role = data["r_name"]
-
-                failed_attempts = 0
-                txt_captcha.value = ""
-                txt_usuario.value = ""
-                txt_password.value = ""
-
-                if user_role == "Admin":
-                    show_home_admin()
-                elif user_role == "Agente":
-                    show_home_agente()
-                else:
-                    show_home()  # Paciente
-            else:
-                failed_attempts += 1
-                error_msg = response.json().get("detail", "Error")
-                
-                if failed_attempts >= 5:
-                    txt_usuario.disabled = True
-                    txt_password.disabled = True
-                    txt_captcha.disabled = True
-                    btn_login.disabled = True
-                    error_msg = "Demasiados intentos fallidos. El acceso ha sido bloqueado."
-                
-                sn = ft.SnackBar(ft.Text(error_msg), bgcolor=ft.Colors.RED)
-                page.overlay.append(sn)
-                sn.open = True
-                
+            sesion = await api.login(txt_usuario.value, txt_password.value)
         except Exception as ex:
             failed_attempts += 1
             loading.visible = False
             btn_login.disabled = False
             
-            error_text = f"Error: {ex}"
+            error_text = texto_error(ex, "Error")
             if failed_attempts >= 5:
                 txt_usuario.disabled = True
                 txt_password.disabled = True
@@ -204,11 +290,26 @@ def main(page: ft.Page):
                 btn_login.disabled = True
                 error_text = "Demasiados intentos fallidos. El acceso ha sido bloqueado."
 
-            sn = ft.SnackBar(ft.Text(error_text), bgcolor=ft.Colors.RED)
-            page.overlay.append(sn)
-            sn.open = True
-        
-        page.update()
+            mostrar_mensaje(error_text, ft.Colors.RED)
+            page.update()
+            return
+
+        loading.visible = False
+        btn_login.disabled = False
+        usr_id = sesion.usr_id
+        usr_name = sesion.usr_name
+
+        failed_attempts = 0
+        txt_captcha.value = ""
+        txt_usuario.value = ""
+        txt_password.value = ""
+
+        if sesion.r_name == "Admin":
+            show_home_admin()
+        elif sesion.r_name == "Agente":
+            show_home_agente()
+        else:
+            show_home()  # Paciente
 
     def login_click(e):
         if not txt_usuario.value:
@@ -251,7 +352,7 @@ def main(page: ft.Page):
                 page.update()
                 return
         
-        page.run_task(login_task)
+        lanzar_tarea(login_task)
 
     btn_login = ft.Container(
         content=ft.Text("Iniciar Sesión", color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD),
@@ -282,41 +383,21 @@ def main(page: ft.Page):
         page.update()
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{API_URL}/register",
-                    json={
-                        "usuario": txt_reg_usuario.value,
-                        "password": txt_reg_password.value
-                    },
-                    timeout=10.0
-                )
-            
-            loading.visible = False
-            
-            if response.status_code == 200:
-                sn = ft.SnackBar(ft.Text("Registro exitoso. Por favor inicie sesión."), bgcolor=ft.Colors.GREEN)
-                page.overlay.append(sn)
-                sn.open = True
-                txt_reg_usuario.value = ""
-                txt_reg_password.value = ""
-                show_login()
-            else:
-                error_msg = response.json().get("detail", "Error en el registro")
-                sn = ft.SnackBar(ft.Text(error_msg), bgcolor=ft.Colors.RED)
-                page.overlay.append(sn)
-                sn.open = True
-                
+            await api.registrar(txt_reg_usuario.value, txt_reg_password.value)
         except Exception as ex:
             loading.visible = False
-            sn = ft.SnackBar(ft.Text(f"Error: {ex}"), bgcolor=ft.Colors.RED)
-            page.overlay.append(sn)
-            sn.open = True
-        
-        page.update()
+            mostrar_mensaje(texto_error(ex, "Error"), ft.Colors.RED)
+            page.update()
+            return
+
+        loading.visible = False
+        mostrar_mensaje("Registro exitoso. Por favor inicie sesión.", ft.Colors.GREEN)
+        txt_reg_usuario.value = ""
+        txt_reg_password.value = ""
+        show_login()
 
     def show_register(e=None):
-        page.controls.clear()
+        limpiar_vista()
         
         # Decoraciones de fondo (Círculos) - Diseño diferente al login
         reg_bg_elements = [
@@ -390,7 +471,7 @@ def main(page: ft.Page):
                     width=250,
                     height=45,
                     border_radius=25,
-                    on_click=register_task,
+                    on_click=lambda e: lanzar_tarea(register_task, e),
                 ),
                 ft.TextButton(
                     "Volver al inicio de sesión",
@@ -418,7 +499,7 @@ def main(page: ft.Page):
         page.update()
 
     def show_login():
-        page.controls.clear()
+        limpiar_vista()
         
         # Decoraciones de fondo (Círculos)
         bg_elements = [
@@ -508,7 +589,7 @@ def main(page: ft.Page):
 
     def show_home():
         nonlocal usr_id, usr_name
-        page.controls.clear()
+        limpiar_vista()
         
         # Card para Agendar Cita
         card_agendar = ft.Container(
@@ -576,7 +657,7 @@ def main(page: ft.Page):
                     content=ft.TextButton(
                         "Cerrar Sesión",
                         icon=ft.Icons.LOGOUT,
-                        on_click=lambda _: show_login(),
+                        on_click=cerrar_sesion,
                         style=ft.ButtonStyle(
                             color=ft.Colors.RED_400,
                         ),
@@ -603,7 +684,7 @@ def main(page: ft.Page):
         )
         page.update()
 
-        def handle_confirmar_sede(e, dropdown, lab_field, nombre_field, cedula_field, empresa_field, fecha_field):
+        async def handle_confirmar_sede(e, dropdown, lab_field, nombre_field, cedula_field, empresa_field, fecha_field):
             print("Confirming appointment with:", nombre_field.value, cedula_field.value, empresa_field.value, dropdown.value, lab_field.value, fecha_field.value)
             if not nombre_field.value:
                 sn = ft.SnackBar(ft.Text("Por favor ingrese su nombre completo"), bgcolor=ft.Colors.ORANGE)
@@ -647,47 +728,31 @@ def main(page: ft.Page):
                 return
             
             # Enviar datos al backend
+            marcar_ocupado(e.control, True)
+            page.update()
             try:
-                response = httpx.post(
-                    f"{API_URL}/citas", 
-                    json={
-                        "nombre_paciente": nombre_field.value,
-                        "cedula_paciente": cedula_field.value,
-                        "sede": dropdown.value,
-                        "laboratorio": lab_field.value,
-                        "fecha": fecha_field.value,
-                        "empresa_paciente": empresa_field.value
-                    },
-                    timeout=10.0
+                await api.crear_cita(
+                    nombre_field.value, cedula_field.value, dropdown.value,
+                    lab_field.value, fecha_field.value, empresa_field.value
                 )
-                
-                if response.status_code == 200:
-                    sn = ft.SnackBar(ft.Text("Cita agendada con éxito"), bgcolor=ft.Colors.GREEN)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    show_home()
-                else:
-                    error_msg = response.json().get("detail", "Error al agendar cita")
-                    sn = ft.SnackBar(ft.Text(error_msg), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
-
             except Exception as ex:
-                sn = ft.SnackBar(ft.Text(f"Error de conexión: {ex}"), bgcolor=ft.Colors.RED)
-                page.overlay.append(sn)
-                sn.open = True
-                
-            page.update()
+                mostrar_mensaje(texto_error(ex), ft.Colors.RED)
+                marcar_ocupado(e.control, False)
+                page.update()
+                return
+
+            mostrar_mensaje("Cita agendada con éxito", ft.Colors.GREEN)
+            show_home()
 
         def show_agendar_cita():
-            page.controls.clear()
+            limpiar_vista()
             
             # Variable para almacenar los días disponibles de la sede seleccionada
-            dias_disponibles_sede = {"dias": None} # Usamos dict para poder modificar en funciones anidadas
+            dias_disponibles_sede = {"dias": None, "mascara": None} # Usamos dict para poder modificar en funciones anidadas
             turnos_info = {"disponibles": None, "totales": None} # Almacenar info de turnos de sede
             turnos_empresa_info = {"disponibles": None, "totales": None} # Almacenar info de turnos de empresa
-            sedes_data = {} # Diccionario para almacenar información de todas las sedes
-            empresas_data = {} # Diccionario para almacenar información de todas las empresas
+            sedes_data = {} # Sedes por nombre (con sus días de atención)
+            disponibilidad_dias = {} # Disponibilidad por fecha de la sede/empresa seleccionadas
         
             txt_nombre = ft.TextField(
                 label="Nombre Completo",
@@ -721,12 +786,22 @@ def main(page: ft.Page):
             def on_sede_change(e):
                 """Cuando se selecciona una sede, actualizar los días disponibles"""
                 if sede_dropdown.value and sede_dropdown.value in sedes_data:
-                    dias_disponibles_sede["dias"] = sedes_data[sede_dropdown.value]["dias_atencion"]
+                    dias_disponibles_sede["dias"] = sedes_data[sede_dropdown.value].dias_atencion
+                    dias_disponibles_sede["mascara"] = sedes_data[sede_dropdown.value].dias_atencion_mask
                     # Limpiar la fecha seleccionada cuando cambia la sede
                     txt_fecha.value = ""
                     txt_turnos_count.value = "" # Limpiar info de turnos
                     txt_turnos_empresa_count.value = "" # Limpiar info de turnos de empresa
                     page.update()
+                    lanzar_tarea(cargar_disponibilidad)
+
+            def on_empresa_change(e):
+                """Cuando cambia la empresa, recargar la disponibilidad del rango"""
+                txt_turnos_empresa_count.value = ""
+                page.update()
+                lanzar_tarea(cargar_disponibilidad)
+
+            empresa_dropdown.on_change = on_empresa_change
             
             sede_dropdown = ft.Dropdown(
                 label="Seleccione su Sede",
@@ -741,41 +816,9 @@ def main(page: ft.Page):
             # Asignar el evento después de crear el dropdown
             sede_dropdown.on_change = on_sede_change
 
-            def load_empresas():
-                try:
-                    response = httpx.get(f"{API_URL}/empresas", timeout=5.0)
-                    if response.status_code == 200:
-                        empresas = response.json()
-                        for e in empresas:
-                            empresas_data[e["nombre"]] = e # Almacenar datos completos de la empresa
-                        empresa_dropdown.options = [ft.dropdown.Option(e["nombre"]) for e in empresas]
-                        empresa_dropdown.hint_text = "Escoja una empresa"
-                        empresa_dropdown.update()
-                except Exception as e:
-                    print(f"Error loading empresas: {e}")
-                    empresa_dropdown.hint_text = "Error al cargar empresas"
-                    empresa_dropdown.update()
-
-
-
-            def load_sedes():
-                try:
-                    response = httpx.get(f"{API_URL}/sedes", timeout=5.0)
-                    if response.status_code == 200:
-                        sedes = response.json()
-                        # Almacenar información completa de las sedes
-                        for s in sedes:
-                            sedes_data[s["nombre"]] = {
-                                "id": s["id"],
-                                "dias_atencion": s.get("dias_atencion", "")
-                            }
-                        sede_dropdown.options = [ft.dropdown.Option(s["nombre"]) for s in sedes]
-                        sede_dropdown.hint_text = "Escoja una sede para sus laboratorios"
-                        sede_dropdown.update()
-                except Exception as e:
-                    print(f"Error loading sedes: {e}")
-                    sede_dropdown.hint_text = "Error al cargar sedes"
-                    sede_dropdown.update()
+            async def cargar_listas():
+                _, sedes = await cargar_desplegables(empresa_dropdown, sede_dropdown, hint_sede="Escoja una sede para sus laboratorios")
+                sedes_data.update(sedes)
             
             lab_field = ft.TextField(
                 label="Nombre del Laboratorio",
@@ -812,94 +855,91 @@ def main(page: ft.Page):
                 italic=True
             )
 
+            def mostrar_turnos_sede(totales, disponibles):
+                turnos_info["disponibles"] = disponibles
+                turnos_info["totales"] = totales
+
+                if totales is None:
+                    txt_turnos_count.value = "✓ Cupos ilimitados disponibles"
+                    txt_turnos_count.color = ft.Colors.GREEN_600
+                else:
+                    txt_turnos_count.value = f"Cupos disponibles: {disponibles} de {totales}"
+                    if disponibles > 3:
+                        txt_turnos_count.color = ft.Colors.GREEN_600
+                    elif disponibles > 0:
+                        txt_turnos_count.color = ft.Colors.ORANGE_600
+                    else:
+                        txt_turnos_count.value = "⚠ No hay cupos para esta fecha"
+                        txt_turnos_count.color = ft.Colors.RED_600
+
+            def mostrar_turnos_empresa(totales, disponibles):
+                turnos_empresa_info["disponibles"] = disponibles
+                turnos_empresa_info["totales"] = totales
+
+                if totales is None:
+                    txt_turnos_empresa_count.value = "✓ Convenio: Cupos ilimitados"
+                    txt_turnos_empresa_count.color = ft.Colors.GREEN_600
+                else:
+                    txt_turnos_empresa_count.value = f"Empresa: {disponibles} de {totales} cupos"
+                    if disponibles > 2:
+                        txt_turnos_empresa_count.color = ft.Colors.GREEN_600
+                    elif disponibles > 0:
+                        txt_turnos_empresa_count.color = ft.Colors.ORANGE_600
+                    else:
+                        txt_turnos_empresa_count.value = "⚠ Sin cupos por convenio hoy"
+                        txt_turnos_empresa_count.color = ft.Colors.RED_600
+
+            async def cargar_disponibilidad():
+                """Trae en una sola llamada la disponibilidad de los próximos DIAS_DISPONIBILIDAD días"""
+                disponibilidad_dias.clear()
+                if not sede_dropdown.value and not empresa_dropdown.value:
+                    return
+                desde = datetime.date.today()
+                params = {
+                    "desde": desde,
+                    "hasta": desde + datetime.timedelta(days=DIAS_DISPONIBILIDAD),
+                }
+                if sede_dropdown.value:
+                    params["sede"] = sede_dropdown.value
+                if empresa_dropdown.value:
+                    params["empresa"] = empresa_dropdown.value
+                try:
+                    for dia in await api.disponibilidad(**params):
+                        disponibilidad_dias[dia.fecha] = dia
+                except Exception as ex:
+                    print(f"Error cargando disponibilidad: {ex}")
+
             async def verificar_disponibilidad_turnos(sede_nombre, fecha_str):
                 """Consulta al backend la disponibilidad de turnos"""
                 try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(
-                            f"{API_URL}/sedes/{sede_nombre}/turnos-disponibles",
-                            params={"fecha": fecha_str},
-                            timeout=5.0
-                        )
-                    if response.status_code == 200:
-                        data = response.json()
-                        turnos_info["disponibles"] = data["turnos_disponibles"]
-                        turnos_info["totales"] = data["turnos_totales"]
-                        
-                        if data["turnos_totales"] is None:
-                            txt_turnos_count.value = "✓ Cupos ilimitados disponibles"
-                            txt_turnos_count.color = ft.Colors.GREEN_600
-                        else:
-                            txt_turnos_count.value = f"Cupos disponibles: {data['turnos_disponibles']} de {data['turnos_totales']}"
-                            if data["turnos_disponibles"] > 3:
-                                txt_turnos_count.color = ft.Colors.GREEN_600
-                            elif data["turnos_disponibles"] > 0:
-                                txt_turnos_count.color = ft.Colors.ORANGE_600
-                            else:
-                                txt_turnos_count.value = "⚠ No hay cupos para esta fecha"
-                                txt_turnos_count.color = ft.Colors.RED_600
-                        
-                        txt_turnos_count.update()
+                    turnos = await api.turnos_sede(sede_nombre, fecha_str)
+                    mostrar_turnos_sede(turnos.turnos_totales, turnos.turnos_disponibles)
+                    txt_turnos_count.update()
                 except Exception as ex:
                     print(f"Error verificando turnos: {ex}")
 
             async def verificar_disponibilidad_turnos_empresa(empresa_nombre, fecha_str):
                 """Consulta al backend la disponibilidad de turnos por empresa"""
                 try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(
-                            f"{API_URL}/empresas/{empresa_nombre}/turnos-disponibles",
-                            params={"fecha": fecha_str},
-                            timeout=5.0
-                        )
-                    if response.status_code == 200:
-                        data = response.json()
-                        turnos_empresa_info["disponibles"] = data["turnos_disponibles"]
-                        turnos_empresa_info["totales"] = data["turnos_totales"]
-                        
-                        if data["turnos_totales"] is None:
-                            txt_turnos_empresa_count.value = "✓ Convenio: Cupos ilimitados"
-                            txt_turnos_empresa_count.color = ft.Colors.GREEN_600
-                        else:
-                            txt_turnos_empresa_count.value = f"Empresa: {data['turnos_disponibles']} de {data['turnos_totales']} cupos"
-                            if data["turnos_disponibles"] > 2:
-                                txt_turnos_empresa_count.color = ft.Colors.GREEN_600
-                            elif data["turnos_disponibles"] > 0:
-                                txt_turnos_empresa_count.color = ft.Colors.ORANGE_600
-                            else:
-                                txt_turnos_empresa_count.value = "⚠ Sin cupos por convenio hoy"
-                                txt_turnos_empresa_count.color = ft.Colors.RED_600
-                        
-                        txt_turnos_empresa_count.update()
+                    turnos = await api.turnos_empresa(empresa_nombre, fecha_str)
+                    mostrar_turnos_empresa(turnos.turnos_totales, turnos.turnos_disponibles)
+                    txt_turnos_empresa_count.update()
                 except Exception as ex:
                     print(f"Error verificando turnos empresa: {ex}")
             
             def es_dia_disponible(fecha):
                 """Verifica si una fecha está en un día disponible según la configuración de la sede"""
-                print(f"DEBUG es_dia_disponible: dias_disponibles_sede = {dias_disponibles_sede['dias']}")
-                
-                if not dias_disponibles_sede["dias"]:
+                # Dentro del rango ya cargado el backend aplicó los días de atención y los festivos
+                dia = disponibilidad_dias.get(fecha.date())
+                if dia and dia.sede:
+                    return dia.atiende
+
+                mascara = dias_disponibles_sede["mascara"]
+                if mascara is None:
                     # Si no hay días configurados, permitir todos
-                    print("DEBUG: No hay días configurados, permitiendo todos")
                     return True
-                
-                # Mapeo de días en español
-                dias_semana = {
-                    0: "Lunes",
-                    1: "Martes",
-                    2: "Miércoles",
-                    3: "Jueves",
-                    4: "Viernes",
-                    5: "Sábado",
-                    6: "Domingo"
-                }
-                
-                # Obtener el día de la semana de la fecha seleccionada
-                dia_semana = dias_semana[fecha.weekday()]
-                
-                # Verificar si el día está en la lista de días disponibles
-                dias_config = [d.strip() for d in dias_disponibles_sede["dias"].split(",")]       
-                return dia_semana in dias_config
+                # Bit 0 = lunes ... bit 6 = domingo
+                return bool(mascara >> fecha.weekday() & 1)
 
             def change_date(e):
                 if date_picker.value:
@@ -910,12 +950,20 @@ def main(page: ft.Page):
                         
                         txt_fecha.value = fecha_str
                         txt_fecha.error_text = None
-                        # Verificar disponibilidad de turnos si hay sede seleccionada
+                        dia = disponibilidad_dias.get(date_picker.value.date())
+                        # Usar la disponibilidad ya cargada para el rango; si la fecha
+                        # está fuera de él, consultar ese día al backend
                         if sede_dropdown.value:
-                            page.run_task(verificar_disponibilidad_turnos, sede_dropdown.value, fecha_str)
+                            if dia and dia.sede:
+                                mostrar_turnos_sede(dia.sede.totales, dia.sede.disponibles)
+                            else:
+                                lanzar_tarea(verificar_disponibilidad_turnos, sede_dropdown.value, fecha_str)
                         
                         if empresa_dropdown.value:
-                            page.run_task(verificar_disponibilidad_turnos_empresa, empresa_dropdown.value, fecha_str)
+                            if dia and dia.empresa:
+                                mostrar_turnos_empresa(dia.empresa.totales, dia.empresa.disponibles)
+                            else:
+                                lanzar_tarea(verificar_disponibilidad_turnos_empresa, empresa_dropdown.value, fecha_str)
                     else:
                         txt_fecha.value = ""
                         txt_fecha.error_text = "Este día no está disponible para la sede seleccionada"
@@ -923,7 +971,7 @@ def main(page: ft.Page):
                         txt_turnos_empresa_count.value = ""
                         
                         # Mostrar mensaje al usuario
-                        dias_config = dias_disponibles_sede["dias"] if dias_disponibles_sede["dias"] else "No configurados"
+                        dias_config = ", ".join(dias_disponibles_sede["dias"]) if dias_disponibles_sede["dias"] else "No configurados"
                         sn = ft.SnackBar(
                             ft.Text(f"Día no disponible. Días permitidos: {dias_config}"),
                             bgcolor=ft.Colors.ORANGE
@@ -954,7 +1002,8 @@ def main(page: ft.Page):
                 
                 # Cargar los días disponibles de la sede seleccionada
                 if sede_dropdown.value in sedes_data:
-                    dias_disponibles_sede["dias"] = sedes_data[sede_dropdown.value]["dias_atencion"]
+                    dias_disponibles_sede["dias"] = sedes_data[sede_dropdown.value].dias_atencion
+                    dias_disponibles_sede["mascara"] = sedes_data[sede_dropdown.value].dias_atencion_mask
                     print(f"DEBUG abrir_calendario: Sede seleccionada: {sede_dropdown.value}")
                     print(f"DEBUG abrir_calendario: Días disponibles cargados: {dias_disponibles_sede['dias']}")
                 else:
@@ -1015,7 +1064,7 @@ def main(page: ft.Page):
                         ),
                         width=250,
                         height=50,
-                        on_click=lambda e: handle_confirmar_sede(e, sede_dropdown, lab_field, txt_nombre, txt_cedula, empresa_dropdown, txt_fecha),
+                        on_click=lambda e: lanzar_tarea(handle_confirmar_sede, e, sede_dropdown, lab_field, txt_nombre, txt_cedula, empresa_dropdown, txt_fecha),
                     ),
                     ft.TextButton(
                         "Volver al Inicio",
@@ -1039,12 +1088,11 @@ def main(page: ft.Page):
             page.update()
             
             # Cargar datos después de que los controles estén en la página
-            load_empresas()
-            load_sedes()
+            lanzar_tarea(cargar_listas)
 
     def show_home_admin():
         nonlocal usr_id, usr_name
-        page.controls.clear()
+        limpiar_vista()
 
         def admin_card(icon, title, description, action):
             return ft.Container(
@@ -1101,7 +1149,7 @@ def main(page: ft.Page):
             ft.Icons.SETTINGS,
             "Configuración",
             "Parámetros generales del sistema",
-            lambda _: show_configuracion(),
+            lambda _: show_configuracion_cuenta(show_home_admin),
         )
 
         main_content = ft.Column(
@@ -1150,7 +1198,7 @@ def main(page: ft.Page):
                 content=ft.TextButton(
                     "Cerrar Sesión",
                     icon=ft.Icons.LOGOUT,
-                    on_click=lambda _: show_login(),
+                    on_click=cerrar_sesion,
                     style=ft.ButtonStyle(color=ft.Colors.RED_400),
                 ),
                 padding=ft.padding.only(top=10),
@@ -1176,7 +1224,7 @@ def main(page: ft.Page):
         page.update()
     
         def show_config_dias():
-            page.controls.clear()
+            limpiar_vista()
 
             dias_semana = [
                 "Lunes", "Martes", "Miércoles",
@@ -1187,7 +1235,7 @@ def main(page: ft.Page):
                 dia: ft.Checkbox(label=dia) for dia in dias_semana
             }
             
-            # Diccionario para almacenar la información de las sedes (nombre -> id)
+            # Sedes por nombre
             sedes_map = {}
 
             sede_dropdown = ft.Dropdown(
@@ -1196,24 +1244,8 @@ def main(page: ft.Page):
             )
 
             async def load_sedes():
-                try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(f"{API_URL}/sedes", timeout=5.0)
-                    if response.status_code == 200:
-                        sedes = response.json()
-                        # Almacenar mapeo de nombre a ID y datos completos
-                        for s in sedes:
-                            sedes_map[s["nombre"]] = {
-                                "id": s["id"],
-                                "dias_atencion": s.get("dias_atencion", "")
-                            }
-                        sede_dropdown.options = [ft.dropdown.Option(s["nombre"]) for s in sedes]
-                        sede_dropdown.hint_text = "Seleccione una sede"
-                        sede_dropdown.update()
-                except Exception as e:
-                    print(f"Error loading sedes: {e}")
-                    sede_dropdown.hint_text = "Error al cargar sedes"
-                    sede_dropdown.update()
+                _, sedes = await cargar_desplegables(sede_dropdown=sede_dropdown, hint_sede="Seleccione una sede")
+                sedes_map.update(sedes)
 
             async def load_dias_sede(e):
                 sede_nombre = sede_dropdown.value
@@ -1222,8 +1254,7 @@ def main(page: ft.Page):
 
                 try:
                     # Obtener los días guardados del mapeo
-                    dias_guardados = sedes_map[sede_nombre]["dias_atencion"]
-                    dias_activos = [d.strip() for d in dias_guardados.split(",")] if dias_guardados else []
+                    dias_activos = sedes_map[sede_nombre].dias_atencion or []
 
                     for dia, cb in checkboxes.items():
                         cb.value = dia in dias_activos
@@ -1245,40 +1276,26 @@ def main(page: ft.Page):
                     dia for dia, cb in checkboxes.items() if cb.value
                 ]
 
-                dias_string = ",".join(dias_seleccionados)
-                sede_id = sedes_map[sede_nombre]["id"]
+                sede = sedes_map[sede_nombre]
 
+                marcar_ocupado(e.control, True)
+                page.update()
                 try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.put(
-                            f"{API_URL}/sedes/{sede_id}",
-                            json={"dias_atencion": dias_string}, 
-                            timeout=5
-                        )
-
-                    if response.status_code == 200:
-                        # Actualizar el mapeo local
-                        sedes_map[sede_nombre]["dias_atencion"] = dias_string
-                        sn = ft.SnackBar(ft.Text("Días actualizados correctamente"), bgcolor=ft.Colors.GREEN)
-                        # Limpiar los campos
-                        sede_dropdown.value = ""
-                        for cb in checkboxes.values():
-                            cb.value = False
-                    else:
-                        error_detail = response.json().get("detail", "Error desconocido")
-                        sn = ft.SnackBar(ft.Text(f"Error al guardar: {error_detail}"), bgcolor=ft.Colors.RED)
-
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
+                    await api.actualizar_sede(sede.id, dias_atencion=dias_seleccionados)
+                    # Actualizar el mapeo local
+                    sede.dias_atencion = dias_seleccionados
+                    mostrar_mensaje("Días actualizados correctamente", ft.Colors.GREEN)
+                    # Limpiar los campos
+                    sede_dropdown.value = ""
+                    for cb in checkboxes.values():
+                        cb.value = False
+                except Exception as ex:
+                    mostrar_mensaje(texto_error(ex, "Error"), ft.Colors.RED)
 
-                except Exception as e:
-                    sn = ft.SnackBar(ft.Text(f"Error: {e}"), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
+                marcar_ocupado(e.control, False)
+                page.update()
 
-            sede_dropdown.on_change = lambda e: page.run_task(load_dias_sede, e)
+            sede_dropdown.on_change = lambda e: lanzar_tarea(load_dias_sede, e)
 
             page.add(
                 ft.AppBar(
@@ -1303,7 +1320,7 @@ def main(page: ft.Page):
                                 "Guardar cambios",
                                 bgcolor="#005288",
                                 color=ft.Colors.WHITE,
-                                on_click=guardar_dias,
+                                on_click=lambda e: lanzar_tarea(guardar_dias, e),
                                 width=250,
                             ),
                             ft.TextButton(
@@ -1320,10 +1337,10 @@ def main(page: ft.Page):
             )
             page.update()
             
-            page.run_task(load_sedes)
+            lanzar_tarea(load_sedes)
 
         def show_turnos_sede():
-            page.controls.clear()
+            limpiar_vista()
 
             sede_dropdown = ft.Dropdown(
                 label="Seleccione la sede",
@@ -1336,26 +1353,12 @@ def main(page: ft.Page):
                 keyboard_type=ft.KeyboardType.NUMBER,
             )
 
-            # Diccionario para almacenar la información de las sedes (nombre -> dato)
+            # Sedes por nombre
             sedes_map = {}
 
             async def load_sedes():
-                try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(f"{API_URL}/sedes", timeout=5.0)
-                    if response.status_code == 200:
-                        sedes = response.json()
-                        # Almacenar mapeo de nombre a datos completos para acceso fácil
-                        for s in sedes:
-                            sedes_map[s["nombre"]] = {
-                                "id": s["id"],
-                                "cant_turnos": s.get("sd_cant_turnos")
-                            }
-                        sede_dropdown.options = [ft.dropdown.Option(s["nombre"]) for s in sedes]
-                        sede_dropdown.hint_text = "Seleccione la sede"
-                        sede_dropdown.update()
-                except Exception as e:
-                    print("Error cargando sedes:", e)
+                _, sedes = await cargar_desplegables(sede_dropdown=sede_dropdown, hint_sede="Seleccione la sede")
+                sedes_map.update(sedes)
 
             async def load_turnos_sede(e):
                 sede_nombre = sede_dropdown.value
@@ -1364,7 +1367,7 @@ def main(page: ft.Page):
 
                 try:
                     # Usar el valor almacenado localmente
-                    cant = sedes_map[sede_nombre]["cant_turnos"]
+                    cant = sedes_map[sede_nombre].sd_cant_turnos
                     txt_turnos.value = str(cant) if cant is not None else "0"
                     txt_turnos.update()
                 except Exception as e:
@@ -1379,37 +1382,24 @@ def main(page: ft.Page):
                     page.update()
                     return
 
-                sede_id = sedes_map[sede_nombre]["id"]
+                sede = sedes_map[sede_nombre]
 
+                marcar_ocupado(e.control, True)
+                page.update()
                 try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.put(
-                            f"{API_URL}/sedes/{sede_id}",
-                            json={"cant_turnos": int(txt_turnos.value)},
-                            timeout=5
-                        )
-
-                    if response.status_code == 200:
-                        # Actualizar mapa local
-                        sedes_map[sede_nombre]["cant_turnos"] = int(txt_turnos.value)
-                        sn = ft.SnackBar(ft.Text("Turnos actualizados correctamente"), bgcolor=ft.Colors.GREEN)
-                        sede_dropdown.value = ""
-                        txt_turnos.value = ""
-                    else:
-                        error_detail = response.json().get("detail", "Error desconocido")
-                        sn = ft.SnackBar(ft.Text(f"Error al guardar: {error_detail}"), bgcolor=ft.Colors.RED)
-
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
+                    await api.actualizar_sede(sede.id, cant_turnos=int(txt_turnos.value))
+                    # Actualizar mapa local
+                    sede.sd_cant_turnos = int(txt_turnos.value)
+                    mostrar_mensaje("Turnos actualizados correctamente", ft.Colors.GREEN)
+                    sede_dropdown.value = ""
+                    txt_turnos.value = ""
+                except Exception as ex:
+                    mostrar_mensaje(texto_error(ex, "Error"), ft.Colors.RED)
 
-                except Exception as e:
-                    sn = ft.SnackBar(ft.Text(f"Error: {e}"), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
+                marcar_ocupado(e.control, False)
+                page.update()
 
-            sede_dropdown.on_change = lambda e: page.run_task(load_turnos_sede, e)
+            sede_dropdown.on_change = lambda e: lanzar_tarea(load_turnos_sede, e)
 
             page.add(
                 ft.AppBar(
@@ -1442,7 +1432,7 @@ def main(page: ft.Page):
                                 bgcolor="#005288",
                                 color=ft.Colors.WHITE,
                                 width=200,
-                                on_click=guardar_turnos,
+                                on_click=lambda e: lanzar_tarea(guardar_turnos, e),
                             ),
                             ft.TextButton(
                                 "Volver al panel",
@@ -1460,10 +1450,10 @@ def main(page: ft.Page):
                 )
             )
             page.update()
-            page.run_task(load_sedes)
+            lanzar_tarea(load_sedes)
 
         def show_turnos_empresa():
-            page.controls.clear()
+            limpiar_vista()
 
             empresa_dropdown = ft.Dropdown(
                 label="Seleccione la empresa",
@@ -1476,32 +1466,19 @@ def main(page: ft.Page):
                 keyboard_type=ft.KeyboardType.NUMBER,
             )
 
-            # Mapeo local
+            # Empresas por nombre
             empresas_map = {}
 
             async def load_empresas():
-                try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(f"{API_URL}/empresas", timeout=5.0)
-                    if response.status_code == 200:
-                        empresas = response.json()
-                        for e in empresas:
-                            empresas_map[e["nombre"]] = {
-                                "id": e["id"],
-                                "cant_turnos": e.get("cant_turnos")
-                            }
-                        empresa_dropdown.options = [ft.dropdown.Option(e["nombre"]) for e in empresas]
-                        empresa_dropdown.hint_text = "Escoja una empresa"
-                        empresa_dropdown.update()
-                except Exception as e:
-                    print(f"Error loading empresas: {e}")
+                empresas, _ = await cargar_desplegables(empresa_dropdown=empresa_dropdown)
+                empresas_map.update(empresas)
 
             async def load_turnos_empresa(e):
                 emp_nombre = empresa_dropdown.value
                 if not emp_nombre or emp_nombre not in empresas_map:
                     return
 
-                cant = empresas_map[emp_nombre]["cant_turnos"]
+                cant = empresas_map[emp_nombre].cant_turnos
                 txt_turnos.value = str(cant) if cant is not None else "0"
                 txt_turnos.update()
 
@@ -1514,34 +1491,23 @@ def main(page: ft.Page):
                     page.update()
                     return
 
-                emp_id = empresas_map[emp_nombre]["id"]
+                empresa = empresas_map[emp_nombre]
 
+                marcar_ocupado(e.control, True)
+                page.update()
                 try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.put(
-                            f"{API_URL}/empresas/{emp_id}",
-                            json={"cant_turnos": int(txt_turnos.value)},
-                            timeout=5
-                        )
-
-                    if response.status_code == 200:
-                        empresas_map[emp_nombre]["cant_turnos"] = int(txt_turnos.value)
-                        sn = ft.SnackBar(ft.Text("Turnos actualizados correctamente"), bgcolor=ft.Colors.GREEN)
-                        empresa_dropdown.value = ""
-                        txt_turnos.value = ""
-                    else:
-                        sn = ft.SnackBar(ft.Text("Error al guardar"), bgcolor=ft.Colors.RED)
-
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
+                    await api.actualizar_empresa(empresa.id, int(txt_turnos.value))
+                    empresa.cant_turnos = int(txt_turnos.value)
+                    mostrar_mensaje("Turnos actualizados correctamente", ft.Colors.GREEN)
+                    empresa_dropdown.value = ""
+                    txt_turnos.value = ""
                 except Exception as ex:
-                    sn = ft.SnackBar(ft.Text(f"Error: {ex}"), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
+                    mostrar_mensaje(texto_error(ex, "Error"), ft.Colors.RED)
+
+                marcar_ocupado(e.control, False)
+                page.update()
 
-            empresa_dropdown.on_change = lambda e: page.run_task(load_turnos_empresa, e)
+            empresa_dropdown.on_change = lambda e: lanzar_tarea(load_turnos_empresa, e)
 
             page.add(
                 ft.AppBar(
@@ -1574,7 +1540,7 @@ def main(page: ft.Page):
                                 bgcolor="#005288",
                                 color=ft.Colors.WHITE,
                                 width=200,
-                                on_click=guardar_turnos,
+                                on_click=lambda e: lanzar_tarea(guardar_turnos, e),
                             ),
                             ft.TextButton(
                                 "Volver al panel",
@@ -1593,148 +1559,10 @@ def main(page: ft.Page):
             )
 
             page.update()
-            page.run_task(load_empresas)
-
-        def show_configuracion():
-            page.controls.clear()
-
-            txt_username = ft.TextField(
-                label="Nuevo nombre de usuario",
-                width=300,
-            )
-
-            txt_password = ft.TextField(
-                label="Nueva contraseña",
-                password=True,
-                can_reveal_password=True,
-                width=300,
-            )
-
-            txt_password_confirm = ft.TextField(
-                label="Confirmar contraseña",
-                password=True,
-                can_reveal_password=True,
-                width=300,
-            )
-
-            def guardar_username(e):
-                if not txt_username.value:
-                    sn = ft.SnackBar(ft.Text("Ingrese un nombre de usuario"), bgcolor=ft.Colors.ORANGE)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
-                    return
-
-                try:
-                    response = httpx.put(
-                        f"{API_URL}/usuarios/{usr_id}/username",
-                        json={"username": txt_username.value},
-                        timeout=5
-                    )
-
-                    if response.status_code == 200:
-                        sn = ft.SnackBar(ft.Text("Nombre de usuario actualizado"), bgcolor=ft.Colors.GREEN)
-                    else:
-                        sn = ft.SnackBar(ft.Text("Error al actualizar"), bgcolor=ft.Colors.RED)
-                except Exception as ex:
-                    sn = ft.SnackBar(ft.Text(f"Error de conexión: {ex}"), bgcolor=ft.Colors.RED)
-
-                page.overlay.append(sn)
-                sn.open = True
-                page.update()
-
-            def guardar_password(e):
-                if not txt_password.value or not txt_password_confirm.value:
-                    sn = ft.SnackBar(ft.Text("Complete ambos campos"), bgcolor=ft.Colors.ORANGE)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
-                    return
-
-                if txt_password.value != txt_password_confirm.value:
-                    sn = ft.SnackBar(ft.Text("Las contraseñas no coinciden"), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
-                    return
-
-                try:
-                    response = httpx.put(
-                        f"{API_URL}/usuarios/{usr_id}/password",
-                        json={"password": txt_password.value},
-                        timeout=5
-                    )
-                    if response.status_code == 200:
-                        sn = ft.SnackBar(ft.Text("Contraseña actualizada"), bgcolor=ft.Colors.GREEN)
-                        txt_password.value = ""
-                        txt_password_confirm.value = ""
-                    else:
-                        sn = ft.SnackBar(ft.Text("Error al actualizar contraseña"), bgcolor=ft.Colors.RED)
-                except Exception as ex:
-                    sn = ft.SnackBar(ft.Text(f"Error de conexión: {ex}"), bgcolor=ft.Colors.RED)
-
-                page.overlay.append(sn)
-                sn.open = True
-                page.update()
-
-            page.add(
-                ft.AppBar(
-                    title=ft.Text("Configuración"),
-                    bgcolor="#005288",
-                    color=ft.Colors.WHITE,
-                    center_title=True,
-                ),
-                ft.Container(
-                    content=ft.Column(
-                        [
-                            ft.Text(
-                                "Configuración de cuenta",
-                                size=24,
-                                weight=ft.FontWeight.BOLD,
-                                color="#005288",
-                            ),
-
-                            ft.Divider(),
-
-                            ft.Text("Cambiar nombre de usuario", weight=ft.FontWeight.BOLD),
-                            txt_username,
-                            ft.ElevatedButton(
-                                "Guardar nombre",
-                                on_click=lambda e: page.run_task(guardar_username, e),
-                                bgcolor="#005288",
-                                color=ft.Colors.WHITE,
-                                width=250,
-                            ),
-
-                            ft.Divider(),
-
-                            ft.Text("Cambiar contraseña", weight=ft.FontWeight.BOLD),
-                            txt_password,
-                            txt_password_confirm,
-                            ft.ElevatedButton(
-                                "Cambiar contraseña",
-                                on_click=lambda e: page.run_task(guardar_password, e),
-                                bgcolor="#005288",
-                                color=ft.Colors.WHITE,
-                                width=250,
-                            ),
-
-                            ft.TextButton(
-                                "Volver al panel",
-                                icon=ft.Icons.ARROW_BACK,
-                                on_click=lambda _: show_home_admin(),
-                            ),
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        spacing=12,
-                    ),
-                    padding=20,
-                ),
-            )
-            page.update()
+            lanzar_tarea(load_empresas)
 
     def show_home_agente():
-        page.controls.clear()
+        limpiar_vista()
 
         def agente_card(icon, title, description, action):
             return ft.Container(
@@ -1776,7 +1604,7 @@ def main(page: ft.Page):
             ft.Icons.SETTINGS,
             "Configuración",
             "Administre su cuenta",
-            lambda e: agente_configuracion_view()
+            lambda e: show_configuracion_cuenta(show_home_agente)
         )
 
         main_content = ft.Column(
@@ -1815,7 +1643,7 @@ def main(page: ft.Page):
                 content=ft.TextButton(
                     "Cerrar Sesión",
                     icon=ft.Icons.LOGOUT,
-                    on_click=lambda _: show_login(),
+                    on_click=cerrar_sesion,
                     style=ft.ButtonStyle(color=ft.Colors.RED_400),
                 ),
                 padding=ft.padding.only(top=10),
@@ -1844,7 +1672,7 @@ def main(page: ft.Page):
         # GESTIÓN DE CITAS
         # =========================
         def show_crear_cita_agente_view():
-            page.controls.clear()
+            limpiar_vista()
         
             txt_nombre = ft.TextField(
                 label="Nombre Completo",
@@ -1889,31 +1717,8 @@ def main(page: ft.Page):
                 text_style=ft.TextStyle(color="black"),
             )
 
-            def load_empresas():
-                try:
-                    response = httpx.get(f"{API_URL}/empresas", timeout=5.0)
-                    if response.status_code == 200:
-                        empresas = response.json()
-                        empresa_dropdown.options = [ft.dropdown.Option(e["nombre"]) for e in empresas]
-                        empresa_dropdown.hint_text = "Escoja una empresa"
-                        empresa_dropdown.update()
-                except Exception as e:
-                    print(f"Error loading empresas: {e}")
-                    empresa_dropdown.hint_text = "Error al cargar empresas"
-                    empresa_dropdown.update()
-
-            def load_sedes():
-                try:
-                    response = httpx.get(f"{API_URL}/sedes", timeout=5.0)
-                    if response.status_code == 200:
-                        sedes = response.json()
-                        sede_dropdown.options = [ft.dropdown.Option(s["nombre"]) for s in sedes]
-                        sede_dropdown.hint_text = "Escoja una sede"
-                        sede_dropdown.update()
-                except Exception as e:
-                    print(f"Error loading sedes: {e}")
-                    sede_dropdown.hint_text = "Error al cargar sedes"
-                    sede_dropdown.update()
+            async def cargar_listas():
+                await cargar_desplegables(empresa_dropdown, sede_dropdown)
 
             lab_field = ft.TextField(
                 label="Nombre del Laboratorio",
@@ -1964,7 +1769,7 @@ def main(page: ft.Page):
                 alignment=ft.MainAxisAlignment.CENTER,
             )
 
-            def handle_crear_cita(e):
+            async def handle_crear_cita(e):
                 if not txt_nombre.value or not txt_cedula.value or not empresa_dropdown.value or not sede_dropdown.value or not lab_field.value or not txt_fecha.value:
                     sn = ft.SnackBar(ft.Text("Por favor complete todos los campos"), bgcolor=ft.Colors.ORANGE)
                     page.overlay.append(sn)
@@ -1972,37 +1777,21 @@ def main(page: ft.Page):
                     page.update()
                     return
 
+                marcar_ocupado(e.control, True)
+                page.update()
                 try:
-                    response = httpx.post(
-                        f"{API_URL}/citas", 
-                        json={
-                            "nombre_paciente": txt_nombre.value,
-                            "cedula_paciente": txt_cedula.value,
-                            "sede": sede_dropdown.value,
-                            "laboratorio": lab_field.value,
-                            "fecha": txt_fecha.value,
-                            "empresa_paciente": empresa_dropdown.value
-                        },
-                        timeout=10.0
+                    await api.crear_cita(
+                        txt_nombre.value, txt_cedula.value, sede_dropdown.value,
+                        lab_field.value, txt_fecha.value, empresa_dropdown.value
                     )
-                    
-                    if response.status_code == 200:
-                        sn = ft.SnackBar(ft.Text("Cita creada con éxito"), bgcolor=ft.Colors.GREEN)
-                        page.overlay.append(sn)
-                        sn.open = True
-                        agente_citas_view()
-                    else:
-                        error_msg = response.json().get("detail", "Error al crear cita")
-                        sn = ft.SnackBar(ft.Text(error_msg), bgcolor=ft.Colors.RED)
-                        page.overlay.append(sn)
-                        sn.open = True
-                        page.update()
-
                 except Exception as ex:
-                    sn = ft.SnackBar(ft.Text(f"Error de conexión: {ex}"), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
+                    mostrar_mensaje(texto_error(ex), ft.Colors.RED)
+                    marcar_ocupado(e.control, False)
                     page.update()
+                    return
+
+                mostrar_mensaje("Cita creada con éxito", ft.Colors.GREEN)
+                agente_citas_view()
 
             content = ft.Column(
                 [
@@ -2031,7 +1820,7 @@ def main(page: ft.Page):
                         ),
                         width=250,
                         height=50,
-                        on_click=handle_crear_cita,
+                        on_click=lambda e: lanzar_tarea(handle_crear_cita, e),
                     ),
                     ft.TextButton(
                         "Cancelar",
@@ -2055,56 +1844,153 @@ def main(page: ft.Page):
             )
             page.update()
             
-            load_empresas()
-            load_sedes()
+            lanzar_tarea(cargar_listas)
 
         def agente_citas_view():
-            page.controls.clear()
-            
-            # Contenedor principal para las tarjetas, con espaciado
-            citas_column = ft.Column(scroll=ft.ScrollMode.AUTO, spacing=15, expand=True)
+            limpiar_vista()
+
+            # Solo las filas cercanas a la vista tienen tarjeta; el resto se representa con
+            # dos espaciadores del alto que ocuparían, así el scroll conserva su tamaño real
+            citas = []
+            tarjetas = []
+            ventana = None
+            primera_visible = 0
+            posicion_scroll = 0
+            alto_vista = 800
+            siguiente_cursor = None
+            cargando = False
+
+            espacio_arriba = ft.Container(height=0)
+            espacio_abajo = ft.Container(height=0)
+            pie_lista = ft.Container(alignment=ft.Alignment(0, 0), padding=20)
+
+            indicador_citas = ft.ProgressRing(color="#005288")
+
+            def renderizar():
+                """Ubica las tarjetas sobre las filas visibles; devuelve False si la ventana no cambió"""
+                nonlocal ventana
+                visibles = int(alto_vista // ALTO_FILA_CITA) + 1
+                desde = max(0, primera_visible - FILAS_EXTRA_CITAS)
+                hasta = min(len(citas), primera_visible + visibles + FILAS_EXTRA_CITAS)
+                if ventana == (desde, hasta, len(citas)):
+                    return False
+                ventana = (desde, hasta, len(citas))
+
+                while len(tarjetas) < visibles + 2 * FILAS_EXTRA_CITAS:
+                    tarjetas.append(cita_card())
+                # La fila i usa siempre la tarjeta i % len(tarjetas): al desplazarse una fila
+                # solo se rellena la tarjeta que entra, las demás no cambian
+                filas = []
+                for i in range(desde, hasta):
+                    tarjeta = tarjetas[i % len(tarjetas)]
+                    if tarjeta.data["cita"] is not citas[i]:
+                        llenar_cita_card(tarjeta, citas[i])
+                    filas.append(tarjeta)
+
+                espacio_arriba.height = desde * ALTO_FILA_CITA
+                espacio_abajo.height = (len(citas) - hasta) * ALTO_FILA_CITA
+                citas_lista.controls = [espacio_arriba, *filas, espacio_abajo, pie_lista]
+                return True
+
+            async def cargar_citas(cursor=None):
+                nonlocal siguiente_cursor, cargando, ventana
+                cargando = True
+                pie_lista.content = indicador_citas
+                page.update()
 
-            def cargar_citas():
-                citas_column.controls.clear()
                 try:
-                    response = httpx.get(f"{API_URL}/citas")
-                    if response.status_code == 200:
-                        citas = response.json()
-                        if not citas:
-                            citas_column.controls.append(
-                                ft.Container(
-                                    content=ft.Text("No hay citas programadas", color="#666666", size=16),
-                                    alignment=ft.Alignment(0, 0),
-                                    padding=40
-                                )
-                            )
-                        else:
-                            for c in citas:
-                                citas_column.controls.append(cita_card(c))
-                    else:
-                        citas_column.controls.append(ft.Text(f"Error cargando citas: {response.text}", color="red"))
+                    pagina = await api.citas(cursor=cursor, limit=CITAS_POR_PAGINA)
                 except Exception as ex:
-                    citas_column.controls.append(ft.Text(f"Error de conexión: {ex}", color="red"))
+                    mensaje = f"Error cargando citas: {ex.detalle}" if isinstance(ex, ErrorAPI) else texto_error(ex)
+                    pie_lista.content = ft.Text(mensaje, color="red")
+                    page.update()
+                    return
+                finally:
+                    cargando = False
+
+                # Una cita editada que cambió de fecha puede volver a llegar en una página posterior
+                aplicar_cambios_citas(citas, eliminadas=[c.id for c in pagina.items])
+                citas.extend(pagina.items)
+                siguiente_cursor = pagina.next_cursor
+                if not citas:
+                    pie_lista.content = ft.Text("No hay citas programadas", color="#666666", size=16)
+                else:
+                    pie_lista.content = btn_cargar_mas if siguiente_cursor else None
+                ventana = None
+                renderizar()
+                page.update()
 
+            def aplicar_cambios(cambiadas=(), eliminadas=()):
+                """Parchea la lista con la respuesta de la API; solo se rellenan las tarjetas que cambian"""
+                nonlocal ventana
+                if not aplicar_cambios_citas(citas, cambiadas, eliminadas, completa=siguiente_cursor is None):
+                    return
+                if not citas and not siguiente_cursor:
+                    pie_lista.content = ft.Text("No hay citas programadas", color="#666666", size=16)
+                ventana = None
+                renderizar()
+
+            def volver_a_lista():
+                """Vuelve a mostrar la lista ya construida, sin pedirla de nuevo al backend"""
+                limpiar_vista()
+                page.add(vista_lista)
                 page.update()
+                # El ListView se monta de nuevo desde arriba: se restaura el desplazamiento
+                if posicion_scroll:
+                    citas_lista.scroll_to(offset=posicion_scroll, duration=0)
+                # Una página que se estaba cargando al salir se canceló junto con la vista
+                if pie_lista.content is indicador_citas and not cargando:
+                    lanzar_tarea(cargar_citas, siguiente_cursor)
+
+            def pedir_pagina():
+                if siguiente_cursor and not cargando:
+                    lanzar_tarea(cargar_citas, siguiente_cursor)
+
+            async def on_scroll_citas(e):
+                nonlocal alto_vista, primera_visible, posicion_scroll
+                if e.viewport_dimension:
+                    alto_vista = e.viewport_dimension
+                posicion_scroll = e.pixels
+                primera_visible = int(e.pixels // ALTO_FILA_CITA)
+                if renderizar():
+                    citas_lista.update()
+                # A menos de una pantalla del final se trae la página siguiente
+                if e.pixels >= e.max_scroll_extent - alto_vista:
+                    pedir_pagina()
+
+            citas_lista = ft.ListView(
+                controls=[espacio_arriba, espacio_abajo, pie_lista],
+                spacing=0,
+                expand=True,
+                on_scroll_interval=50,
+                on_scroll=on_scroll_citas,
+            )
+
+            btn_cargar_mas = ft.TextButton(
+                "Cargar más citas",
+                icon=ft.Icons.EXPAND_MORE,
+                on_click=lambda _: pedir_pagina(),
+                style=ft.ButtonStyle(color="#005288"),
+            )
 
-            def eliminar_cita(cita_id):
+            async def eliminar_cita(e, cita_id):
+                marcar_ocupado(e.control, True)
+                page.update()
                 try:
-                    httpx.delete(f"{API_URL}/citas/{cita_id}")
-                    # Mostrar confirmación visual (SnackBar)
-                    sn = ft.SnackBar(ft.Text("Cita eliminada correctamente"), bgcolor=ft.Colors.GREEN)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    # Volver a la lista tras eliminar
-                    agente_citas_view()
+                    await api.eliminar_cita(cita_id)
                 except Exception as ex:
-                    sn = ft.SnackBar(ft.Text(f"Error al eliminar: {ex}"), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
+                    mostrar_mensaje(texto_error(ex, "Error al eliminar"), ft.Colors.RED)
+                    marcar_ocupado(e.control, False)
                     page.update()
+                    return
+
+                # Quitar solo esa fila, mostrar confirmación visual (SnackBar) y volver a la lista
+                aplicar_cambios(eliminadas=[cita_id])
+                mostrar_mensaje("Cita eliminada correctamente", ft.Colors.GREEN)
+                volver_a_lista()
 
             def show_confirm_delete_view(cita_id):
-                page.controls.clear()
+                limpiar_vista()
 
                 content = ft.Column(
                     [
@@ -2128,14 +2014,14 @@ def main(page: ft.Page):
                                     "Cancelar",
                                     bgcolor="#999999",
                                     color=ft.Colors.WHITE,
-                                    on_click=lambda _: agente_citas_view(),
+                                    on_click=lambda _: volver_a_lista(),
                                     width=150,
                                 ),
                                 ft.ElevatedButton(
                                     "Eliminar",
                                     bgcolor=ft.Colors.RED,
                                     color=ft.Colors.WHITE,
-                                    on_click=lambda _: eliminar_cita(cita_id),
+                                    on_click=lambda e: lanzar_tarea(eliminar_cita, e, cita_id),
                                     width=150,
                                 ),
                             ],
@@ -2158,11 +2044,11 @@ def main(page: ft.Page):
                 page.update()
 
             def show_editar_cita_view(cita):
-                page.controls.clear()
+                limpiar_vista()
 
                 fecha = ft.TextField(
                     label="Fecha de la Cita", 
-                    value=cita["fecha"], 
+                    value=cita.fecha.isoformat() if cita.fecha else "", 
                     border_radius=8,
                     border_color="#005288",
                     width=250,
@@ -2200,7 +2086,7 @@ def main(page: ft.Page):
                 
                 estado = ft.Dropdown(
                     label="Estado de la Cita",
-                    value=cita.get("estado", "Pendiente"),
+                    value=cita.estado or "Pendiente",
                     border_radius=8,
                     border_color="#005288",
                     width=300,
@@ -2212,7 +2098,7 @@ def main(page: ft.Page):
                     ]
                 )
 
-                def guardar(e):
+                async def guardar(e):
                     if not fecha.value or not estado.value:
                         sn = ft.SnackBar(ft.Text("Todos los campos son obligatorios"), bgcolor=ft.Colors.ORANGE)
                         page.overlay.append(sn)
@@ -2220,35 +2106,21 @@ def main(page: ft.Page):
                         page.update()
                         return
 
+                    marcar_ocupado(e.control, True)
+                    page.update()
                     try:
-                        response = httpx.put(
-                            f"{API_URL}/citas/{cita['id']}",
-                            json={
-                                "fecha": fecha.value,
-                                "estado": estado.value
-                            },
-                            timeout=5
-                        )
-                        
-                        if response.status_code == 200:
-                            sn = ft.SnackBar(ft.Text("Cita actualizada correctamente"), bgcolor=ft.Colors.GREEN)
-                            page.overlay.append(sn)
-                            sn.open = True
-                            
-                            # Volver a la lista
-                            agente_citas_view()
-                        else:
-                            sn = ft.SnackBar(ft.Text(f"Error al guardar: {response.text}"), bgcolor=ft.Colors.RED)
-                            page.overlay.append(sn)
-                            sn.open = True
-                            page.update()
-
+                        respuesta = await api.actualizar_cita(cita.id, fecha.value, estado.value)
                     except Exception as ex:
                         print(f"Error: {ex}")
-                        sn = ft.SnackBar(ft.Text(f"Error de conexión: {ex}"), bgcolor=ft.Colors.RED)
-                        page.overlay.append(sn)
-                        sn.open = True
+                        mostrar_mensaje(texto_error(ex), ft.Colors.RED)
+                        marcar_ocupado(e.control, False)
                         page.update()
+                        return
+
+                    # Reemplazar solo la tarjeta de esa cita con la versión que devolvió el backend
+                    aplicar_cambios(cambiadas=[respuesta.cita])
+                    mostrar_mensaje("Cita actualizada correctamente", ft.Colors.GREEN)
+                    volver_a_lista()
 
                 content = ft.Column(
                     [
@@ -2259,7 +2131,7 @@ def main(page: ft.Page):
                             weight=ft.FontWeight.BOLD,
                             color="#005288",
                         ),
-                        ft.Text(f"Paciente: {cita['paciente_nombre']}", size=16, color="#666666"),
+                        ft.Text(f"Paciente: {cita.paciente_nombre}", size=16, color="#666666"),
                         ft.Container(height=10),
                         fecha_container,
                         estado,
@@ -2273,12 +2145,12 @@ def main(page: ft.Page):
                             ),
                             width=250,
                             height=50,
-                            on_click=guardar,
+                            on_click=lambda e: lanzar_tarea(guardar, e),
                         ),
                         ft.TextButton(
                             "Cancelar",
                             icon=ft.Icons.CLOSE,
-                            on_click=lambda _: agente_citas_view(),
+                            on_click=lambda _: volver_a_lista(),
                             style=ft.ButtonStyle(color=ft.Colors.RED),
                         ),
                     ],
@@ -2296,54 +2168,49 @@ def main(page: ft.Page):
                 )
                 page.update()
 
-            def cita_card(cita):
-                estado_text = cita.get("estado", "Pendiente")
-                
-                # Colores según estado
-                if estado_text == "Cancelada":
-                    badge_color = ft.Colors.RED_100
-                    text_color = ft.Colors.RED_900
-                    icon_status = ft.Icons.CANCEL
-                elif estado_text == "Confirmada":
-                    badge_color = ft.Colors.GREEN_100
-                    text_color = ft.Colors.GREEN_900
-                    icon_status = ft.Icons.CHECK_CIRCLE
-                elif estado_text == "No asistió":
-                    badge_color = ft.Colors.ORANGE_100
-                    text_color = ft.Colors.ORANGE_900
-                    icon_status = ft.Icons.HIGHLIGHT_OFF
-                else: # Pendiente
-                    badge_color = ft.Colors.BLUE_100
-                    text_color = ft.Colors.BLUE_900
-                    icon_status = ft.Icons.SCHEDULE
-
-                return ft.Container(
+            # Colores e ícono del distintivo según estado (Pendiente por defecto)
+            estilos_estado = {
+                "Cancelada": (ft.Colors.RED_100, ft.Colors.RED_900, ft.Icons.CANCEL),
+                "Confirmada": (ft.Colors.GREEN_100, ft.Colors.GREEN_900, ft.Icons.CHECK_CIRCLE),
+                "No asistió": (ft.Colors.ORANGE_100, ft.Colors.ORANGE_900, ft.Icons.HIGHLIGHT_OFF),
+                "Pendiente": (ft.Colors.BLUE_100, ft.Colors.BLUE_900, ft.Icons.SCHEDULE),
+            }
+
+            def cita_card():
+                """Tarjeta vacía y reutilizable; llenar_cita_card le asigna la cita de una fila"""
+                nombre = ft.Text(
+                    "", 
+                    weight=ft.FontWeight.BOLD, 
+                    size=16,
+                    color="#1a5276",
+                    max_lines=1,
+                    overflow=ft.TextOverflow.ELLIPSIS,
+                )
+                icono_estado = ft.Icon(ft.Icons.SCHEDULE, size=14)
+                texto_estado = ft.Text("", size=12, weight=ft.FontWeight.BOLD)
+                distintivo = ft.Container(
+                    content=ft.Row([icono_estado, texto_estado], spacing=5, alignment=ft.MainAxisAlignment.CENTER),
+                    padding=ft.padding.symmetric(horizontal=10, vertical=5),
+                    border_radius=20,
+                )
+                cedula = ft.Text("", size=13)
+                sede = ft.Text("", size=13)
+                empresa = ft.Text("", size=13)
+                laboratorio = ft.Text("", size=13)
+                fecha = ft.Text("", weight=ft.FontWeight.W_500, size=13)
+
+                tarjeta = ft.Container(
                     content=ft.Column(
                         [
                             # Header de la tarjeta: Nombre y Estado
                             ft.Row(
                                 [
                                     ft.Row(
-                                        [
-                                            ft.Icon(ft.Icons.PERSON, color="#005288"),
-                                            ft.Text(
-                                                cita['paciente_nombre'], 
-                                                weight=ft.FontWeight.BOLD, 
-                                                size=16,
-                                                color="#1a5276"
-                                            ),
-                                        ],
-                                        spacing=10
+                                        [ft.Icon(ft.Icons.PERSON, color="#005288"), nombre],
+                                        spacing=10,
+                                        expand=True,
                                     ),
-                                    ft.Container(
-                                        content=ft.Row([
-                                            ft.Icon(icon_status, size=14, color=text_color),
-                                            ft.Text(estado_text, size=12, color=text_color, weight=ft.FontWeight.BOLD)
-                                        ], spacing=5, alignment=ft.MainAxisAlignment.CENTER),
-                                        bgcolor=badge_color,
-                                        padding=ft.padding.symmetric(horizontal=10, vertical=5),
-                                        border_radius=20,
-                                    )
+                                    distintivo,
                                 ],
                                 alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                                 vertical_alignment=ft.CrossAxisAlignment.CENTER
@@ -2354,14 +2221,14 @@ def main(page: ft.Page):
                             ft.Row(
                                 [
                                     ft.Column([
-                                        ft.Row([ft.Icon(ft.Icons.BADGE_OUTLINED, size=16, color="#005288"), ft.Text(f"Cédula: {cita['paciente_cedula']}", size=13)]),
-                                        ft.Row([ft.Icon(ft.Icons.BUSINESS, size=16, color="#005288"), ft.Text(f"Sede: {cita['sede']}", size=13)]),
-                                        ft.Row([ft.Icon(ft.Icons.CORPORATE_FARE, size=16, color="#005288"), ft.Text(f"Empresa: {cita.get('empresa', 'Particular')}", size=13)]),
+                                        ft.Row([ft.Icon(ft.Icons.BADGE_OUTLINED, size=16, color="#005288"), cedula]),
+                                        ft.Row([ft.Icon(ft.Icons.BUSINESS, size=16, color="#005288"), sede]),
+                                        ft.Row([ft.Icon(ft.Icons.CORPORATE_FARE, size=16, color="#005288"), empresa]),
                                     ], spacing=5),
                                     
                                     ft.Column([
-                                        ft.Row([ft.Icon(ft.Icons.MEDICAL_SERVICES_OUTLINED, size=16, color="#005288"), ft.Text(f"Lab: {cita['laboratorio']}", size=13)]),
-                                        ft.Row([ft.Icon(ft.Icons.CALENDAR_MONTH, size=16, color="#005288"), ft.Text(f"Fecha: {cita['fecha']}", weight=ft.FontWeight.W_500, size=13)]),
+                                        ft.Row([ft.Icon(ft.Icons.MEDICAL_SERVICES_OUTLINED, size=16, color="#005288"), laboratorio]),
+                                        ft.Row([ft.Icon(ft.Icons.CALENDAR_MONTH, size=16, color="#005288"), fecha]),
                                     ], spacing=5),
                                 ],
                                 alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
@@ -2369,13 +2236,13 @@ def main(page: ft.Page):
                             
                             ft.Container(height=5),
                             
-                            # Botones de acción
+                            # Botones de acción: usan la cita asignada a la tarjeta al momento del clic
                             ft.Row(
                                 [
                                     ft.OutlinedButton(
                                         "Editar",
                                         icon=ft.Icons.EDIT,
-                                        on_click=lambda e, c=cita: show_editar_cita_view(c),
+                                        on_click=lambda e: show_editar_cita_view(tarjeta.data["cita"]),
                                         style=ft.ButtonStyle(
                                             color="#005288",
                                             side=ft.BorderSide(1, "#005288")
@@ -2385,7 +2252,7 @@ def main(page: ft.Page):
                                         icon=ft.Icons.DELETE,
                                         icon_color=ft.Colors.RED,
                                         tooltip="Eliminar cita",
-                                        on_click=lambda e, cid=cita['id']: show_confirm_delete_view(cid)
+                                        on_click=lambda e: show_confirm_delete_view(tarjeta.data["cita"].id)
                                     )
                                 ],
                                 alignment=ft.MainAxisAlignment.END,
@@ -2393,6 +2260,8 @@ def main(page: ft.Page):
                         ],
                         spacing=10
                     ),
+                    # Alto fijo: la lista calcula la fila visible a partir de ALTO_FILA_CITA
+                    height=ALTO_FILA_CITA - 10,
                     padding=20,
                     bgcolor=ft.Colors.WHITE,
                     border_radius=15,
@@ -2401,197 +2270,209 @@ def main(page: ft.Page):
                         color=ft.Colors.with_opacity(0.1, ft.Colors.BLACK),
                         offset=ft.Offset(0, 4),
                     ),
-                    margin=ft.margin.only(bottom=10, left=5, right=5)
+                    margin=ft.margin.only(bottom=10, left=5, right=5),
+                    data={
+                        "cita": None, "nombre": nombre, "icono_estado": icono_estado, "texto_estado": texto_estado,
+                        "distintivo": distintivo, "cedula": cedula, "sede": sede, "empresa": empresa,
+                        "laboratorio": laboratorio, "fecha": fecha,
+                    },
                 )
+                return tarjeta
+
+            def llenar_cita_card(tarjeta, cita):
+                campos = tarjeta.data
+                estado_text = cita.estado or "Pendiente"
+                badge_color, text_color, icon_status = estilos_estado.get(estado_text, estilos_estado["Pendiente"])
+
+                campos["cita"] = cita
+                campos["nombre"].value = cita.paciente_nombre
+                campos["distintivo"].bgcolor = badge_color
+                campos["icono_estado"].name = icon_status
+                campos["icono_estado"].color = text_color
+                campos["texto_estado"].value = estado_text
+                campos["texto_estado"].color = text_color
+                campos["cedula"].value = f"Cédula: {cita.paciente_cedula}"
+                campos["sede"].value = f"Sede: {cita.sede}"
+                campos["empresa"].value = f"Empresa: {cita.empresa or 'Particular'}"
+                campos["laboratorio"].value = f"Lab: {cita.laboratorio}"
+                campos["fecha"].value = f"Fecha: {cita.fecha or ''}"
 
             # Estructura principal de la vista
-            page.add(
-                ft.Container(
-                    expand=True,
-                    bgcolor="#f0f4f7", # Fondo general suave
-                    content=ft.Column(
-                        [
-                            # Barra superior personalizada
-                            ft.Container(
-                                content=ft.Row(
-                                    [
-                                        ft.IconButton(
-                                            icon=ft.Icons.ARROW_BACK,
-                                            icon_color=ft.Colors.WHITE,
-                                            on_click=lambda e: show_home_agente()
-                                        ),
-                                        ft.Text("Gestión de Citas", size=20, weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
-                                        ft.IconButton(
-                                            icon=ft.Icons.ADD_CIRCLE_OUTLINE,
-                                            icon_size=30,
-                                            icon_color=ft.Colors.WHITE,
-                                            tooltip="Crear Nueva Cita",
-                                            on_click=lambda e: show_crear_cita_agente_view()
-                                        ),
-                                    ],
-                                    alignment=ft.MainAxisAlignment.SPACE_BETWEEN
-                                ),
-                                bgcolor="#005288",
-                                padding=ft.padding.symmetric(horizontal=10, vertical=15),
-                                border_radius=ft.border_radius.only(bottom_left=20, bottom_right=20),
-                                shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.with_opacity(0.2, ft.Colors.BLACK))
+            vista_lista = ft.Container(
+                expand=True,
+                bgcolor="#f0f4f7", # Fondo general suave
+                content=ft.Column(
+                    [
+                        # Barra superior personalizada
+                        ft.Container(
+                            content=ft.Row(
+                                [
+                                    ft.IconButton(
+                                        icon=ft.Icons.ARROW_BACK,
+                                        icon_color=ft.Colors.WHITE,
+                                        on_click=lambda e: show_home_agente()
+                                    ),
+                                    ft.Text("Gestión de Citas", size=20, weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
+                                    ft.IconButton(
+                                        icon=ft.Icons.ADD_CIRCLE_OUTLINE,
+                                        icon_size=30,
+                                        icon_color=ft.Colors.WHITE,
+                                        tooltip="Crear Nueva Cita",
+                                        on_click=lambda e: show_crear_cita_agente_view()
+                                    ),
+                                ],
+                                alignment=ft.MainAxisAlignment.SPACE_BETWEEN
                             ),
-                            
-                            # Contenido con scroll
-                            ft.Container(
-                                content=citas_column,
-                                padding=ft.padding.all(20),
-                                expand=True
-                            )
-                        ],
-                        spacing=0,
-                        expand=True
-                    )
+                            bgcolor="#005288",
+                            padding=ft.padding.symmetric(horizontal=10, vertical=15),
+                            border_radius=ft.border_radius.only(bottom_left=20, bottom_right=20),
+                            shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.with_opacity(0.2, ft.Colors.BLACK))
+                        ),
+                        
+                        # Contenido con scroll
+                        ft.Container(
+                            content=citas_lista,
+                            padding=ft.padding.all(20),
+                            expand=True
+                        )
+                    ],
+                    spacing=0,
+                    expand=True
                 )
             )
-            cargar_citas()
-
-        # =========================
-        # CONFIGURACIÓN AGENTE
-        # =========================
-        def agente_configuracion_view():
-            page.controls.clear()
-
-            txt_username = ft.TextField(
-                label="Nuevo nombre de usuario",
-                width=300,
-            )
-
-            txt_password = ft.TextField(
-                label="Nueva contraseña",
-                password=True,
-                can_reveal_password=True,
-                width=300,
-            )
-
-            txt_password_confirm = ft.TextField(
-                label="Confirmar contraseña",
-                password=True,
-                can_reveal_password=True,
-                width=300,
-            )
-
-            def guardar_username(e):
-                if not txt_username.value:
-                    sn = ft.SnackBar(ft.Text("Ingrese un nombre de usuario"), bgcolor=ft.Colors.ORANGE)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
-                    return
+            page.add(vista_lista)
+            lanzar_tarea(cargar_citas)
+
+    # =========================
+    # CONFIGURACIÓN DE CUENTA (ADMIN Y AGENTE)
+    # =========================
+    def show_configuracion_cuenta(volver):
+        limpiar_vista()
+
+        txt_username = ft.TextField(
+            label="Nuevo nombre de usuario",
+            width=300,
+        )
 
-                try:
-                    response = httpx.put(
-                        f"{API_URL}/usuarios/{usr_id}/username",
-                        json={"username": txt_username.value},
-                        timeout=5
-                    )
+        txt_password = ft.TextField(
+            label="Nueva contraseña",
+            password=True,
+            can_reveal_password=True,
+            width=300,
+        )
 
-                    if response.status_code == 200:
-                        sn = ft.SnackBar(ft.Text("Nombre de usuario actualizado"), bgcolor=ft.Colors.GREEN)
-                        txt_username.value = ""
-                    else:
-                        sn = ft.SnackBar(ft.Text("Error al actualizar"), bgcolor=ft.Colors.RED)
-                except Exception as ex:
-                    sn = ft.SnackBar(ft.Text(f"Error de conexión: {ex}"), bgcolor=ft.Colors.RED)
+        txt_password_confirm = ft.TextField(
+            label="Confirmar contraseña",
+            password=True,
+            can_reveal_password=True,
+            width=300,
+        )
 
+        async def guardar_username(e):
+            nonlocal usr_name
+            if not txt_username.value:
+                sn = ft.SnackBar(ft.Text("Ingrese un nombre de usuario"), bgcolor=ft.Colors.ORANGE)
                 page.overlay.append(sn)
                 sn.open = True
                 page.update()
+                return
 
-            def guardar_password(e):
-                if not txt_password.value or not txt_password_confirm.value:
-                    sn = ft.SnackBar(ft.Text("Complete ambos campos"), bgcolor=ft.Colors.ORANGE)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
-                    return
+            marcar_ocupado(e.control, True)
+            page.update()
+            try:
+                await api.cambiar_username(usr_id, txt_username.value)
+                usr_name = txt_username.value
+                mostrar_mensaje("Nombre de usuario actualizado", ft.Colors.GREEN)
+                txt_username.value = ""
+            except Exception as ex:
+                mostrar_mensaje(texto_error(ex), ft.Colors.RED)
 
-                if txt_password.value != txt_password_confirm.value:
-                    sn = ft.SnackBar(ft.Text("Las contraseñas no coinciden"), bgcolor=ft.Colors.RED)
-                    page.overlay.append(sn)
-                    sn.open = True
-                    page.update()
-                    return
+            marcar_ocupado(e.control, False)
+            page.update()
 
-                try:
-                    response = httpx.put(
-                        f"{API_URL}/usuarios/{usr_id}/password",
-                        json={"password": txt_password.value},
-                        timeout=5
-                    )
-                    if response.status_code == 200:
-                        sn = ft.SnackBar(ft.Text("Contraseña actualizada"), bgcolor=ft.Colors.GREEN)
-                        txt_password.value = ""
-                        txt_password_confirm.value = ""
-                    else:
-                        sn = ft.SnackBar(ft.Text("Error al actualizar contraseña"), bgcolor=ft.Colors.RED)
-                except Exception as ex:
-                    sn = ft.SnackBar(ft.Text(f"Error de conexión: {ex}"), bgcolor=ft.Colors.RED)
+        async def guardar_password(e):
+            if not txt_password.value or not txt_password_confirm.value:
+                sn = ft.SnackBar(ft.Text("Complete ambos campos"), bgcolor=ft.Colors.ORANGE)
+                page.overlay.append(sn)
+                sn.open = True
+                page.update()
+                return
 
+            if txt_password.value != txt_password_confirm.value:
+                sn = ft.SnackBar(ft.Text("Las contraseñas no coinciden"), bgcolor=ft.Colors.RED)
                 page.overlay.append(sn)
                 sn.open = True
                 page.update()
+                return
 
-            page.add(
-                ft.AppBar(
-                    title=ft.Text("Configuración"),
-                    bgcolor="#005288",
-                    color=ft.Colors.WHITE,
-                    center_title=True,
-                ),
-                ft.Container(
-                    content=ft.Column(
-                        [
-                            ft.Text(
-                                "Configuración de cuenta",
-                                size=24,
-                                weight=ft.FontWeight.BOLD,
-                                color="#005288",
-                            ),
+            marcar_ocupado(e.control, True)
+            page.update()
+            try:
+                await api.cambiar_password(usr_id, txt_password.value)
+                mostrar_mensaje("Contraseña actualizada", ft.Colors.GREEN)
+                txt_password.value = ""
+                txt_password_confirm.value = ""
+            except Exception as ex:
+                mostrar_mensaje(texto_error(ex), ft.Colors.RED)
 
-                            ft.Divider(),
+            marcar_ocupado(e.control, False)
+            page.update()
 
-                            ft.Text("Cambiar nombre de usuario", weight=ft.FontWeight.BOLD),
-                            txt_username,
-                            ft.ElevatedButton(
-                                "Guardar nombre",
-                                on_click=guardar_username,
-                                bgcolor="#005288",
-                                color=ft.Colors.WHITE,
-                                width=250,
-                            ),
+        page.add(
+            ft.AppBar(
+                title=ft.Text("Configuración"),
+                bgcolor="#005288",
+                color=ft.Colors.WHITE,
+                center_title=True,
+            ),
+            ft.Container(
+                content=ft.Column(
+                    [
+                        ft.Text(
+                            "Configuración de cuenta",
+                            size=24,
+                            weight=ft.FontWeight.BOLD,
+                            color="#005288",
+                        ),
 
-                            ft.Divider(),
+                        ft.Divider(),
 
-                            ft.Text("Cambiar contraseña", weight=ft.FontWeight.BOLD),
-                            txt_password,
-                            txt_password_confirm,
-                            ft.ElevatedButton(
-                                "Cambiar contraseña",
-                                on_click=guardar_password,
-                                bgcolor="#005288",
-                                color=ft.Colors.WHITE,
-                                width=250,
-                            ),
+                        ft.Text("Cambiar nombre de usuario", weight=ft.FontWeight.BOLD),
+                        txt_username,
+                        ft.ElevatedButton(
+                            "Guardar nombre",
+                            on_click=lambda e: lanzar_tarea(guardar_username, e),
+                            bgcolor="#005288",
+                            color=ft.Colors.WHITE,
+                            width=250,
+                        ),
 
-                            ft.TextButton(
-                                "Volver al panel",
-                                icon=ft.Icons.ARROW_BACK,
-                                on_click=lambda _: show_home_agente(),
-                            ),
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        spacing=12,
-                    ),
-                    padding=20,
+                        ft.Divider(),
+
+                        ft.Text("Cambiar contraseña", weight=ft.FontWeight.BOLD),
+                        txt_password,
+                        txt_password_confirm,
+                        ft.ElevatedButton(
+                            "Cambiar contraseña",
+                            on_click=lambda e: lanzar_tarea(guardar_password, e),
+                            bgcolor="#005288",
+                            color=ft.Colors.WHITE,
+                            width=250,
+                        ),
+
+                        ft.TextButton(
+                            "Volver al panel",
+                            icon=ft.Icons.ARROW_BACK,
+                            on_click=lambda _: volver(),
+                        ),
+                    ],
+                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                    spacing=12,
                 ),
-            )
-            page.update()
+                padding=20,
+            ),
+        )
+        page.update()
 
     show_login()
 
@@ -0,0 +1,40 @@
+import csv
+import json
+import sys
+from backend import catalogos
+from backend.database import SessionLocal
+from backend.main import importar_filas_citas
+
+def leer_filas(ruta):
+    if ruta.lower().endswith(".json"):
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    with open(ruta, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+def importar_citas(ruta):
+    db = SessionLocal()
+    try:
+        # Fuera del servidor no corre startup_event: los estados se cargan aquí
+        catalogos.cargar_catalogos(db)
+        # Cerrar la lectura para que el import abra su propia transacción de escritura
+        db.commit()
+        reporte = importar_filas_citas(leer_filas(ruta), db)
+        for fila in reporte["filas"]:
+            if fila["estado"] == "rechazada":
+                print(f"Fila {fila['fila']} rechazada: {fila['detalle']}")
+        print(
+            f"Importación completada: {reporte['aceptadas']} aceptadas, {reporte['rechazadas']} rechazadas "
+            f"de {reporte['total']} ({reporte['filas_por_segundo']} filas/s)."
+        )
+    except Exception as e:
+        print(f"Error importando citas: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python importar_citas.py <archivo.csv|archivo.json>")
+        sys.exit(1)
+    importar_citas(sys.argv[1])
@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+# Base SQLite temporal y hashes baratos: se fijan antes de importar el backend
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOGIN_MAX_INTENTOS_IP", "1000000")
+os.environ.setdefault("LOGIN_MAX_INTENTOS_USUARIO", "1000000")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import cache, database, models
+from backend.main import app, startup_event
+
+@pytest.fixture
+def db():
+    """Base vacía con los datos de inicio (roles, estados, admin y agente) y cachés descartadas."""
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    startup_event()
+    for referencia in (cache.sedes, cache.empresas, cache.excepciones):
+        referencia.invalidar()
+    sesion = database.SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+
+@pytest.fixture
+def cliente(db):
+    return TestClient(app)
+
+@pytest.fixture
+def admin(cliente):
+    """Cabeceras con el token del admin."""
+    token = cliente.post("/login", json={"usuario": "admin", "password": "admin123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def crear_sede(db, nombre="SEDE UNO", turnos=None):
+    sede = models.Sede(sd_nombre=nombre, sd_cant_turnos=turnos)
+    db.add(sede)
+    db.commit()
+    return sede
+
+def crear_empresa(db, nombre="EMPRESA UNO", cupo=None):
+    empresa = models.Empresa(em_nombre=nombre, em_cant_max=cupo)
+    db.add(empresa)
+    db.commit()
+    return empresa
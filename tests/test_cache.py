@@ -0,0 +1,63 @@
+from backend import cache, database, models
+
+from .conftest import crear_sede
+
+def turnos_en_cache(nombre):
+    """Lee la caché desde otra sesión, como lo haría una petición concurrente."""
+    otra = database.SessionLocal()
+    try:
+        return cache.sedes.por_nombre(otra, nombre).sd_cant_turnos
+    finally:
+        otra.close()
+
+def test_invalidar_se_aplica_al_confirmar(db):
+    sede = crear_sede(db, turnos=5)
+    assert turnos_en_cache("SEDE UNO") == 5
+
+    sede.sd_cant_turnos = 9
+    cache.sedes.invalidar(db)
+    db.flush()
+    # Antes del commit la copia local sigue vigente: recargar ahora leería la fila anterior
+    assert turnos_en_cache("SEDE UNO") == 5
+    db.commit()
+    assert turnos_en_cache("SEDE UNO") == 9
+
+def test_invalidar_descartado_con_rollback(db):
+    sede = crear_sede(db, turnos=5)
+    assert turnos_en_cache("SEDE UNO") == 5
+    sede.sd_cant_turnos = 9
+    cache.sedes.invalidar(db)
+    db.rollback()
+    assert turnos_en_cache("SEDE UNO") == 5
+
+def test_recarga_invalidada_durante_la_lectura_no_queda_vigente(db, monkeypatch):
+    crear_sede(db, turnos=5)
+    leer = cache.sedes._leer
+
+    def leer_e_invalidar(sesion):
+        registros = leer(sesion)
+        # Un admin confirma un cambio mientras esta recarga lee las filas
+        cache.sedes._descartar()
+        return registros
+
+    monkeypatch.setattr(cache.sedes, "_leer", leer_e_invalidar)
+    assert cache.sedes.por_nombre(db, "SEDE UNO").sd_cant_turnos == 5
+    monkeypatch.undo()
+
+    db.query(models.Sede).update({models.Sede.sd_cant_turnos: 7})
+    db.commit()
+    assert cache.sedes.por_nombre(db, "SEDE UNO").sd_cant_turnos == 7
+
+def test_consultas_de_recarga_fuera_del_lock(db, monkeypatch):
+    crear_sede(db)
+    leer = cache.sedes._leer
+    bloqueado = []
+
+    def leer_comprobando(sesion):
+        bloqueado.append(cache.sedes._lock.locked())
+        return leer(sesion)
+
+    monkeypatch.setattr(cache.sedes, "_leer", leer_comprobando)
+    cache.sedes.invalidar()
+    cache.sedes.todos(db)
+    assert bloqueado == [False]
@@ -0,0 +1,58 @@
+import datetime
+
+from backend import cupos, database
+
+from .conftest import crear_empresa, crear_sede
+
+DIA_LLENO = datetime.date(2025, 7, 1)
+OTRO_DIA = datetime.date(2025, 7, 2)
+
+def agendar(cliente, cedula, fecha, empresa=None):
+    respuesta = cliente.post("/citas", json={
+        "nombre_paciente": f"Paciente {cedula}", "cedula_paciente": cedula, "sede": "SEDE UNO",
+        "laboratorio": "Hemograma", "fecha": fecha.isoformat(), "empresa_paciente": empresa,
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["cita_id"]
+
+def ocupados(**clave):
+    with database.SessionLocal() as sesion:
+        return cupos.ocupados(sesion, clave.pop("fecha"), **clave)
+
+def test_mover_una_cita_a_un_dia_sin_turnos_de_la_sede(db, cliente, admin):
+    sede = crear_sede(db, turnos=1)
+    agendar(cliente, "100", DIA_LLENO)
+    cita_id = agendar(cliente, "101", OTRO_DIA)
+
+    respuesta = cliente.put(f"/citas/{cita_id}", json={"fecha": DIA_LLENO.isoformat(), "estado": "Pendiente"}, headers=admin)
+
+    assert respuesta.status_code == 400
+    assert "No hay turnos disponibles" in respuesta.json()["detail"]
+    assert ocupados(fecha=DIA_LLENO, sede_id=sede.sd_id) == 1
+    assert ocupados(fecha=OTRO_DIA, sede_id=sede.sd_id) == 1
+
+def test_mover_una_cita_a_un_dia_sin_cupo_de_la_empresa(db, cliente, admin):
+    sede = crear_sede(db, turnos=10)
+    empresa = crear_empresa(db, cupo=1)
+    agendar(cliente, "100", DIA_LLENO, "EMPRESA UNO")
+    cita_id = agendar(cliente, "101", OTRO_DIA, "EMPRESA UNO")
+
+    respuesta = cliente.put(f"/citas/{cita_id}", json={"fecha": DIA_LLENO.isoformat(), "estado": "Pendiente"}, headers=admin)
+
+    assert respuesta.status_code == 400
+    assert "no tiene cupos disponibles" in respuesta.json()["detail"]
+    # El turno de sede tomado antes de fallar la empresa se deshace
+    assert ocupados(fecha=DIA_LLENO, sede_id=sede.sd_id) == 1
+    assert ocupados(fecha=DIA_LLENO, empresa_id=empresa.em_id) == 1
+    assert ocupados(fecha=OTRO_DIA, empresa_id=empresa.em_id) == 1
+
+def test_mover_una_cita_traslada_sus_cupos(db, cliente, admin):
+    sede = crear_sede(db, turnos=1)
+    cita_id = agendar(cliente, "100", OTRO_DIA)
+
+    respuesta = cliente.put(f"/citas/{cita_id}", json={"fecha": DIA_LLENO.isoformat(), "estado": "Confirmada"}, headers=admin)
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["cita"]["fecha"] == DIA_LLENO.isoformat()
+    assert ocupados(fecha=DIA_LLENO, sede_id=sede.sd_id) == 1
+    assert ocupados(fecha=OTRO_DIA, sede_id=sede.sd_id) == 0
@@ -0,0 +1,44 @@
+import datetime
+
+from backend import catalogos, models
+
+from .conftest import crear_sede
+
+def test_paginacion_cruza_de_citas_sin_fecha_a_citas_con_fecha(db, cliente, admin):
+    sede = crear_sede(db)
+    paciente = models.Paciente(pt_nombre="Ana", pt_cedula="100")
+    db.add(paciente)
+    db.flush()
+    fechas = [datetime.date(2025, 3, 2), None, datetime.date(2025, 3, 1), None, None, datetime.date(2025, 3, 1)]
+    citas = [
+        models.Cita(c_paciente_id=paciente.pt_id, c_sede_id=sede.sd_id, c_laboratorio="L", c_fecha=fecha,
+                    c_estado_id=catalogos.estados.id("Pendiente"))
+        for fecha in fechas
+    ]
+    db.add_all(citas)
+    db.commit()
+
+    # Sin fecha primero (por id), luego por fecha e id
+    esperado = [c.c_id for c in sorted(citas, key=lambda c: (c.c_fecha is not None, c.c_fecha or datetime.date.min, c.c_id))]
+
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        respuesta = cliente.get("/citas", params=params, headers=admin).json()
+        vistos += [c["id"] for c in respuesta["items"]]
+        cursor = respuesta["next_cursor"]
+        paginas += 1
+        if not cursor:
+            break
+        assert paginas < 10, "el cursor no avanza"
+
+    assert vistos == esperado
+
+def test_orden_explicito_en_postgresql():
+    # En PostgreSQL los NULL van al final por defecto: el orden debe pedirlos primero
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+    from backend.main import ORDEN_CITAS
+
+    sql = str(select(models.Cita.c_id).order_by(*ORDEN_CITAS).compile(dialect=postgresql.dialect()))
+    assert 'ORDER BY "Citas".c_fecha ASC NULLS FIRST, "Citas".c_id' in sql
@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+import pytest
+
+from frontend import cliente_api
+from frontend.cliente_api import ClienteAPI
+
+def llamadas_hasta_fallar(metodo, error):
+    """Peticiones que llegan al transporte cuando todas fallan con `error`."""
+    llamadas = []
+
+    def responder(request):
+        llamadas.append(request)
+        raise error("falla de red", request=request)
+
+    async def enviar():
+        api = ClienteAPI("http://backend", transporte=httpx.MockTransport(responder))
+        try:
+            with pytest.raises(error):
+                await api.request(metodo, "/sedes")
+        finally:
+            await api.cerrar()
+
+    asyncio.run(enviar())
+    return len(llamadas)
+
+def test_get_se_reintenta_una_sola_vez_por_reintento():
+    assert llamadas_hasta_fallar("GET", httpx.ReadError) == 1 + cliente_api.API_REINTENTOS
+    assert llamadas_hasta_fallar("GET", httpx.ConnectError) == 1 + cliente_api.API_REINTENTOS
+
+def test_post_solo_se_reintenta_si_no_se_pudo_conectar():
+    assert llamadas_hasta_fallar("POST", httpx.ConnectError) == 1 + cliente_api.API_REINTENTOS
+    assert llamadas_hasta_fallar("POST", httpx.ReadError) == 1
@@ -0,0 +1,70 @@
+import datetime
+
+from backend import cupos, models
+from backend.main import importar_filas_citas
+
+from .conftest import crear_empresa, crear_sede
+
+def fila(nombre, cedula, empresa, fecha="2025-07-01", sede="SEDE UNO"):
+    return {
+        "nombre_paciente": nombre, "cedula_paciente": cedula, "sede": sede,
+        "laboratorio": "Hemograma", "fecha": fecha, "empresa_paciente": empresa,
+    }
+
+def test_el_cupo_de_empresa_se_revisa_con_la_empresa_de_la_fila(db):
+    crear_sede(db)
+    crear_empresa(db, "EMPRESA A")
+    empresa_b = crear_empresa(db, "EMPRESA B", cupo=2)
+    assert importar_filas_citas([fila("Ana", "100", "EMPRESA B"), fila("Eva", "102", "EMPRESA B")], db)["aceptadas"] == 2
+
+    # El paciente nuevo se crea con la empresa de su primera fila (A), pero la segunda
+    # fila es de B, que ya no tiene cupo ese día
+    reporte = importar_filas_citas([fila("Luis", "101", "EMPRESA A"), fila("Luis", "101", "EMPRESA B")], db)
+
+    assert [f["estado"] for f in reporte["filas"]] == ["aceptada", "rechazada"]
+    assert cupos.ocupados(db, datetime.date(2025, 7, 1), empresa_id=empresa_b.em_id) == 2
+
+def test_un_paciente_con_dos_empresas_deja_los_contadores_al_dia(db):
+    crear_sede(db)
+    crear_empresa(db, "EMPRESA A")
+    importar_filas_citas([fila("Ana", "100", "EMPRESA A", "2025-06-30")], db)
+
+    # Ya existente en A; en el archivo pasa a B y luego a C (nueva): todas sus citas
+    # deben quedar contadas en C
+    reporte = importar_filas_citas([
+        fila("Ana", "100", "EMPRESA B", "2025-07-01"),
+        fila("Luis", "101", "EMPRESA A", "2025-07-01"),
+        fila("Luis", "101", "EMPRESA B", "2025-07-02"),
+        fila("Ana", "100", "EMPRESA C", "2025-07-02"),
+        fila("Ana", "100", None, "2025-07-03"),
+    ], db)
+
+    assert reporte["aceptadas"] == 5
+    assert cupos.reconciliar(db) == []
+    empresas = {p.pt_cedula: p.empresa.em_nombre for p in db.query(models.Paciente).all()}
+    assert empresas == {"100": "EMPRESA C", "101": "EMPRESA B"}
+
+def test_una_fila_rechazada_no_crea_ni_cambia_nada(db):
+    crear_sede(db)
+    crear_empresa(db, "EMPRESA A")
+    importar_filas_citas([fila("Ana", "100", "EMPRESA A")], db)
+
+    reporte = importar_filas_citas([
+        fila("Ana", "100", "EMPRESA B", sede="SEDE NUEVA"),
+        fila("Luis", "101", "EMPRESA C", sede="SEDE NUEVA"),
+    ], db)
+
+    assert reporte["rechazadas"] == 2
+    assert {e.em_nombre for e in db.query(models.Empresa).all()} == {"EMPRESA A"}
+    assert [(p.pt_cedula, p.empresa.em_nombre) for p in db.query(models.Paciente).all()] == [("100", "EMPRESA A")]
+    assert cupos.reconciliar(db) == []
+
+def test_bloquear_crea_los_contadores_que_faltan(db):
+    sede = crear_sede(db, turnos=5)
+    empresa = crear_empresa(db)
+    fecha = datetime.date(2025, 7, 1)
+    assert cupos.reservar(db, fecha, 5, sede_id=sede.sd_id)
+
+    ocupados = cupos.bloquear(db, {(sede.sd_id, 0, fecha), (0, empresa.em_id, fecha)})
+
+    assert ocupados == {(sede.sd_id, 0, fecha): 1, (0, empresa.em_id, fecha): 0}
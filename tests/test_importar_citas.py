@@ -0,0 +1,25 @@
+from types import MappingProxyType
+
+import importar_citas
+from backend import catalogos, models
+
+from .conftest import crear_sede
+
+def test_cli_guarda_las_citas_como_pendientes(db, tmp_path, monkeypatch, capsys):
+    crear_sede(db)
+    # Proceso nuevo: los catálogos solo se cargan en startup_event, que el CLI no ejecuta
+    monkeypatch.setattr(catalogos.estados, "por_nombre", MappingProxyType({}))
+    monkeypatch.setattr(catalogos.estados, "por_id", MappingProxyType({}))
+
+    archivo = tmp_path / "citas.csv"
+    archivo.write_text(
+        "nombre_paciente,cedula_paciente,sede,laboratorio,fecha,empresa_paciente\n"
+        "Ana,100,SEDE UNO,Hemograma,2025-07-01,\n"
+        "Luis,101,SEDE UNO,Glucosa,2025-07-02,EMPRESA UNO\n",
+        encoding="utf-8"
+    )
+    importar_citas.importar_citas(str(archivo))
+
+    assert "2 aceptadas" in capsys.readouterr().out
+    estados = db.query(models.Estado.name).join(models.Cita, models.Cita.c_estado_id == models.Estado.id).all()
+    assert [e for (e,) in estados] == ["Pendiente", "Pendiente"]
@@ -0,0 +1,71 @@
+import types
+
+import pytest
+
+from backend import limite_login
+
+VENTANA = 300
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def almacen(request, tmp_path):
+    if request.param == "sqlite":
+        return limite_login.VentanaSQLite(str(tmp_path / "limite_login.db"))
+    return limite_login.VentanaMemoria()
+
+@pytest.fixture
+def reloj(monkeypatch, almacen):
+    """Límite chico (3 por usuario, 5 por IP) sobre `almacen` y un reloj que el test adelanta."""
+    reloj = types.SimpleNamespace(ahora=1_000_000.0)
+    monkeypatch.setattr(limite_login, "almacen", almacen)
+    monkeypatch.setattr(limite_login, "LOGIN_MAX_INTENTOS_USUARIO", 3)
+    monkeypatch.setattr(limite_login, "LOGIN_MAX_INTENTOS_IP", 5)
+    monkeypatch.setattr(limite_login, "LOGIN_VENTANA_S", VENTANA)
+    monkeypatch.setattr(limite_login, "time", types.SimpleNamespace(time=lambda: reloj.ahora))
+    return reloj
+
+def login(cliente, usuario="agente", password="agente123"):
+    return cliente.post("/login", json={"usuario": usuario, "password": password})
+
+def test_la_ventana_libera_los_intentos_vencidos(almacen):
+    assert almacen.consumir("usuario:ana", 2, 10, 0.0) == 0
+    assert almacen.consumir("usuario:ana", 2, 10, 1.0) == 0
+    assert almacen.consumir("usuario:ana", 2, 10, 2.0) == pytest.approx(8.0)
+    # A los 10 s vence el primer intento y hay lugar para uno más
+    assert almacen.consumir("usuario:ana", 2, 10, 10.5) == 0
+    assert almacen.consumir("usuario:ana", 2, 10, 10.6) == pytest.approx(0.4)
+
+def test_demasiados_intentos_responden_429_con_retry_after(cliente, reloj):
+    for _ in range(3):
+        assert login(cliente, password="mala").status_code == 401
+    reloj.ahora += 100
+
+    respuesta = login(cliente)
+
+    assert respuesta.status_code == 429
+    assert respuesta.headers["Retry-After"] == str(VENTANA - 100 + 1)
+
+    # Vencida la ventana del primer intento, el usuario puede volver a entrar
+    reloj.ahora += VENTANA - 100
+    assert login(cliente).status_code == 200
+
+def test_un_login_correcto_libera_los_intentos_del_usuario(cliente, reloj):
+    for _ in range(2):
+        assert login(cliente, password="mala").status_code == 401
+    assert login(cliente).status_code == 200
+
+    # limpiar: los fallos anteriores ya no cuentan para el usuario
+    for _ in range(3):
+        assert login(cliente, password="mala").status_code == 401
+    assert login(cliente, password="mala").status_code == 429
+
+def test_los_logins_correctos_no_cuentan_contra_la_ip(cliente, reloj):
+    # devolver: la IP admite 5 intentos y los correctos se le descuentan
+    for _ in range(10):
+        assert login(cliente).status_code == 200
+        assert login(cliente, "admin", "admin123").status_code == 200
+    for _ in range(3):
+        assert login(cliente, "nadie", "mala").status_code == 401
+    assert login(cliente, "otro", "mala").status_code == 401
+    assert login(cliente, "otro", "mala").status_code == 401
+    # La IP ya tiene 5 fallos en la ventana, aunque "otro" lleve solo 2
+    assert login(cliente, "otro", "mala").status_code == 429
@@ -0,0 +1,25 @@
+import pytest
+
+from backend import tokens
+
+def test_token_no_ascii_no_es_valido():
+    token = tokens.emitir(1, "admin", "Admin")
+    carga, _, firma = token.partition(".")
+    assert tokens.verificar(f"{carga}.{firma[:-1]}ñ") is None
+    assert tokens.verificar("cárga.fírma") is None
+
+def test_token_no_ascii_responde_401(cliente):
+    # Starlette decodifica las cabeceras como latin-1
+    cabeceras = {"Authorization": "Bearer cárga.fírma".encode("latin-1")}
+    respuesta = cliente.put("/citas/1", json={"fecha": "2025-07-01", "estado": "Pendiente"}, headers=cabeceras)
+    assert respuesta.status_code == 401
+
+@pytest.mark.parametrize("metodo, ruta, argumentos", [
+    ("GET", "/citas", {}),
+    ("GET", "/citas/export", {}),
+    ("POST", "/citas/bulk", {"json": []}),
+    ("POST", "/citas/bulk/csv", {"files": {"archivo": ("citas.csv", b"nombre_paciente\n")}}),
+])
+def test_consultar_exportar_e_importar_requieren_sesion(cliente, admin, metodo, ruta, argumentos):
+    assert cliente.request(metodo, ruta, **argumentos).status_code == 401
+    assert cliente.request(metodo, ruta, headers=admin, **argumentos).status_code == 200